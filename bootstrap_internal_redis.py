@@ -55,7 +55,9 @@ async def main() -> None:
         await _flush_db(redis_host, db_index)
 
     proxy_servers = list(_load_proxy_servers(PROXIES_FILE))
-    if proxy_servers:
+    # Что: с COOKIE_MANAGER_ENABLED cookies прогревает main/main_excel, заглушка не нужна
+    cookie_manager = os.getenv("COOKIE_MANAGER_ENABLED", "").strip().lower() in {"1", "true", "yes", "on"}
+    if proxy_servers and not cookie_manager:
         await _seed_proxy_cookies(redis_host, proxy_servers)
 
 
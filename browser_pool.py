@@ -0,0 +1,290 @@
+"""Тёплые контексты Firefox для решения challenge — по одному на прокси.
+
+BROWSER_POOL_ENABLED=1 — Webdriver.execute не запускает Firefox с пустым
+профилем на каждый challenge, а берёт из пула процесса уже открытый
+persistent-контекст своего прокси (прокси в Playwright задаётся при запуске,
+поэтому контекст привязан к нему). Перед выдачей контекст проверяется
+(ответ браузера за BROWSER_POOL_HEALTH_TIMEOUT секунд) и с него снимаются
+cookies, так что challenge проходит «с чистого листа», как раньше, но без
+холодного старта. Контекст закрывается и при следующем challenge
+создаётся заново:
+  * после BROWSER_POOL_MAX_USES решений;
+  * если браузеры процесса заняли больше BROWSER_POOL_MAX_RSS_MB мегабайт;
+  * после ошибки во время решения или неудачной проверки;
+  * если им не пользовались дольше BROWSER_POOL_IDLE_TTL секунд;
+  * если контекстов больше BROWSER_POOL_SIZE (уходит давно не нужный).
+BROWSER_PROFILE_TEMPLATE — каталог шаблона профиля Firefox; каждый
+контекст стартует с его копии. Если каталога нет, он собирается при
+старте воркера (первый запуск Firefox без прокси) и переиспользуется
+всеми процессами.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import shutil
+import tempfile
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from time import monotonic
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+
+from undetected_playwright.async_api import BrowserContext, Playwright
+
+
+def _as_bool(value: Optional[str]) -> bool:
+    if not value:
+        return False
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+_ENABLED: bool = _as_bool(os.getenv("BROWSER_POOL_ENABLED"))
+_SIZE: int = max(int(os.getenv("BROWSER_POOL_SIZE", "2")), 1)
+_MAX_USES: int = int(os.getenv("BROWSER_POOL_MAX_USES", "20"))
+_MAX_RSS_MB: float = float(os.getenv("BROWSER_POOL_MAX_RSS_MB", "1500"))
+_IDLE_TTL: float = float(os.getenv("BROWSER_POOL_IDLE_TTL", "900"))
+_HEALTH_TIMEOUT: float = float(os.getenv("BROWSER_POOL_HEALTH_TIMEOUT", "5"))
+_TEMPLATE: str = os.getenv("BROWSER_PROFILE_TEMPLATE", "")
+_LOG_FILE: str = os.getenv("BROWSER_POOL_LOG_FILE", "browser_pool.log")
+
+# Что: те же настройки запуска, что были в Webdriver.execute
+LAUNCH_OPTIONS: dict[str, Any] = {
+    "channel": "firefox",
+    "headless": True,
+    "firefox_user_prefs": {
+        "network.http.max-persistent-connections-per-server": 1
+    },
+}
+
+_logger = logging.getLogger("browser_pool")
+if not _logger.handlers:
+    _handler = logging.FileHandler(_LOG_FILE, encoding="utf-8")
+    _handler.setFormatter(logging.Formatter(
+        fmt="%(asctime)s | %(levelname)s | %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    ))
+    _logger.addHandler(_handler)
+_logger.setLevel(logging.INFO)
+_logger.propagate = False
+
+
+@dataclass(slots=True)
+class _Entry:
+    context: BrowserContext
+    profile: str
+    uses: int = 0
+    closed: bool = False
+    created: float = field(default_factory=monotonic)
+    last_used: float = field(default_factory=monotonic)
+
+
+_entries: dict[str, _Entry] = {}
+# Что: один замок на прокси на всё время lease; Зачем: не запустить два контекста одного прокси
+_locks: dict[str, asyncio.Lock] = {}
+
+
+def enabled() -> bool:
+    return _ENABLED
+
+
+def _tree_rss_mb() -> float:
+    """RSS процесса воркера и всех его потомков (драйвер Playwright, Firefox), МБ."""
+    children: dict[int, list[int]] = {}
+    rss: dict[int, int] = {}
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat", "rb") as file:
+                fields = file.read().rsplit(b")", 1)[1].split()
+        except OSError:
+            continue
+        pid = int(name)
+        children.setdefault(int(fields[1]), []).append(pid)
+        rss[pid] = int(fields[21])
+    total, stack = 0, [os.getpid()]
+    while stack:
+        pid = stack.pop()
+        total += rss.get(pid, 0)
+        stack.extend(children.get(pid, ()))
+    return total * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+
+def _busy(server: str) -> bool:
+    lock = _locks.get(server)
+    return lock is not None and lock.locked()
+
+
+def _profile_dir() -> str:
+    path = tempfile.mkdtemp(prefix="pw-profile-")
+    if _TEMPLATE and Path(_TEMPLATE).is_dir():
+        shutil.copytree(_TEMPLATE, path, dirs_exist_ok=True)
+    return path
+
+
+async def bake_template(pw: Playwright) -> None:
+    """Собирает шаблон профиля, если его ещё нет (первый запуск Firefox без прокси)."""
+    if not _ENABLED or not _TEMPLATE or Path(_TEMPLATE).is_dir():
+        return
+    target = Path(_TEMPLATE)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    build = tempfile.mkdtemp(prefix=f"{target.name}.", dir=target.parent)
+    try:
+        context = await pw.firefox.launch_persistent_context(build, **LAUNCH_OPTIONS)
+        try:
+            await context.pages[0].goto("about:blank")
+        finally:
+            await context.close()
+        for name in ("lock", ".parentlock", "cookies.sqlite", "sessionstore-backups"):
+            path = Path(build, name)
+            if path.is_dir() and not path.is_symlink():
+                shutil.rmtree(path, ignore_errors=True)
+            elif path.exists() or path.is_symlink():
+                path.unlink()
+        # Что: rename атомарен; Зачем: процессы воркера собирают шаблон одновременно
+        os.rename(build, target)
+        _logger.info("template baked path=%s", target)
+    except OSError:
+        # Что: шаблон уже положил другой процесс
+        pass
+    except Exception as ex:
+        _logger.warning("template bake failed path=%s err=%s", target, ex)
+    finally:
+        shutil.rmtree(build, ignore_errors=True)
+
+
+async def _close(server: str, entry: _Entry, reason: str) -> None:
+    if _entries.get(server) is entry:
+        del _entries[server]
+    entry.closed = True
+    _logger.info(
+        "recycle proxy=%s reason=%s uses=%s age=%.0fs",
+        server, reason, entry.uses, monotonic() - entry.created,
+    )
+    try:
+        await entry.context.close()
+    except Exception as ex:
+        _logger.warning("close failed proxy=%s err=%s", server, ex)
+    finally:
+        shutil.rmtree(entry.profile, ignore_errors=True)
+
+
+async def _evict(keep: str) -> None:
+    """Закрывает простаивающие контексты: просроченные и лишние сверх BROWSER_POOL_SIZE."""
+    now = monotonic()
+    for server, entry in list(_entries.items()):
+        if server != keep and not _busy(server) and now - entry.last_used >= _IDLE_TTL:
+            await _close(server, entry, "idle")
+    idle = sorted(
+        ((entry.last_used, server, entry) for server, entry in _entries.items()
+         if server != keep and not _busy(server)),
+        key=lambda item: item[0],
+    )
+    while keep not in _entries and len(_entries) >= _SIZE and idle:
+        __, server, entry = idle.pop(0)
+        await _close(server, entry, "size")
+
+
+async def _open(
+    pw: Playwright,
+    proxy: Any,
+    prepare: Callable[[BrowserContext], Awaitable[None]],
+) -> _Entry:
+    server = proxy["server"]
+    profile = _profile_dir()
+    started = monotonic()
+    try:
+        context = await pw.firefox.launch_persistent_context(profile, proxy=proxy, **LAUNCH_OPTIONS)
+    except BaseException:
+        shutil.rmtree(profile, ignore_errors=True)
+        raise
+    entry = _Entry(context=context, profile=profile)
+    context.on("close", lambda *_: setattr(entry, "closed", True))
+    try:
+        await prepare(context)
+    except BaseException:
+        await _close(server, entry, "prepare")
+        raise
+    _logger.info("launch proxy=%s duration=%.2fs", server, monotonic() - started)
+    return entry
+
+
+async def _healthy(entry: _Entry) -> bool:
+    if entry.closed:
+        return False
+    try:
+        await asyncio.wait_for(entry.context.clear_cookies(), timeout=_HEALTH_TIMEOUT)
+        pages = entry.context.pages
+        if not pages:
+            await asyncio.wait_for(entry.context.new_page(), timeout=_HEALTH_TIMEOUT)
+        for page in pages[1:]:
+            await page.close()
+        return True
+    except Exception as ex:
+        _logger.warning("health check failed err=%s", ex)
+        return False
+
+
+@asynccontextmanager
+async def lease(
+    pw: Playwright,
+    proxy: Any,
+    prepare: Callable[[BrowserContext], Awaitable[None]],
+) -> AsyncIterator[BrowserContext]:
+    """Тёплый контекст прокси на время одного challenge (pages[0] — рабочая вкладка).
+
+    prepare вызывается один раз при создании контекста (маршруты и т.п.).
+    """
+    server = proxy["server"]
+    lock = _locks.get(server)
+    if lock is None:
+        lock = _locks[server] = asyncio.Lock()
+    async with lock:
+        await _evict(server)
+        entry = _entries.get(server)
+        if entry is not None and (entry.closed or not await _healthy(entry)):
+            await _close(server, entry, "unhealthy")
+            entry = None
+        if entry is None:
+            entry = _entries[server] = await _open(pw, proxy, prepare)
+            await _healthy(entry)
+        started = monotonic()
+        failed = True
+        try:
+            yield entry.context
+            failed = False
+        finally:
+            entry.uses += 1
+            entry.last_used = monotonic()
+            _logger.info(
+                "use proxy=%s uses=%s ok=%s duration=%.2fs",
+                server, entry.uses, not failed, entry.last_used - started,
+            )
+            reason = None
+            if failed:
+                reason = "error"
+            elif _MAX_USES > 0 and entry.uses >= _MAX_USES:
+                reason = "uses"
+            elif _MAX_RSS_MB > 0:
+                try:
+                    if _tree_rss_mb() > _MAX_RSS_MB:
+                        reason = "memory"
+                except Exception:
+                    pass
+            if reason is not None:
+                await _close(server, entry, reason)
+            else:
+                try:
+                    # Что: останавливаем скрипты страницы до следующего challenge
+                    await asyncio.wait_for(entry.context.pages[0].goto("about:blank"), timeout=_HEALTH_TIMEOUT)
+                except Exception:
+                    await _close(server, entry, "reset")
+
+
+async def aclose() -> None:
+    """Закрывает все контексты пула при остановке воркера."""
+    for server, entry in list(_entries.items()):
+        await _close(server, entry, "shutdown")
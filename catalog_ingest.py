@@ -0,0 +1,196 @@
+"""Запись лотов в ebay прямо из карточек каталога, без запроса /itm/.
+
+CATALOG_ONLY_INGEST=1 — новые лоты, прошедшие фильтры catalog(), пишутся
+одной bulk-вставкой из данных карточки (title, цена, продавец, номер) с
+ebay.source = 'card' и уходят в Redis Stream. Полный product() остаётся
+только для лотов, у карточки которых нет какого-то из полей
+CATALOG_REQUIRED_FIELDS (поля, без которых потребитель стрима не может).
+Если в списке есть поле, которого в карточке не бывает (condition, brand,
+location, ...), режим ничего не меняет — все лоты идут через product().
+
+Чем строка из карточки отличается от строки product():
+  * доставки в карточке нет, поэтому ebay.price (цена с доставкой) и price
+    в стриме — NULL, записана только price_without_delivery;
+  * описания в карточке нет: пока включён фильтр стоп-слов описания
+    (BLOCKED_DESC_FILTER со словами), режим тоже ничего не меняет;
+  * проверки «CURRENTLY SOLD OUT» со страницы /itm/ нет — такой лот,
+    оставшийся в выдаче, запишется из карточки.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+from typing import Any, Iterable, Optional
+
+from sqlalchemy import text
+
+try:
+    from .package_commit import DataBase  # package mode
+except ImportError:
+    from package_commit import DataBase  # type: ignore
+try:
+    from .redis_stream_producer import push_product  # package mode
+except Exception:
+    from redis_stream_producer import push_product  # type: ignore
+try:
+    from . import duplicate_cache  # package mode
+except Exception:
+    import duplicate_cache  # type: ignore
+try:
+    from .blocked_description_filter import blocked_words, combo_words  # package mode
+except Exception:
+    from blocked_description_filter import blocked_words, combo_words  # type: ignore
+
+
+def _as_bool(value: Optional[str]) -> bool:
+    if not value:
+        return False
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+# Что: поля строки ebay, которые есть в карточке каталога
+CARD_FIELDS: frozenset[str] = frozenset({"title", "price_without_delivery", "seller"})
+
+_ENABLED: bool = _as_bool(os.getenv("CATALOG_ONLY_INGEST"))
+_REQUIRED: frozenset[str] = frozenset(
+    name.strip()
+    for name in (os.getenv("CATALOG_REQUIRED_FIELDS") or "title,price_without_delivery").split(",")
+    if name.strip()
+)
+_LOG_FILE: str = os.getenv("CATALOG_INGEST_LOG_FILE", "catalog_ingest.log")
+
+_logger = logging.getLogger("catalog_ingest")
+if not _logger.handlers:
+    _handler = logging.FileHandler(_LOG_FILE, encoding="utf-8")
+    _handler.setFormatter(logging.Formatter(
+        fmt="%(asctime)s | %(levelname)s | %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    ))
+    _logger.addHandler(_handler)
+_logger.setLevel(logging.INFO)
+_logger.propagate = False
+
+# Что: стоп-слова описания проверяются только на /itm/ — с ними карточки не пишем
+_DESCRIPTION_FILTER: bool = bool(blocked_words() or combo_words())
+
+if _ENABLED and not _REQUIRED <= CARD_FIELDS:
+    _logger.warning(
+        "required fields %s are not on catalog cards — every item goes through product()",
+        ",".join(sorted(_REQUIRED - CARD_FIELDS)),
+    )
+if _ENABLED and _DESCRIPTION_FILTER:
+    _logger.warning("blocked description filter is on — every item goes through product()")
+
+# Что: одна вставка на весь список — массивы разворачиваются через unnest
+_INSERT = text("""
+    insert into ebay (
+        query, price_without_delivery, number,
+        title, seller, cycle, source
+    )
+    select cast(:query as varchar), rows.price_without_delivery, rows.number,
+           rows.title, rows.seller, cast(:cycle as integer), 'card'
+    from unnest(
+        cast(:prices_without_delivery as numeric[]),
+        cast(:numbers as bigint[]),
+        cast(:titles as varchar[]),
+        cast(:sellers as varchar[])
+    ) as rows(price_without_delivery, number, title, seller)
+    on conflict (number) do nothing
+    returning number
+""")
+
+
+def enabled() -> bool:
+    return _ENABLED
+
+
+def _price(price_text: Optional[str]) -> Optional[float]:
+    # Что: тот же разбор, что у price_without_delivery в product()
+    matches = re.findall(r"[.\d]+", price_text or "")
+    try:
+        return float(matches[0]) if matches else None
+    except ValueError:
+        return None
+
+
+def _card_row(card: Optional[dict[str, Any]]) -> Optional[dict[str, Any]]:
+    """Строка для ebay из карточки или None, если обязательного поля нет."""
+    if card is None or _DESCRIPTION_FILTER or not _REQUIRED <= CARD_FIELDS:
+        return None
+    row = {
+        "title": card.get("title"),
+        "price_without_delivery": _price(card.get("price_text")),
+        "seller": card.get("seller"),
+    }
+    if any(row[name] is None for name in _REQUIRED):
+        return None
+    return row
+
+
+async def ingest(
+    query: str,
+    this_cycle: int,
+    cards: dict[str, dict[str, Any]],
+    ids: Iterable[int],
+) -> list[int]:
+    """Пишет лоты из карточек и возвращает id, которым всё же нужен product().
+
+    cards — карточки catalog() по item_id; ids — новые лоты после всех проверок.
+    Лоты, уже вставленные кем-то ещё (on conflict), просто пропускаются.
+    """
+    rows: dict[int, dict[str, Any]] = {}
+    remaining: list[int] = []
+    for _id in ids:
+        row = _card_row(cards.get(str(_id)))
+        if row is None:
+            remaining.append(_id)
+        else:
+            rows[_id] = row
+    if not rows:
+        return remaining
+
+    numbers = list(rows)
+    async with DataBase.session_marker() as session:
+        result = await session.execute(_INSERT, {
+            "query": query,
+            "cycle": this_cycle,
+            "numbers": numbers,
+            "prices_without_delivery": [rows[number]["price_without_delivery"] for number in numbers],
+            "titles": [(rows[number]["title"] or "")[:255] or None for number in numbers],
+            "sellers": [rows[number]["seller"] for number in numbers],
+        })
+        inserted = {row[0] for row in result.all()}
+        await session.commit()
+
+    for number in numbers:
+        if number not in inserted:
+            continue
+        row = rows[number]
+        # Что: тот же формат, что у product(); полей, которых нет в карточке, нет и здесь
+        payload: dict[str, Any] = {
+            "query": query,
+            "title": row["title"],
+            # Что: цена с доставкой неизвестна — не выдаём цену без доставки за неё
+            "price": None,
+            "price_without_delivery": str(row["price_without_delivery"])
+            if row["price_without_delivery"] is not None else None,
+            "seller": row["seller"],
+            "source": "card",
+        }
+        if duplicate_cache.enabled():
+            await duplicate_cache.record_seen(str(number), query=query)
+        try:
+            await push_product(str(number), payload)
+        except Exception as ex:
+            _logger.warning("XADD failed item=%s err=%s", number, ex)
+    _logger.info(
+        "ingest query=%s cards=%s inserted=%s conflicts=%s product=%s",
+        query,
+        len(rows),
+        len(inserted),
+        len(rows) - len(inserted),
+        len(remaining),
+    )
+    return remaining
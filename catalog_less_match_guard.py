@@ -2,9 +2,11 @@
 
 from __future__ import annotations
 
-from typing import Any
+from typing import Any, Optional, Sequence
 import os
 
+from lxml import etree
+
 
 def _as_bool(value: str | None) -> bool:
     if not value:
@@ -13,6 +15,86 @@ def _as_bool(value: str | None) -> bool:
 
 
 _FILTER_ENABLED = _as_bool(os.getenv("CATALOG_FILTER_FEWER_WORDS"))
+_REWRITE_START = "srp-river-answer--REWRITE_START"
+_FEWER_WORDS = "Results matching fewer words"
+
+
+def _has_fewer_words(text: Optional[str]) -> bool:
+    return bool(text) and _FEWER_WORDS in text
+
+
+def _boundary(html: Any) -> Optional[Any]:
+    """Самый ранний li, с которого should_stop начинает возвращать True.
+
+    Это первый li с классом REWRITE_START либо самый внешний li вокруг
+    первой строки «Results matching fewer words», у которой такой li есть.
+    """
+    marker = html.find("li", class_=_REWRITE_START)
+    for node in html.find_all(string=_has_fewer_words):
+        parents = node.find_parents("li")
+        if parents:
+            outer = parents[-1]
+            if marker is None or _precedes(outer, marker):
+                marker = outer
+            break
+    return marker
+
+
+def _precedes(first: Any, second: Any) -> bool:
+    for el in first.next_elements:
+        if el is second:
+            return True
+    return False
+
+
+def stop_index(html: Any, items: Sequence[Any]) -> int:
+    """Индекс первой карточки блока «fewer words» (len(items), если блока нет).
+
+    Тот же результат, что у первого should_stop(li) == True по items, но
+    граница ищется один раз на страницу — линейно, а не обходом назад от
+    каждой карточки.
+    """
+    if not _FILTER_ENABLED or not items:
+        return len(items)
+    marker = _boundary(html)
+    if marker is None:
+        return len(items)
+    positions = {id(li): i for i, li in enumerate(items)}
+    if id(marker) in positions:
+        return positions[id(marker)]
+    for el in marker.next_elements:
+        index = positions.get(id(el))
+        if index is not None:
+            return index
+    return len(items)
+
+
+# Что: та же граница для дерева lxml одним XPath — первый li REWRITE_START или
+# самый внешний li вокруг первой строки «fewer words», что раньше в документе
+_FEWER_WORDS_STRING = f"contains(., '{_FEWER_WORDS}') and ancestor::li"
+_BOUNDARY_XPATH = etree.XPath(
+    f"(//li[contains(concat(' ', normalize-space(@class), ' '), ' {_REWRITE_START} ')]"
+    f" | (//text()[{_FEWER_WORDS_STRING}] | //comment()[{_FEWER_WORDS_STRING}])[1]/ancestor::li[last()])[1]"
+)
+_AFTER_BOUNDARY = etree.XPath("descendant::li | following::li")
+
+
+def stop_index_tree(tree: Any, items: Sequence[Any]) -> int:
+    """stop_index для дерева lxml (items — li карточек в порядке документа)."""
+    if not _FILTER_ENABLED or not items:
+        return len(items)
+    found = _BOUNDARY_XPATH(tree)
+    if not found:
+        return len(items)
+    marker = found[0]
+    positions = {li: i for i, li in enumerate(items)}
+    if marker in positions:
+        return positions[marker]
+    for el in _AFTER_BOUNDARY(marker):
+        index = positions.get(el)
+        if index is not None:
+            return index
+    return len(items)
 
 
 def should_stop(li: Any) -> bool:
@@ -0,0 +1,57 @@
+"""Разбор страницы каталога eBay в простые dict (годится для пула процессов)."""
+
+from __future__ import annotations
+
+import re
+from typing import Any, Optional
+
+try:
+    from .catalog_less_match_guard import stop_index_tree  # package mode
+    from .field_spec import CATALOG_CARD_SPEC, CATALOG_ITEMS, CATALOG_PAGE_SPEC
+    from .product_extractor import parse_html
+except ImportError:
+    from catalog_less_match_guard import stop_index_tree  # type: ignore
+    from field_spec import CATALOG_CARD_SPEC, CATALOG_ITEMS, CATALOG_PAGE_SPEC  # type: ignore
+    from product_extractor import parse_html  # type: ignore
+
+_ITEM_ID = re.compile(r"/itm/(\d+)")
+
+
+def parse_catalog_page(data: str | bytes, encoding: Optional[str] = None) -> dict[str, Any]:
+    """Разбирает страницу поиска в dict для фильтров catalog().
+
+    Ключи: has_h1, count (текст span в h1), has_next (есть pagination__next),
+    cards — карточки до границы «fewer words» с href/item_id/seller/title/price_text.
+    Поля и селекторы — в field_spec (CATALOG_PAGE_FIELDS / CATALOG_CARD_FIELDS).
+    bytes уходят в lxml без декодирования в str (encoding — из ответа).
+    """
+    tree = parse_html(data, encoding)
+    if tree is None:
+        return {"has_h1": False, "count": None, "has_next": False, "cards": []}
+    page = CATALOG_PAGE_SPEC(tree)
+    if not page["has_h1"]:
+        return {"has_h1": False, "count": None, "has_next": False, "cards": []}
+    if page["count"] is None:
+        # Что: как h1.find("span").text раньше — h1 без span это сломанная страница
+        raise AttributeError("catalog h1 has no span")
+    cards: list[dict[str, Any]] = []
+    items = CATALOG_ITEMS(tree)
+    for li in items[:stop_index_tree(tree, items)]:
+        card = CATALOG_CARD_SPEC(li)
+        href = card["href"]
+        if not href:
+            continue
+        match = _ITEM_ID.search(href)
+        cards.append({
+            "href": href,
+            "item_id": match.group(1) if match else None,
+            "seller": card["seller"],
+            "title": card["title"],
+            "price_text": card["price_text"],
+        })
+    return {
+        "has_h1": True,
+        "count": page["count"],
+        "has_next": page["has_next"],
+        "cards": cards,
+    }
@@ -0,0 +1,286 @@
+"""Одно решение challenge на прокси во всём кластере.
+
+CHALLENGE_LEASE_ENABLED=1 — перед task_execute.kiq воркер каталога берёт
+в Redis аренду challenge_lease:<server> (SET NX, CHALLENGE_LEASE_TTL
+секунд). Получил — ставит задачу с токеном аренды; аренда уже занята —
+решение для этого прокси уже в пути, новая задача не ставится (attach).
+Воркер браузера решает challenge, только если аренда его: токен совпал,
+или аренды нет (истекла / задача поставлена без неё) и он её занял. Пока
+идёт решение, аренда продлевается; по завершении снимается, и в канал
+CHALLENGE_LEASE_CHANNEL уходит событие. Воркеры каталога, упёршиеся в
+блок, ждут этого события (не дольше CHALLENGE_WAIT_TIMEOUT) и повторяют
+запрос сразу после решения, а не по таймеру.
+
+Решения «в запас» (cookie_manager) берут ту же аренду, так что на прокси
+в кластере работает один браузер. Если во время такого решения прокси
+блокируется, запрос помечает аренду (challenge_lease:<server>:live), и
+решатель отдаёт полученные cookies в работу, а не в запас.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import uuid
+from collections import Counter
+from contextlib import asynccontextmanager
+from time import monotonic
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+
+from redis.asyncio import Redis
+
+
+def _as_bool(value: Optional[str]) -> bool:
+    if not value:
+        return False
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+_ENABLED: bool = _as_bool(os.getenv("CHALLENGE_LEASE_ENABLED"))
+_TTL: float = float(os.getenv("CHALLENGE_LEASE_TTL", "240"))
+_WAIT_TIMEOUT: float = float(os.getenv("CHALLENGE_WAIT_TIMEOUT", "60"))
+CHANNEL: str = os.getenv("CHALLENGE_LEASE_CHANNEL", "challenge:done")
+_METRICS_INTERVAL: float = float(os.getenv("CHALLENGE_LEASE_METRICS_INTERVAL", "60"))
+_LOG_FILE: str = os.getenv("CHALLENGE_LEASE_LOG_FILE", "challenge_lease.log")
+
+_logger = logging.getLogger("challenge_lease")
+if not _logger.handlers:
+    _handler = logging.FileHandler(_LOG_FILE, encoding="utf-8")
+    _handler.setFormatter(logging.Formatter(
+        fmt="%(asctime)s | %(levelname)s | %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    ))
+    _logger.addHandler(_handler)
+_logger.setLevel(logging.INFO)
+_logger.propagate = False
+
+# Что: занять аренду, если она наша или свободна
+_CLAIM = """
+local current = redis.call('GET', KEYS[1])
+if current == ARGV[1] or not current then
+    redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+    return 1
+end
+return 0
+"""
+_RENEW = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_RELEASE = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Что: событие «решение завершено» по прокси; заменяется новым после срабатывания
+_done: dict[str, asyncio.Event] = {}
+_metrics: Counter[str] = Counter()
+_metrics_at: float = monotonic()
+
+
+def enabled() -> bool:
+    return _ENABLED
+
+
+def _key(server: str) -> str:
+    return f"challenge_lease:{server}"
+
+
+def _live(server: str) -> str:
+    return f"challenge_lease:{server}:live"
+
+
+def _ttl_ms() -> int:
+    return int(_TTL * 1000)
+
+
+def _count(name: str) -> None:
+    global _metrics_at
+    _metrics[name] += 1
+    now = monotonic()
+    if now - _metrics_at >= _METRICS_INTERVAL:
+        _metrics_at = now
+        _logger.info("metrics %s", " ".join(f"{k}={v}" for k, v in sorted(_metrics.items())))
+        _metrics.clear()
+
+
+def _event(server: str) -> asyncio.Event:
+    event = _done.get(server)
+    if event is None:
+        event = _done[server] = asyncio.Event()
+    return event
+
+
+def _notify(server: str) -> None:
+    event = _done.pop(server, None)
+    if event is not None:
+        event.set()
+
+
+async def request(
+    redis: Redis,
+    proxy: Any,
+    enqueue: Callable[[Optional[str]], Awaitable[Any]],
+    stock: bool = False,
+) -> bool:
+    """Ставит решение challenge через enqueue(токен), если оно ещё не в пути.
+
+    stock=True — решение «в запас»: при занятой аренде просто не ставится.
+    Возвращает True, если задача поставлена этим вызовом.
+    """
+    if not _ENABLED:
+        await enqueue(None)
+        return True
+    server = proxy["server"]
+    token = uuid.uuid4().hex
+    try:
+        acquired = await redis.set(_key(server), token, nx=True, px=_ttl_ms())
+        if not acquired and not stock:
+            # Что: если в пути решение «в запас» — его cookies нужны в работе
+            await redis.set(_live(server), 1, px=_ttl_ms())
+    except Exception as ex:
+        _logger.warning("lease failed proxy=%s err=%s", server, ex)
+        if stock:
+            return False
+        # Что: без Redis — как раньше; Зачем: лучше лишний браузер, чем не решённый блок
+        await enqueue(None)
+        return True
+    if not acquired:
+        _count("stock_skipped" if stock else "attached")
+        return False
+    try:
+        await enqueue(token)
+    except BaseException:
+        await redis.eval(_RELEASE, 1, _key(server), token)
+        raise
+    _count("enqueued")
+    _logger.info("enqueue proxy=%s lease=%s", server, token)
+    return True
+
+
+async def promoted(redis: Redis, proxy: Any) -> bool:
+    """Решение «в запас» нужно отдать в работу: прокси заблокирован, пока оно шло."""
+    if not _ENABLED:
+        return False
+    try:
+        return bool(await redis.getdel(_live(proxy["server"])))
+    except Exception as ex:
+        _logger.warning("promote check failed proxy=%s err=%s", proxy["server"], ex)
+        return False
+
+
+async def _renew(redis: Redis, server: str, token: str) -> None:
+    while True:
+        await asyncio.sleep(_TTL / 3)
+        try:
+            if not await redis.eval(_RENEW, 1, _key(server), token, _ttl_ms()):
+                _logger.warning("lease lost proxy=%s lease=%s", server, token)
+                return
+        except Exception as ex:
+            _logger.warning("renew failed proxy=%s err=%s", server, ex)
+
+
+@asynccontextmanager
+async def hold(redis: Redis, proxy: Any, token: Optional[str]) -> AsyncIterator[bool]:
+    """Аренда на время решения challenge; даёт False, если решает кто-то другой."""
+    if not _ENABLED:
+        yield True
+        return
+    server = proxy["server"]
+    token = token or uuid.uuid4().hex
+    try:
+        owner = bool(await redis.eval(_CLAIM, 1, _key(server), token, _ttl_ms()))
+    except Exception as ex:
+        _logger.warning("claim failed proxy=%s err=%s", server, ex)
+        owner = True
+    if not owner:
+        _count("skipped")
+        _logger.info("skip proxy=%s lease=%s: solve in flight", server, token)
+        yield False
+        return
+    started = monotonic()
+    renew = asyncio.create_task(_renew(redis, server, token))
+    ok = False
+    try:
+        yield True
+        ok = True
+    finally:
+        renew.cancel()
+        try:
+            await redis.eval(_RELEASE, 1, _key(server), token)
+            await redis.publish(CHANNEL, json.dumps({"server": server, "ok": ok}))
+        except Exception as ex:
+            _logger.warning("release failed proxy=%s err=%s", server, ex)
+        _count("solved" if ok else "failed")
+        _logger.info("done proxy=%s ok=%s duration=%.1fs", server, ok, monotonic() - started)
+
+
+async def wait(redis: Redis, proxy: Any) -> bool:
+    """Ждёт окончания решения challenge прокси, если оно в пути.
+
+    True — решение завершилось (или его нет), False — не дождались.
+    """
+    if not _ENABLED:
+        return True
+    server = proxy["server"]
+    event = _event(server)
+    started = monotonic()
+    while True:
+        try:
+            if not await redis.exists(_key(server)):
+                break
+        except Exception as ex:
+            _logger.warning("wait failed proxy=%s err=%s", server, ex)
+            return False
+        left = _WAIT_TIMEOUT - (monotonic() - started)
+        if left <= 0:
+            _count("wait_timeout")
+            return False
+        try:
+            # Что: событие из канала будит сразу; EXISTS раз в секунду — если оно потерялось
+            await asyncio.wait_for(event.wait(), timeout=min(left, 1.0))
+            break
+        except asyncio.TimeoutError:
+            pass
+    _count("waited")
+    return True
+
+
+async def _listen(redis: Redis) -> None:
+    _logger.info("subscriber started channel=%s", CHANNEL)
+    try:
+        while True:
+            pubsub = redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(CHANNEL)
+                async for message in pubsub.listen():
+                    try:
+                        _notify(json.loads(message["data"])["server"])
+                    except Exception as ex:
+                        _logger.warning("bad message data=%r err=%s", message.get("data"), ex)
+            except asyncio.CancelledError:
+                raise
+            except Exception as ex:
+                _logger.warning("subscriber error err=%s", ex)
+                await asyncio.sleep(1)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+    except asyncio.CancelledError:
+        _logger.info("subscriber cancelled")
+        raise
+
+
+def start(redis: Redis) -> Optional[asyncio.Task[None]]:
+    """Создаёт фоновую подписку на завершения решений. Возвращает task или None, если отключено."""
+    if not _ENABLED:
+        return None
+    return asyncio.create_task(_listen(redis))
@@ -0,0 +1,94 @@
+"""История решений challenge по прокси — сколько стоит держать прокси живым.
+
+Webdriver.execute ждёт ухода со страницы challenge по событию навигации
+(page.wait_for_url), а не опросом раз в секунду, и не дольше
+CHALLENGE_SOLVE_TIMEOUT секунд (0 — без ограничения, как раньше).
+
+CHALLENGE_HISTORY_ENABLED=1 — каждое решение записывается в redis_controller:
+  challenge_history:<server>  list JSON {"at", "outcome", "duration"},
+                              новые слева, не больше CHALLENGE_HISTORY_SIZE
+  challenge_stats:<server>    hash <outcome> (число), <outcome>_seconds (сумма)
+outcome: clean (challenge не показали), solved, timeout, error.
+proxy_scheduler учитывает последние решения из challenge_history в оценке прокси.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import time
+from typing import Any, Optional
+
+from redis.asyncio import Redis
+
+
+def _as_bool(value: Optional[str]) -> bool:
+    if not value:
+        return False
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+_ENABLED: bool = _as_bool(os.getenv("CHALLENGE_HISTORY_ENABLED"))
+SOLVE_TIMEOUT: float = float(os.getenv("CHALLENGE_SOLVE_TIMEOUT", "300"))
+# Что: сколько ждать, не перенаправит ли страница на challenge после загрузки
+SETTLE_TIMEOUT: float = float(os.getenv("CHALLENGE_SETTLE_TIMEOUT", "1"))
+_HISTORY_SIZE: int = max(int(os.getenv("CHALLENGE_HISTORY_SIZE", "100")), 1)
+_LOG_FILE: str = os.getenv("CHALLENGE_STATS_LOG_FILE", "challenge_stats.log")
+
+CHALLENGE_URL = "www.ebay.com/splashui/challenge"
+
+_logger = logging.getLogger("challenge_stats")
+if not _logger.handlers:
+    _handler = logging.FileHandler(_LOG_FILE, encoding="utf-8")
+    _handler.setFormatter(logging.Formatter(
+        fmt="%(asctime)s | %(levelname)s | %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    ))
+    _logger.addHandler(_handler)
+_logger.setLevel(logging.INFO)
+_logger.propagate = False
+
+
+class ChallengeTimeout(Exception):
+    def __init__(self, server: str, timeout: float) -> None:
+        super().__init__(server, timeout)
+        self.server = server
+        self.timeout = timeout
+
+    def __str__(self) -> str:
+        return f"challenge for proxy {self.server} not solved in {self.timeout:g}s"
+
+
+def enabled() -> bool:
+    return _ENABLED
+
+
+def on_challenge(url: str) -> bool:
+    return CHALLENGE_URL in url
+
+
+def history_key(server: str) -> str:
+    return f"challenge_history:{server}"
+
+
+def _stats(server: str) -> str:
+    return f"challenge_stats:{server}"
+
+
+async def record(redis: Redis, proxy: Any, outcome: str, duration: float) -> None:
+    """Записывает исход решения challenge прокси и его длительность."""
+    server = proxy['server']
+    _logger.info("proxy=%s outcome=%s duration=%.2fs", server, outcome, duration)
+    if not _ENABLED:
+        return
+    entry = json.dumps({"at": round(time.time(), 3), "outcome": outcome, "duration": round(duration, 3)})
+    try:
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.lpush(history_key(server), entry)
+            pipe.ltrim(history_key(server), 0, _HISTORY_SIZE - 1)
+            pipe.hincrby(_stats(server), outcome, 1)
+            pipe.hincrbyfloat(_stats(server), f"{outcome}_seconds", round(duration, 3))
+            await pipe.execute()
+    except Exception as ex:
+        _logger.warning("record failed proxy=%s err=%s", server, ex)
@@ -0,0 +1,181 @@
+"""Cookies прокси в памяти воркера с инвалидацией через Redis pub/sub.
+
+COOKIE_CACHE_ENABLED=1 — Cookies.get_cookies берёт cookies из кэша процесса
+и в обычном случае не ходит в Redis вовсе. Webdriver.execute, сохранив или
+удалив cookies прокси в redis_session, публикует событие в канал
+COOKIE_CACHE_CHANNEL; фоновая подписка воркера сбрасывает запись этого
+прокси, и следующий запрос один раз перечитывает ключ. Пока cookies нет
+(идёт challenge), запросы ждут события «сохранены» не дольше
+COOKIE_WAIT_TIMEOUT секунд вместо бесконечного опроса раз в 0.1 с. Для
+страховки от потерянных сообщений запись живёт не дольше COOKIE_CACHE_TTL,
+а при переподключении подписки кэш очищается целиком.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from json import loads
+from time import monotonic
+from typing import Optional
+
+from redis.asyncio import Redis
+
+
+def _as_bool(value: Optional[str]) -> bool:
+    if not value:
+        return False
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+_ENABLED: bool = _as_bool(os.getenv("COOKIE_CACHE_ENABLED"))
+CHANNEL: str = os.getenv("COOKIE_CACHE_CHANNEL", "cookies:updates")
+_WAIT_TIMEOUT: float = float(os.getenv("COOKIE_WAIT_TIMEOUT", "60"))
+_TTL: float = float(os.getenv("COOKIE_CACHE_TTL", "300"))
+# Что: как часто перечитывать ключ во время ожидания, если событие потерялось
+_RECHECK: float = float(os.getenv("COOKIE_WAIT_RECHECK", "5"))
+_LOG_FILE: str = os.getenv("COOKIE_CACHE_LOG_FILE", "cookie_cache.log")
+
+_logger = logging.getLogger("cookie_cache")
+if not _logger.handlers:
+    _handler = logging.FileHandler(_LOG_FILE, encoding="utf-8")
+    _handler.setFormatter(logging.Formatter(
+        fmt="%(asctime)s | %(levelname)s | %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    ))
+    _logger.addHandler(_handler)
+_logger.setLevel(logging.INFO)
+_logger.propagate = False
+
+
+class CookiesUnavailable(Exception):
+    def __init__(self, server: str, timeout: float) -> None:
+        super().__init__(server, timeout)
+        self.server = server
+        self.timeout = timeout
+
+    def __str__(self) -> str:
+        return f"no cookies for proxy {self.server} after {self.timeout:g}s"
+
+
+@dataclass(slots=True)
+class _Entry:
+    cookies: Optional[dict[str, str]] = None
+    loaded_at: float = 0.0
+    # Что: растёт на каждом событии; Зачем: не сохранить чтение, начатое до инвалидации
+    version: int = 0
+    stored: asyncio.Event = field(default_factory=asyncio.Event)
+
+
+_entries: dict[str, _Entry] = {}
+
+
+def enabled() -> bool:
+    return _ENABLED
+
+
+def _entry(server: str) -> _Entry:
+    entry = _entries.get(server)
+    if entry is None:
+        entry = _entries[server] = _Entry()
+    return entry
+
+
+def parse(data: str | bytes) -> dict[str, str]:
+    """Список cookies Playwright из Redis → {name: value} (заглушка '{}' → {})."""
+    return {item['name']: item['value'] for item in loads(data)}
+
+
+def invalidate(server: str, stored: bool = False) -> None:
+    entry = _entry(server)
+    entry.version += 1
+    entry.cookies = None
+    if stored:
+        entry.stored.set()
+        entry.stored = asyncio.Event()
+
+
+async def _load(redis: Redis, server: str) -> Optional[dict[str, str]]:
+    entry = _entry(server)
+    version = entry.version
+    data = await redis.get(server)
+    if data is None:
+        return None
+    cookies = parse(data)
+    if entry.version == version:
+        entry.cookies = cookies
+        entry.loaded_at = monotonic()
+    return cookies
+
+
+async def get(redis: Redis, server: str) -> dict[str, str]:
+    """Cookies прокси: из кэша, иначе из Redis; если их нет — ждём сохранения."""
+    entry = _entry(server)
+    if entry.cookies is not None and monotonic() - entry.loaded_at < _TTL:
+        return entry.cookies
+    cookies = await _load(redis, server)
+    if cookies is not None:
+        return cookies
+    started = monotonic()
+    while True:
+        left = _WAIT_TIMEOUT - (monotonic() - started)
+        if left <= 0:
+            _logger.warning("wait timeout proxy=%s timeout=%s", server, _WAIT_TIMEOUT)
+            raise CookiesUnavailable(server, _WAIT_TIMEOUT)
+        try:
+            await asyncio.wait_for(_entry(server).stored.wait(), timeout=min(left, _RECHECK))
+        except asyncio.TimeoutError:
+            pass
+        cookies = await _load(redis, server)
+        if cookies is not None:
+            _logger.info("cookies ready proxy=%s waited=%.2fs", server, monotonic() - started)
+            return cookies
+
+
+async def publish(redis: Redis, server: str, kind: str) -> None:
+    """Сообщает воркерам, что cookies прокси сохранены (set) или удалены (delete)."""
+    try:
+        await redis.publish(CHANNEL, json.dumps({"server": server, "kind": kind}))
+    except Exception as ex:
+        _logger.warning("publish failed proxy=%s kind=%s err=%s", server, kind, ex)
+
+
+async def _listen(redis: Redis) -> None:
+    _logger.info("subscriber started channel=%s", CHANNEL)
+    try:
+        while True:
+            pubsub = redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(CHANNEL)
+                # Что: пока не были подписаны, события могли пройти мимо
+                for server in list(_entries):
+                    invalidate(server)
+                async for message in pubsub.listen():
+                    try:
+                        event = json.loads(message["data"])
+                        invalidate(event["server"], stored=event.get("kind") == "set")
+                    except Exception as ex:
+                        _logger.warning("bad message data=%r err=%s", message.get("data"), ex)
+            except asyncio.CancelledError:
+                raise
+            except Exception as ex:
+                _logger.warning("subscriber error err=%s", ex)
+                await asyncio.sleep(1)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+    except asyncio.CancelledError:
+        _logger.info("subscriber cancelled")
+        raise
+
+
+def start(redis: Redis) -> Optional[asyncio.Task[None]]:
+    """Создаёт фоновую подписку на события cookies. Возвращает task или None, если отключено."""
+    if not _ENABLED:
+        return None
+    return asyncio.create_task(_listen(redis))
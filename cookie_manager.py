@@ -0,0 +1,289 @@
+"""Запас cookies по прокси и их обновление до блокировки.
+
+COOKIE_MANAGER_ENABLED=1 — cookies добываются не только после «Pardon Our
+Interruption». Управляющий процесс (main / main_excel):
+  * при старте ставит решение challenge для всех прокси сразу (вместо
+    заглушки '{}'), страница — COOKIE_WARM_URL;
+  * раз в COOKIE_MANAGER_INTERVAL секунд держит для каждого прокси запас
+    из COOKIE_INVENTORY_SIZE свежих наборов cookies (решения «в запас» —
+    task_execute со stock=True, через пул браузеров, если он включён, и под
+    той же арендой challenge_lease, что решения после блокировки; если
+    прокси заблокирован, пока решение «в запас» идёт, набор сразу уходит
+    в работу) и выбрасывает наборы старше COOKIE_INVENTORY_MAX_AGE;
+  * заменяет рабочие cookies запасными, когда их возраст дошёл до
+    COOKIE_REFRESH_RATIO от ожидаемого срока жизни.
+Срок жизни — скользящее среднее возраста cookies в момент блокировки
+(до первой блокировки — COOKIE_LIFETIME). При блокировке воркер каталога
+сразу ставит запасной набор (один раз на прокси за COOKIE_SWAP_WINDOW мс —
+остальные заблокированные запросы просто повторяют), и только если запаса
+нет — ставит решение challenge, как раньше.
+
+Ключи redis_session (db4):
+  cookie_manager:<server>          hash refreshed_at, blocks, lifetime
+  cookie_inventory:<server>        list "<время решения>|<cookies JSON>", новые слева
+  cookie_manager:pending:<server>  решение «в запас» уже поставлено
+  cookie_manager:swap:<server>     замена после блокировки уже сделана ("1") или запаса нет ("0")
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections import Counter
+from json import dumps
+from typing import Any, Awaitable, Callable, Iterable, Optional
+
+from redis.asyncio import Redis
+
+
+def _as_bool(value: Optional[str]) -> bool:
+    if not value:
+        return False
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+_ENABLED: bool = _as_bool(os.getenv("COOKIE_MANAGER_ENABLED"))
+WARM_URL: str = os.getenv("COOKIE_WARM_URL", "https://www.ebay.com/")
+_INTERVAL: float = float(os.getenv("COOKIE_MANAGER_INTERVAL", "30"))
+_INVENTORY_SIZE: int = max(int(os.getenv("COOKIE_INVENTORY_SIZE", "1")), 0)
+_INVENTORY_MAX_AGE: float = float(os.getenv("COOKIE_INVENTORY_MAX_AGE", "3600"))
+_LIFETIME: float = float(os.getenv("COOKIE_LIFETIME", "1800"))
+_REFRESH_RATIO: float = float(os.getenv("COOKIE_REFRESH_RATIO", "0.8"))
+# Что: вес последней блокировки в скользящем среднем срока жизни
+_ALPHA: float = float(os.getenv("COOKIE_LIFETIME_ALPHA", "0.3"))
+_STOCK_TTL: int = int(os.getenv("COOKIE_STOCK_TTL", "300"))
+_SWAP_WINDOW: int = int(os.getenv("COOKIE_SWAP_WINDOW", "5000"))
+_LOG_FILE: str = os.getenv("COOKIE_MANAGER_LOG_FILE", "cookie_manager.log")
+
+_logger = logging.getLogger("cookie_manager")
+if not _logger.handlers:
+    _handler = logging.FileHandler(_LOG_FILE, encoding="utf-8")
+    _handler.setFormatter(logging.Formatter(
+        fmt="%(asctime)s | %(levelname)s | %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    ))
+    _logger.addHandler(_handler)
+_logger.setLevel(logging.INFO)
+_logger.propagate = False
+
+# Что: взять самый свежий запасной набор и сделать его рабочим
+# KEYS: cookies прокси, state, inventory; ARGV: now, max_age
+# Возвращает 1 — заменили, 0 — запаса нет
+_ROTATE = """
+while true do
+    local spare = redis.call('LPOP', KEYS[3])
+    if not spare then
+        return 0
+    end
+    local sep = string.find(spare, '|', 1, true)
+    local at = tonumber(string.sub(spare, 1, sep - 1))
+    if tonumber(ARGV[1]) - at <= tonumber(ARGV[2]) then
+        redis.call('SET', KEYS[1], string.sub(spare, sep + 1))
+        redis.call('HSET', KEYS[2], 'refreshed_at', at)
+        return 1
+    end
+end
+"""
+# Что: блокировка — учесть возраст cookies и заменить их запасными, один раз на окно
+# KEYS: cookies прокси, state, inventory, swap; ARGV: now, max_age, alpha, lifetime, window_ms
+# Возвращает 1 — заменили, 0 — запаса нет, нужно решать challenge;
+# 3 / 2 — то же, но решено другим запросом в пределах окна
+_BLOCK = """
+local done = redis.call('GET', KEYS[4])
+if done then
+    return tonumber(done) + 2
+end
+local now = tonumber(ARGV[1])
+local at = tonumber(redis.call('HGET', KEYS[2], 'refreshed_at') or '0')
+redis.call('HINCRBY', KEYS[2], 'blocks', 1)
+redis.call('HSET', KEYS[2], 'blocked_at', now)
+if at > 0 then
+    local age = now - at
+    local lifetime = tonumber(redis.call('HGET', KEYS[2], 'lifetime') or ARGV[4])
+    local alpha = tonumber(ARGV[3])
+    redis.call('HSET', KEYS[2], 'lifetime', alpha * age + (1 - alpha) * lifetime)
+end
+local swapped = 0
+while true do
+    local spare = redis.call('LPOP', KEYS[3])
+    if not spare then
+        break
+    end
+    local sep = string.find(spare, '|', 1, true)
+    local spare_at = tonumber(string.sub(spare, 1, sep - 1))
+    if now - spare_at <= tonumber(ARGV[2]) then
+        redis.call('SET', KEYS[1], string.sub(spare, sep + 1))
+        redis.call('HSET', KEYS[2], 'refreshed_at', spare_at)
+        swapped = 1
+        break
+    end
+end
+redis.call('SET', KEYS[4], swapped, 'PX', ARGV[5])
+return swapped
+"""
+
+_metrics: Counter[str] = Counter()
+
+
+def enabled() -> bool:
+    return _ENABLED
+
+
+def _state(server: str) -> str:
+    return f"cookie_manager:{server}"
+
+
+def _inventory(server: str) -> str:
+    return f"cookie_inventory:{server}"
+
+
+def _pending(server: str) -> str:
+    return f"cookie_manager:pending:{server}"
+
+
+def _swap(server: str) -> str:
+    return f"cookie_manager:swap:{server}"
+
+
+async def refreshed(redis: Redis, proxy: Any) -> None:
+    """Отмечает, что рабочие cookies прокси только что получены."""
+    if not _ENABLED:
+        return
+    try:
+        await redis.hset(_state(proxy['server']), "refreshed_at", time.time())
+    except Exception as ex:
+        _logger.warning("refreshed failed proxy=%s err=%s", proxy['server'], ex)
+
+
+async def stock(redis: Redis, proxy: Any, cookies: list[dict]) -> None:
+    """Кладёт набор cookies, полученный «в запас», в инвентарь прокси."""
+    server = proxy['server']
+    async with redis.pipeline(transaction=True) as pipe:
+        pipe.lpush(_inventory(server), f"{time.time()}|{dumps(cookies)}")
+        pipe.ltrim(_inventory(server), 0, max(_INVENTORY_SIZE, 1) - 1)
+        pipe.delete(_pending(server))
+        await pipe.execute()
+    _logger.info("stocked proxy=%s cookies=%s", server, len(cookies))
+
+
+async def on_block(
+    redis: Redis,
+    proxy: Any,
+    on_swap: Callable[[Any], Awaitable[Any]],
+) -> bool:
+    """Блокировка на прокси: True, если рабочие cookies уже заменены запасными.
+
+    on_swap вызывается один раз — тем запросом, который заменил cookies.
+    """
+    if not _ENABLED:
+        return False
+    server = proxy['server']
+    try:
+        swapped = await redis.eval(
+            _BLOCK, 4,
+            server, _state(server), _inventory(server), _swap(server),
+            time.time(), _INVENTORY_MAX_AGE, _ALPHA, _LIFETIME, _SWAP_WINDOW,
+        )
+    except Exception as ex:
+        _logger.warning("block failed proxy=%s err=%s", server, ex)
+        return False
+    if swapped in (0, 1):
+        _logger.info("block proxy=%s swapped=%s", server, bool(swapped))
+    if swapped == 1:
+        await on_swap(proxy)
+    return swapped in (1, 3)
+
+
+async def _tick(
+    redis: Redis,
+    proxies: Iterable[Any],
+    enqueue_stock: Callable[[Any], Awaitable[Any]],
+    on_rotate: Callable[[Any], Awaitable[Any]],
+) -> None:
+    proxies = list(proxies)
+    async with redis.pipeline(transaction=False) as pipe:
+        for proxy in proxies:
+            pipe.hgetall(_state(proxy['server']))
+            pipe.llen(_inventory(proxy['server']))
+        replies = await pipe.execute()
+    now = time.time()
+    for index, proxy in enumerate(proxies):
+        server = proxy['server']
+        state = {key.decode(): float(value) for key, value in replies[2 * index].items()}
+        stocked = replies[2 * index + 1]
+        if stocked < _INVENTORY_SIZE and await redis.set(_pending(server), 1, nx=True, ex=_STOCK_TTL):
+            if await enqueue_stock(proxy) is False:
+                # Что: на прокси уже идёт решение — поставим в следующий раз
+                await redis.delete(_pending(server))
+                _metrics["stock_skipped"] += 1
+            else:
+                _metrics["stock_enqueued"] += 1
+        refreshed_at = state.get("refreshed_at")
+        lifetime = state.get("lifetime", _LIFETIME)
+        if refreshed_at and stocked and now - refreshed_at >= _REFRESH_RATIO * lifetime:
+            rotated = await redis.eval(
+                _ROTATE, 3,
+                server, _state(server), _inventory(server),
+                now, _INVENTORY_MAX_AGE,
+            )
+            if rotated:
+                _metrics["rotated"] += 1
+                _logger.info(
+                    "rotate proxy=%s age=%.0fs lifetime=%.0fs",
+                    server, now - refreshed_at, lifetime,
+                )
+                await on_rotate(proxy)
+
+
+async def prewarm(
+    redis: Redis,
+    proxies: Iterable[Any],
+    enqueue_live: Callable[[Any], Awaitable[Any]],
+) -> None:
+    """Ставит решение challenge для всех прокси без cookies, параллельно."""
+    missing = []
+    for proxy in proxies:
+        data = await redis.get(proxy['server'])
+        if not data or data == b'{}':
+            missing.append(proxy)
+    await asyncio.gather(*(enqueue_live(proxy) for proxy in missing))
+    _logger.info("prewarm proxies=%s", len(missing))
+
+
+async def _loop(
+    redis: Redis,
+    proxies: list[Any],
+    enqueue_stock: Callable[[Any], Awaitable[Any]],
+    on_rotate: Callable[[Any], Awaitable[Any]],
+) -> None:
+    _logger.info(
+        "cookie manager started proxies=%s interval=%s inventory=%s",
+        len(proxies), _INTERVAL, _INVENTORY_SIZE,
+    )
+    try:
+        while True:
+            try:
+                await _tick(redis, proxies, enqueue_stock, on_rotate)
+            except Exception as ex:
+                _logger.warning("tick failed err=%s", ex)
+            if _metrics:
+                _logger.info("metrics %s", " ".join(f"{k}={v}" for k, v in sorted(_metrics.items())))
+                _metrics.clear()
+            await asyncio.sleep(_INTERVAL)
+    except asyncio.CancelledError:
+        _logger.info("cookie manager cancelled")
+        raise
+
+
+def start(
+    redis: Redis,
+    proxies: list[Any],
+    enqueue_stock: Callable[[Any], Awaitable[Any]],
+    on_rotate: Callable[[Any], Awaitable[Any]],
+) -> Optional[asyncio.Task[None]]:
+    """Создаёт фоновую задачу управляющего. Возвращает task или None, если отключено."""
+    if not _ENABLED:
+        return None
+    return asyncio.create_task(_loop(redis, proxies, enqueue_stock, on_rotate))
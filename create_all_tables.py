@@ -41,9 +41,14 @@ async def create_all_tables():
                 datetime_iso TIMESTAMP WITH TIME ZONE,
                 cycle INTEGER DEFAULT 0,
                 archive BOOLEAN DEFAULT FALSE,
-                not_actual BOOLEAN DEFAULT FALSE
+                not_actual BOOLEAN DEFAULT FALSE,
+                source VARCHAR(16) DEFAULT 'item'
             );
         """))
+        # Что: 'card' — строка из карточки каталога (catalog_ingest), 'item' — из /itm/
+        await conn.execute(text("""
+            ALTER TABLE ebay ADD COLUMN IF NOT EXISTS source VARCHAR(16) DEFAULT 'item';
+        """))
         print("✓ Таблица ebay")
 
         # 3. Таблица ebay_input
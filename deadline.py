@@ -0,0 +1,113 @@
+"""Бюджеты времени задачи каталога и их передача вниз по стадиям.
+
+TASK_DEADLINE_ENABLED=1 — у задачи task_collect_loop общий бюджет
+TASK_BUDGET секунд. Крайний срок лежит в ContextVar и доходит до всех
+вложенных стадий (в том числе до товаров, запущенных product_fetcher):
+  * stage("item", ITEM_BUDGET) — один товар со всеми повторами;
+  * stage("commit", COMMIT_BUDGET) — ожидание записи товара в БД;
+  * request_kwargs() — ClientTimeout запроса: connect REQUEST_CONNECT_TIMEOUT,
+    чтение сокета REQUEST_READ_TIMEOUT, всего не больше REQUEST_TIMEOUT и
+    не дольше, чем осталось у объемлющей стадии.
+Стадия, вышедшая за срок, прерывается с DeadlineExceeded; задача, у которой
+кончился общий бюджет, ставится в очередь заново (не больше
+DEADLINE_MAX_REQUEUES раз).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Optional
+
+from aiohttp import ClientTimeout
+
+
+def _as_bool(value: Optional[str]) -> bool:
+    if not value:
+        return False
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+_ENABLED: bool = _as_bool(os.getenv("TASK_DEADLINE_ENABLED"))
+TASK_BUDGET: float = float(os.getenv("TASK_BUDGET", "900"))
+ITEM_BUDGET: float = float(os.getenv("ITEM_BUDGET", "120"))
+COMMIT_BUDGET: float = float(os.getenv("COMMIT_BUDGET", "60"))
+_REQUEST_TIMEOUT: float = float(os.getenv("REQUEST_TIMEOUT", "60"))
+_CONNECT_TIMEOUT: float = float(os.getenv("REQUEST_CONNECT_TIMEOUT", "10"))
+_READ_TIMEOUT: float = float(os.getenv("REQUEST_READ_TIMEOUT", "30"))
+MAX_REQUEUES: int = int(os.getenv("DEADLINE_MAX_REQUEUES", "1"))
+_LOG_FILE: str = os.getenv("DEADLINE_LOG_FILE", "deadline.log")
+
+_logger = logging.getLogger("deadline")
+if not _logger.handlers:
+    _handler = logging.FileHandler(_LOG_FILE, encoding="utf-8")
+    _handler.setFormatter(logging.Formatter(
+        fmt="%(asctime)s | %(levelname)s | %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    ))
+    _logger.addHandler(_handler)
+_logger.setLevel(logging.INFO)
+_logger.propagate = False
+
+# Что: крайний срок текущей стадии во времени event loop (loop.time())
+_deadline: ContextVar[Optional[float]] = ContextVar("task_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    def __init__(self, stage: str, budget: float) -> None:
+        super().__init__(stage, budget)
+        self.stage = stage
+        self.budget = budget
+
+    def __str__(self) -> str:
+        return f"stage {self.stage!r} exceeded its {self.budget:g}s budget"
+
+
+def enabled() -> bool:
+    return _ENABLED
+
+
+def remaining() -> Optional[float]:
+    """Сколько секунд осталось до крайнего срока (None — срока нет)."""
+    limit = _deadline.get()
+    if limit is None:
+        return None
+    return max(limit - asyncio.get_running_loop().time(), 0.0)
+
+
+@asynccontextmanager
+async def stage(name: str, budget: float, label: Any = None) -> AsyncIterator[None]:
+    """Стадия со своим бюджетом, но не дольше объемлющей."""
+    if not _ENABLED or budget <= 0:
+        yield
+        return
+    limit = asyncio.get_running_loop().time() + budget
+    parent = _deadline.get()
+    if parent is not None:
+        limit = min(limit, parent)
+    token = _deadline.set(limit)
+    try:
+        async with asyncio.timeout_at(limit) as timeout:
+            try:
+                yield
+            finally:
+                _deadline.reset(token)
+    except TimeoutError:
+        if not timeout.expired():
+            raise
+        _logger.warning("deadline stage=%s budget=%gs label=%s", name, budget, label)
+        raise DeadlineExceeded(name, budget) from None
+
+
+def request_kwargs() -> dict[str, Any]:
+    """Аргументы session.get(): ClientTimeout в пределах оставшегося бюджета."""
+    if not _ENABLED:
+        return {}
+    total = _REQUEST_TIMEOUT
+    left = remaining()
+    if left is not None:
+        total = min(total, max(left, 0.001))
+    return {"timeout": ClientTimeout(total=total, sock_connect=_CONNECT_TIMEOUT, sock_read=_READ_TIMEOUT)}
@@ -0,0 +1,213 @@
+"""Выборочная диагностика страниц товара (замена xpath_debug и html_text_logger).
+
+DIAG_SAMPLE_RATE — доля товаров (0..1), для которых снимаются данные; по
+умолчанию 0 — выключено. DIAG_ITEM_IDS — item_id через запятую, которые
+снимаются всегда. Для выбранных товаров пишутся те же файлы и строки, что
+раньше: `html_text.log` (`<item_id> - <первые 100 символов текста>`) и
+`xpath_debug.log` (`<item_id> - <значение|NONE>`).
+
+Текст берётся из уже построенного дерева lxml (обход с ранней остановкой)
+или из сырого HTML, если дерево не строилось. Строки копятся в памяти и
+сбрасываются на диск фоновой задачей через asyncio.to_thread.
+
+DIAG_CAPTURE_DIR — если задан, для выбранных страниц сохраняется и сырой
+ответ: <dir>/item/<item_id>.html, <dir>/catalog/<query>_<page>.html
+(корпус для parser_bench, см. parser_bench/capture.py).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import html
+import os
+import random
+import re
+from pathlib import Path
+from typing import Iterator, Optional
+
+from lxml import etree
+
+_SAMPLE_RATE: float = float(os.getenv("DIAG_SAMPLE_RATE", "0") or 0)
+_ITEM_IDS: frozenset[str] = frozenset(
+    chunk.strip() for chunk in os.getenv("DIAG_ITEM_IDS", "").split(",") if chunk.strip()
+)
+_FLUSH_INTERVAL: float = float(os.getenv("DIAG_FLUSH_INTERVAL", "2"))
+_MAX_BUFFER: int = int(os.getenv("DIAG_MAX_BUFFER", "10000"))
+_CAPTURE_DIR: Optional[Path] = (
+    Path(os.environ["DIAG_CAPTURE_DIR"]) if os.getenv("DIAG_CAPTURE_DIR") else None
+)
+_SAFE_NAME_RE = re.compile(r"[^A-Za-z0-9._-]+")
+
+_BASE_DIR = Path(__file__).resolve().parent
+HTML_TEXT_FILE = _BASE_DIR / "html_text.log"
+XPATH_FILE = _BASE_DIR / "xpath_debug.log"
+
+SNIPPET_LIMIT = 100
+# Что: теги, текст которых BeautifulSoup.get_text не отдаёт
+_HIDDEN_TAGS = frozenset({"script", "style", "template"})
+# Что: скрытые блоки, комментарии и теги одним выражением; Зачем: ленивый finditer
+_RAW_MARKUP_RE = re.compile(
+    r"<(script|style|template)\b.*?</\1\s*>|<!--.*?-->|<[^>]*>", re.IGNORECASE | re.DOTALL
+)
+
+_buffer: dict[Path, list[str]] = {}
+_pages: dict[Path, bytes] = {}
+_flush_task: Optional[asyncio.Task] = None
+
+
+def enabled() -> bool:
+    return _SAMPLE_RATE > 0 or bool(_ITEM_IDS)
+
+
+def should_capture(item_id: str) -> bool:
+    """Решает, снимать ли диагностику для товара."""
+    if str(item_id) in _ITEM_IDS:
+        return True
+    return _SAMPLE_RATE > 0 and random.random() < _SAMPLE_RATE
+
+
+def _visible_strings(root: etree._Element) -> Iterator[str]:
+    walker = etree.iterwalk(root, events=("start", "end", "comment", "pi"))
+    for event, el in walker:
+        if event == "start":
+            if el.tag in _HIDDEN_TAGS:
+                walker.skip_subtree()
+            elif el.text:
+                yield el.text
+        elif el.tail:
+            yield el.tail
+
+
+def _collect(strings: Iterator[str], limit: int) -> str:
+    parts: list[str] = []
+    size = 0
+    for chunk in strings:
+        chunk = chunk.strip()
+        if not chunk:
+            continue
+        parts.append(chunk)
+        size += len(chunk) + 1
+        if size > limit:
+            break
+    return " ".join(parts)[:limit]
+
+
+def snippet_from_tree(tree: Optional[etree._Element], limit: int = SNIPPET_LIMIT) -> str:
+    """Начало текста страницы, как у get_text(" ", strip=True), без полного обхода."""
+    if tree is None:
+        return ""
+    return _collect(_visible_strings(tree), limit)
+
+
+def _raw_strings(text: str) -> Iterator[str]:
+    pos = 0
+    for match in _RAW_MARKUP_RE.finditer(text):
+        if match.start() > pos:
+            yield html.unescape(text[pos:match.start()])
+        pos = match.end()
+    if pos < len(text):
+        yield html.unescape(text[pos:])
+
+
+def snippet_from_raw(
+    data: str | bytes,
+    encoding: Optional[str] = None,
+    limit: int = SNIPPET_LIMIT,
+) -> str:
+    """Приблизительный текст из сырого HTML (когда дерево не строилось)."""
+    text = data.decode(encoding or "utf-8", errors="replace") if isinstance(data, bytes) else data
+    return _collect(_raw_strings(text), limit)
+
+
+def _line(item_id: str, value: Optional[str], limit: Optional[int] = None) -> str:
+    raw = (value or "").replace("\n", " ").strip()
+    if limit is not None:
+        raw = raw[:limit]
+    return f"{item_id} - {raw if raw else 'NONE'}\n"
+
+
+def _append(path: Path, line: str) -> None:
+    lines = _buffer.setdefault(path, [])
+    if len(lines) < _MAX_BUFFER:
+        lines.append(line)
+    _ensure_flusher()
+
+
+def record(item_id: str, page_text: Optional[str], xpath_value: Optional[str]) -> None:
+    """Ставит в буфер строки для html_text.log и xpath_debug.log."""
+    _append(HTML_TEXT_FILE, _line(item_id, page_text, SNIPPET_LIMIT))
+    _append(XPATH_FILE, _line(item_id, xpath_value))
+
+
+def capture_enabled() -> bool:
+    return _CAPTURE_DIR is not None
+
+
+def capture_page(kind: str, name: str, body: bytes) -> None:
+    """Ставит в буфер сырой ответ (kind: item|catalog), если задан DIAG_CAPTURE_DIR."""
+    if _CAPTURE_DIR is None or len(_pages) >= _MAX_BUFFER:
+        return
+    safe = _SAFE_NAME_RE.sub("_", name).strip("_") or "page"
+    _pages[_CAPTURE_DIR / kind / f"{safe}.html"] = body
+    _ensure_flusher()
+
+
+def _write(batch: dict[Path, list[str]], pages: dict[Path, bytes]) -> None:
+    for path, lines in batch.items():
+        try:
+            with path.open("a", encoding="utf-8") as handle:
+                handle.writelines(lines)
+        except Exception:
+            pass
+    for path, body in pages.items():
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(body)
+        except Exception:
+            pass
+
+
+def _take() -> tuple[dict[Path, list[str]], dict[Path, bytes]]:
+    global _buffer, _pages
+    batch, pages = _buffer, _pages
+    _buffer, _pages = {}, {}
+    return batch, pages
+
+
+async def flush() -> None:
+    """Сбрасывает накопленные строки и страницы на диск в отдельном потоке."""
+    if not any(_buffer.values()) and not _pages:
+        return
+    await asyncio.to_thread(_write, *_take())
+
+
+async def _flush_loop() -> None:
+    while True:
+        await asyncio.sleep(_FLUSH_INTERVAL)
+        await flush()
+
+
+def _ensure_flusher() -> None:
+    global _flush_task
+    if _flush_task is not None and not _flush_task.done():
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # Что: вне event loop пишем сразу; Зачем: строки не должны теряться
+        _write(*_take())
+        return
+    _flush_task = loop.create_task(_flush_loop())
+
+
+async def aclose() -> None:
+    """Останавливает фоновый сброс и дописывает остаток буфера."""
+    global _flush_task
+    task, _flush_task = _flush_task, None
+    if task is not None:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    await flush()
@@ -0,0 +1,231 @@
+"""Быстрый путь: поля товара из встроенных JSON-блоков страницы без DOM.
+
+Источники (по порядку):
+  - <script type="application/ld+json"> c @type=Product (title, цена, доставка,
+    mpn, продавец, additionalProperty → item specifics и бренд из «Brand»);
+  - подпись состояния из блока x-item-condition-text — как её пишет eBay
+    (Pre-owned, Open box, ...);
+  - модель страницы `"price":["..."]` (раньше её читал HtmlParse2);
+  - textSpans модели с "Located in ...";
+  - <meta name="description"> из <head>.
+
+Поля, которые не удалось заполнить, добирает DOM-парсер (product_extractor).
+itemCondition и brand из ld+json не используются: schema.org схлопывает
+подписи eBay (Pre-owned, Open box → Used), а brand бывает не тем, что
+показан в item specifics. Если JSON закрыл все поля, дерево lxml не строится.
+Поиск идёт по байтам ответа; декодируются только найденные фрагменты.
+Счётчики покрытия пишутся в отдельный лог, чтобы видеть, как часто нужен fallback.
+"""
+
+from __future__ import annotations
+
+import html
+import json
+import logging
+import os
+import re
+from collections import Counter
+from typing import Any, Iterable, Iterator, Optional
+
+
+def _as_bool(value: Optional[str]) -> bool:
+    if not value:
+        return False
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+_ENABLED: bool = _as_bool(os.getenv("PRODUCT_JSON_FAST_PATH"))
+_STATS_EVERY: int = int(os.getenv("PRODUCT_JSON_STATS_EVERY", "100"))
+_LOG_FILE: str = os.getenv("PRODUCT_JSON_LOG_FILE", "embedded_json.log")
+
+_LD_MARKER = b"application/ld+json"
+_LEGACY_PRICE_RE = re.compile(rb'"price":\["(.*?)"')
+_LOCATED_RE = re.compile(rb'"text":"(Located in(?:[^"\\]|\\.)*)"')
+# Что: первый текст внутри блока состояния (вложенные div/span пропускаем)
+_CONDITION_RE = re.compile(rb'x-item-condition-text[^>]*>\s*(?:<(?:div|span)\b[^>]*>\s*)+([^<]+)')
+# Что: те же подписи, что у DOM-правила brand (dt начинается с Brand/Hersteller)
+_BRAND_NAMES = ("brand", "hersteller")
+_META_TAG_RE = re.compile(rb"<meta\b([^>]*)>", re.IGNORECASE)
+_ATTR_RE = re.compile(rb"""([^\s=/>]+)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""")
+
+_HITS: Counter[str] = Counter()
+_FALLBACKS: Counter[str] = Counter()
+_PAGES = 0
+
+_logger = logging.getLogger("embedded_json")
+if not _logger.handlers:
+    _handler = logging.FileHandler(_LOG_FILE, encoding="utf-8")
+    _handler.setFormatter(logging.Formatter(
+        fmt="%(asctime)s | %(levelname)s | %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    ))
+    _logger.addHandler(_handler)
+_logger.setLevel(logging.INFO)
+_logger.propagate = False
+
+
+def enabled() -> bool:
+    return _ENABLED
+
+
+def _as_bytes(data: str | bytes, encoding: Optional[str]) -> tuple[bytes, str]:
+    # Что: str (старые вызовы, бенчмарки) кодируем один раз; bytes идут как есть
+    if isinstance(data, str):
+        return data.encode("utf-8"), "utf-8"
+    return data, encoding or "utf-8"
+
+
+def _decode(chunk: bytes, encoding: str) -> str:
+    try:
+        return chunk.decode(encoding, errors="replace")
+    except LookupError:
+        return chunk.decode("utf-8", errors="replace")
+
+
+def _ld_blocks(data: bytes, encoding: str) -> Iterator[Any]:
+    pos = 0
+    while True:
+        marker = data.find(_LD_MARKER, pos)
+        if marker < 0:
+            return
+        start = data.find(b">", marker)
+        end = data.find(b"</script>", start)
+        if start < 0 or end < 0:
+            return
+        pos = end
+        try:
+            yield json.loads(_decode(data[start + 1:end], encoding))
+        except ValueError:
+            continue
+
+
+def _iter_nodes(data: Any) -> Iterator[dict]:
+    if isinstance(data, list):
+        for item in data:
+            yield from _iter_nodes(item)
+    elif isinstance(data, dict):
+        yield data
+        yield from _iter_nodes(data.get("@graph"))
+
+
+def _is_product(node: dict) -> bool:
+    kind = node.get("@type")
+    if isinstance(kind, list):
+        return "Product" in kind
+    return kind == "Product"
+
+
+def _first(value: Any) -> Any:
+    if isinstance(value, list):
+        return value[0] if value else None
+    return value
+
+
+def _name(value: Any) -> Optional[str]:
+    value = _first(value)
+    if isinstance(value, dict):
+        value = value.get("name")
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _from_product(node: dict) -> dict[str, Any]:
+    found: dict[str, Any] = {}
+    if (title := _name(node.get("name"))):
+        found["title"] = title
+    if (mpn := _name(node.get("mpn"))):
+        found["mpn"] = mpn
+    offer = _first(node.get("offers"))
+    if isinstance(offer, dict):
+        price = offer.get("price")
+        if price not in (None, ""):
+            found["price_without_delivery"] = str(price)
+        if (seller := _name(offer.get("seller"))):
+            found["seller"] = seller
+        shipping = _first(offer.get("shippingDetails"))
+        if isinstance(shipping, dict):
+            rate = _first(shipping.get("shippingRate"))
+            if isinstance(rate, dict) and rate.get("value") not in (None, ""):
+                found["delivery"] = str(rate["value"])
+    specifics = []
+    for prop in node.get("additionalProperty") or ():
+        if isinstance(prop, dict) and prop.get("name") and prop.get("value") is not None:
+            specifics.append((str(prop["name"]).strip(), str(prop["value"]).strip()))
+    if specifics:
+        found["specifics"] = specifics
+        for name, value in specifics:
+            if name.lower().startswith(_BRAND_NAMES) and value:
+                found["brand"] = value
+                break
+    return {key: value for key, value in found.items() if value is not None}
+
+
+def meta_description(data: str | bytes, encoding: Optional[str] = None) -> Optional[str]:
+    """content первого <meta name="description"> в <head> (None, если тега нет)."""
+    data, encoding = _as_bytes(data, encoding)
+    head_end = data.find(b"</head>")
+    head = data if head_end < 0 else data[:head_end]
+    for tag in _META_TAG_RE.finditer(head):
+        attrs: dict[bytes, bytes] = {}
+        for attr in _ATTR_RE.finditer(tag.group(1)):
+            value = attr.group(2) if attr.group(2) is not None else attr.group(3)
+            if value is None:
+                value = attr.group(4)
+            attrs.setdefault(attr.group(1).lower(), value)
+        if attrs.get(b"name") == b"description":
+            content = attrs.get(b"content")
+            return None if content is None else html.unescape(_decode(content, encoding))
+    return None
+
+
+def extract(data: str | bytes, encoding: Optional[str] = None) -> dict[str, Any]:
+    """Возвращает найденные поля (имена как в ProductRecord); пустые не включаются."""
+    data, encoding = _as_bytes(data, encoding)
+    found: dict[str, Any] = {}
+    for block in _ld_blocks(data, encoding):
+        for node in _iter_nodes(block):
+            if _is_product(node):
+                for key, value in _from_product(node).items():
+                    found.setdefault(key, value)
+    if "price_without_delivery" not in found:
+        match = _LEGACY_PRICE_RE.search(data)
+        if match and match.group(1):
+            found["price_without_delivery"] = _decode(match.group(1), encoding)
+    match = _CONDITION_RE.search(data)
+    if match and (condition := html.unescape(_decode(match.group(1), encoding)).strip()):
+        found["condition"] = condition
+    match = _LOCATED_RE.search(data)
+    if match:
+        try:
+            found["location"] = json.loads(f'"{_decode(match.group(1), encoding)}"').strip()
+        except ValueError:
+            pass
+    description = meta_description(data, encoding)
+    if description is not None:
+        found["short_description"] = description
+    return found
+
+
+def account(filled: Iterable[str], missing: Iterable[str]) -> None:
+    """Учитывает, какие поля закрыл JSON, а какие ушли в DOM; периодически пишет сводку."""
+    global _PAGES
+    _PAGES += 1
+    _HITS.update(filled)
+    _FALLBACKS.update(missing)
+    if _STATS_EVERY > 0 and _PAGES % _STATS_EVERY == 0:
+        # Что: pid в строке; Зачем: при parse_pool счётчики свои в каждом процессе
+        _logger.info("coverage pid=%s pages=%s %s", os.getpid(), _PAGES, _format(coverage()))
+
+
+def coverage() -> dict[str, dict[str, int]]:
+    """Снимок счётчиков: поле → {"json": n, "dom": n}."""
+    names = sorted(set(_HITS) | set(_FALLBACKS))
+    return {name: {"json": _HITS[name], "dom": _FALLBACKS[name]} for name in names}
+
+
+def _format(stats: dict[str, dict[str, int]]) -> str:
+    return " ".join(
+        f"{name}=json:{row['json']}/dom:{row['dom']}" for name, row in stats.items()
+    )
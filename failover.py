@@ -0,0 +1,139 @@
+"""Маршрут задачи: текущий прокси и сессия, с переездом на другой прокси.
+
+task_collect_loop передаёт в catalog()/product() не пару (session, proxy),
+а Route: каждая попытка retry заново берёт route.session и route.proxy.
+FAILOVER_ENABLED=1 — после FAILOVER_AFTER неудач подряд (блокировка или
+ошибка запроса) оставшиеся страницы и товары задачи уезжают на другой
+здоровый прокси (сразу, если retry_policy открыл breaker прокси): новая сессия (cookies и zip-код — заново, как у новой
+сессии), темп старого прокси переносится на новый. Старый прокси тем
+временем проходит challenge в Playwright — задача его не ждёт. Не больше
+FAILOVER_MAX_SWITCHES переездов на задачу.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from contextlib import AsyncExitStack
+from typing import Any, AsyncContextManager, Awaitable, Callable, Optional
+
+from aiohttp import ClientSession
+
+
+def _as_bool(value: Optional[str]) -> bool:
+    if not value:
+        return False
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+_ENABLED: bool = _as_bool(os.getenv("FAILOVER_ENABLED"))
+_AFTER: int = max(int(os.getenv("FAILOVER_AFTER", "2")), 1)
+_MAX_SWITCHES: int = int(os.getenv("FAILOVER_MAX_SWITCHES", "2"))
+_LOG_FILE: str = os.getenv("FAILOVER_LOG_FILE", "failover.log")
+
+_logger = logging.getLogger("failover")
+if not _logger.handlers:
+    _handler = logging.FileHandler(_LOG_FILE, encoding="utf-8")
+    _handler.setFormatter(logging.Formatter(
+        fmt="%(asctime)s | %(levelname)s | %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    ))
+    _logger.addHandler(_handler)
+_logger.setLevel(logging.INFO)
+_logger.propagate = False
+
+
+def enabled() -> bool:
+    return _ENABLED
+
+
+class Route:
+    """Прокси и сессия задачи.
+
+    open_session(proxy) — контекст сессии для прокси; pick(exclude) — новый
+    прокси не из exclude (server) или None; on_switch(old, new) — перенос
+    состояния (темп) со старого прокси на новый.
+    """
+
+    def __init__(
+        self,
+        proxy: Any,
+        open_session: Callable[[Any], AsyncContextManager[ClientSession]],
+        pick: Callable[[set[str]], Awaitable[Optional[Any]]],
+        on_switch: Optional[Callable[[Any, Any], None]] = None,
+        label: str = "",
+    ) -> None:
+        self.proxy = proxy
+        self.session: Optional[ClientSession] = None
+        self.switches = 0
+        self.label = label
+        self._open_session = open_session
+        self._pick = pick
+        self._on_switch = on_switch
+        self._failures = 0
+        self._tried: set[str] = {proxy['server']}
+        self._stack = AsyncExitStack()
+        self._lock = asyncio.Lock()
+
+    async def __aenter__(self) -> "Route":
+        self.session = await self._stack.enter_async_context(self._open_session(self.proxy))
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        # Что: сессии всех прокси задачи закрываются только здесь
+        # Зачем: товары в полёте могут ещё дочитывать ответ через старую
+        await self._stack.aclose()
+
+    def ok(self, proxy: Any) -> None:
+        """Успешный запрос через proxy сбрасывает счётчик неудач."""
+        if proxy is self.proxy:
+            self._failures = 0
+
+    async def failed(self, proxy: Any, ex: BaseException) -> None:
+        """Неудачный запрос через proxy; после FAILOVER_AFTER подряд — переезд."""
+        if not _ENABLED or proxy is not self.proxy:
+            # Что: неудача через прокси, с которого уже уехали, не считается
+            return
+        self._failures += 1
+        if self._failures < _AFTER or self.switches >= _MAX_SWITCHES:
+            return
+        async with self._lock:
+            if proxy is not self.proxy:
+                return
+            await self._switch(ex)
+
+    async def abandon(self, proxy: Any, ex: BaseException) -> bool:
+        """Прокси закрыт breaker'ом: переезд сразу, без FAILOVER_AFTER неудач.
+
+        True — задача уже не на proxy, запрос можно повторить.
+        """
+        if _ENABLED and proxy is self.proxy and self.switches < _MAX_SWITCHES:
+            async with self._lock:
+                if proxy is self.proxy:
+                    await self._switch(ex)
+        return proxy is not self.proxy
+
+    async def _switch(self, ex: BaseException) -> None:
+        old = self.proxy
+        failures = self._failures
+        new = await self._pick(set(self._tried))
+        if new is None:
+            _logger.warning("no spare proxy task=%s proxy=%s err=%r", self.label, old['server'], ex)
+            self._failures = 0
+            return
+        session = await self._stack.enter_async_context(self._open_session(new))
+        if self._on_switch is not None:
+            self._on_switch(old, new)
+        self._tried.add(new['server'])
+        self.session, self.proxy = session, new
+        self.switches += 1
+        self._failures = 0
+        _logger.info(
+            "switch task=%s proxy=%s -> proxy=%s failures=%s err=%r",
+            self.label,
+            old['server'],
+            new['server'],
+            failures,
+            ex,
+        )
@@ -0,0 +1,293 @@
+"""Декларативные правила извлечения полей карточки товара и каталога.
+
+Каждое поле — Field: альтернативы селекторов (fallback по порядку, если
+предыдущий ничего не нашёл), способ взять значение и regex-постобработка.
+Селектор — XPath или CSS (префикс "css:"); цепочка (кортеж) применяется
+по шагам к первому найденному узлу. Все правила компилируются один раз при
+импорте в etree.XPath (CSS — через cssselect), так что правка разметки —
+правка данных ниже, а поле стоит одного вызова скомпилированного XPath.
+
+Правила повторяют семантику старых поисков BeautifulSoup:
+  - find(string=...) — первая строка документа, включая комментарии и
+    текст <script>: (/descendant::text()[условие][1] | ...comment()...)[1];
+  - find_next("span") от строки — following::span[1];
+  - Tag.text — видимый текст без комментариев и script/style/template;
+  - class_="x" — вхождение токена в @class.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, Union
+
+from cssselect import HTMLTranslator
+from lxml import etree
+
+Selector = Union[str, tuple[str, ...]]
+
+_UPPER = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+_LOWER = "abcdefghijklmnopqrstuvwxyz"
+_CSS = HTMLTranslator()
+
+# Что: видимый текст узла (аналог Tag.text / get_text в BeautifulSoup)
+_VISIBLE_TEXT = etree.XPath(
+    "descendant::text()[not(ancestor::script) and not(ancestor::style) and not(ancestor::template)]"
+)
+
+
+def has_class(name: str) -> str:
+    """XPath-условие «в @class есть токен name»."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def lower(expr: str = ".", extra: tuple[str, str] = ("", "")) -> str:
+    """XPath-перевод в нижний регистр (ASCII + extra: пары символов для IGNORECASE)."""
+    return f"translate({expr}, '{_UPPER}{extra[0]}', '{_LOWER}{extra[1]}')"
+
+
+def first(step: str) -> str:
+    """Первый узел документа по шагу step ("div[...]", "text()[...]").
+
+    /descendant::x[...][1] libxml2 останавливает на первом совпадении,
+    (//x[...])[1] сначала собирает все — на карточке товара это в разы дольше.
+    """
+    return f"/descendant::{step}[1]"
+
+
+def first_string(condition: str) -> str:
+    """Первая строка документа (текст или комментарий), для которой верно condition."""
+    return f"({first(f'text()[{condition}]')} | {first(f'comment()[{condition}]')})[1]"
+
+
+def first_with_class(tag: str, name: str) -> str:
+    """Первый tag с токеном name в @class (contains(@class) — дешёвый предфильтр)."""
+    return first(f"{tag}[contains(@class, '{name}')][{has_class(name)}]")
+
+
+@dataclass(frozen=True, slots=True)
+class Field:
+    """Одно поле.
+
+    select — альтернативы (XPath/"css:..." или кортеж шагов), берётся первая,
+    которая нашла узел. take — что вернуть из узла:
+      text        видимый текст, strip() (Tag.text.strip());
+      text_raw    видимый текст как есть (Tag.text);
+      text_joined строки через пробел, каждая strip(), пустое → None
+                  (get_text(" ", strip=True));
+      text_tight  то же без разделителя (get_text(strip=True));
+      value       строка/атрибут как есть;
+      string      строка документа, strip() (NavigableString.text.strip());
+      exists      True/False — нашёлся ли узел.
+    pattern — regex (search) по значению, результат — group; нет совпадения → None.
+    many — вернуть список по всем узлам первой сработавшей альтернативы,
+    fields — подполя, считаемые относительно каждого узла (dict на узел).
+    """
+
+    name: str
+    select: tuple[Selector, ...]
+    take: str = "text"
+    pattern: Optional[str] = None
+    group: int = 1
+    many: bool = False
+    fields: tuple["Field", ...] = ()
+
+
+def _compile_step(expr: str) -> etree.XPath:
+    if expr.startswith("css:"):
+        # Что: как select_one у BeautifulSoup — только потомки, без самого узла
+        expr = _CSS.css_to_xpath(expr[4:], prefix="descendant::")
+    return etree.XPath(expr)
+
+
+def _visible(node: Any) -> list[str]:
+    # Что: атрибут/строка из XPath — это уже текст
+    if isinstance(node, str):
+        return [node]
+    return _VISIBLE_TEXT(node)
+
+
+def _take_text(node: Any) -> str:
+    return "".join(_visible(node)).strip()
+
+
+def _take_text_raw(node: Any) -> str:
+    return "".join(_visible(node))
+
+
+def _take_joined(node: Any) -> Optional[str]:
+    text = " ".join(chunk.strip() for chunk in _visible(node) if chunk.strip())
+    return text or None
+
+
+def _take_tight(node: Any) -> Optional[str]:
+    text = "".join(chunk.strip() for chunk in _visible(node))
+    return text or None
+
+
+def _take_value(node: Any) -> str:
+    # Что: комментарий/PI — их текст; строка или атрибут — сами по себе
+    if isinstance(node, etree._Element):
+        return node.text or ""
+    return str(node)
+
+
+_HIDDEN_TEXT = frozenset({"script", "style", "template"})
+
+
+def _take_string(node: Any) -> str:
+    # Что: как NavigableString.text — у комментария и текста script/style/template пусто
+    if not isinstance(node, str) or not hasattr(node, "getparent"):
+        return "" if isinstance(node, etree._Element) else str(node).strip()
+    owner = node.getparent()
+    if owner is not None and node.is_tail:
+        owner = owner.getparent()
+    while owner is not None:
+        if owner.tag in _HIDDEN_TEXT:
+            return ""
+        owner = owner.getparent()
+    return node.strip()
+
+
+_TAKE: dict[str, Callable[[Any], Any]] = {
+    "text": _take_text,
+    "text_raw": _take_text_raw,
+    "text_joined": _take_joined,
+    "text_tight": _take_tight,
+    "value": _take_value,
+    "string": _take_string,
+}
+
+
+class CompiledField:
+    __slots__ = ("name", "_chains", "_take", "_exists", "_pattern", "_group", "_many", "_fields")
+
+    def __init__(self, spec: Field) -> None:
+        self.name = spec.name
+        self._chains = tuple(
+            tuple(_compile_step(step) for step in ((alt,) if isinstance(alt, str) else alt))
+            for alt in spec.select
+        )
+        self._exists = spec.take == "exists"
+        self._take = None if self._exists else _TAKE[spec.take]
+        self._pattern = re.compile(spec.pattern) if spec.pattern else None
+        self._group = spec.group
+        self._many = spec.many
+        self._fields = tuple(CompiledField(sub) for sub in spec.fields)
+
+    def _nodes(self, context: Any) -> list:
+        for chain in self._chains:
+            nodes = chain[0](context)
+            for step in chain[1:]:
+                if not nodes:
+                    break
+                nodes = step(nodes[0])
+            if nodes:
+                return nodes
+        return []
+
+    def _value(self, node: Any) -> Any:
+        if self._fields:
+            return {field.name: field(node) for field in self._fields}
+        value = self._take(node)
+        if self._pattern is not None and value is not None:
+            match = self._pattern.search(value)
+            value = match.group(self._group) if match else None
+        return value
+
+    def __call__(self, context: Any) -> Any:
+        nodes = self._nodes(context)
+        if self._exists:
+            return bool(nodes)
+        if self._many:
+            return [self._value(node) for node in nodes]
+        if not nodes:
+            return None
+        return self._value(nodes[0])
+
+
+class CompiledSpec:
+    """Набор полей, который считается за один вызов по дереву/узлу."""
+
+    def __init__(self, fields: tuple[Field, ...]) -> None:
+        self.fields = tuple(CompiledField(field) for field in fields)
+        self._by_name = {field.name: field for field in self.fields}
+
+    def __call__(self, context: Any) -> dict[str, Any]:
+        return {field.name: field(context) for field in self.fields}
+
+    def __getitem__(self, name: str) -> CompiledField:
+        return self._by_name[name]
+
+
+# --- Карточка товара --------------------------------------------------------
+
+# Что: IGNORECASE у re понимает ı как i и ſ как s — повторяем в translate
+_FOLD = ("ıſ", "is")
+_NEXT_SPAN = "following::span[1]"
+
+PRODUCT_FIELDS: tuple[Field, ...] = (
+    Field("mpn", (
+        first_string(
+            "contains(., 'manufacturer part number') or contains(., 'mpn') or contains(., 'MPN')"
+        ) + "/" + _NEXT_SPAN,
+    )),
+    Field("delivery", (first_string(". = 'Shipping:'") + "/" + _NEXT_SPAN,)),
+    Field("price_without_delivery", (first_with_class("div", "x-price-primary"),)),
+    Field("location", (first_string("contains(., 'Located in')"),), take="string"),
+    Field("brand", ((
+        first("dt[.//text()[{c}] or .//comment()[{c}]]".format(
+            c=f"starts-with({lower(extra=_FOLD)}, 'brand') or starts-with({lower(extra=_FOLD)}, 'hersteller')"
+        )) + "/descendant::span[1]",
+        "(descendant::span | following::span)[1]",
+    ),)),
+    Field("condition", (
+        first_string(f"contains({lower(extra=_FOLD)}, 'condition')") + "/" + _NEXT_SPAN,
+    )),
+    Field("title", (first("h1"),)),
+    Field("seller", (
+        first_with_class("div", "x-sellercard-atf__info__about-seller") + "/descendant::span[1]",
+    )),
+    Field("description_href", (first("iframe[@id = 'desc_ifr']") + "/@src",), take="value"),
+    Field("short_description", (first("meta[@name = 'description']") + "/@content",), take="value"),
+    Field("specifics", ("//dl[descendant::dt and descendant::dd]",), many=True, fields=(
+        Field("name", ("descendant::dt[1]",)),
+        Field("value", ("descendant::dd[1]",)),
+    )),
+    # Что: фиксированный путь из product() для xpath_debug.log (diagnostics)
+    Field("xpath_value", (
+        "/html/body/div[2]/main/div[1]/div[1]/div[4]/div/div/div[2]"
+        "/div/div[1]/div[3]/div[1]/div/div/span",
+    ), take="text_tight"),
+)
+
+# --- Страница поиска и карточка каталога --------------------------------------
+
+CATALOG_PAGE_FIELDS: tuple[Field, ...] = (
+    Field("has_h1", (first("h1"),), take="exists"),
+    Field("count", (first("h1") + "/descendant::span[1]",), take="text_raw"),
+    Field("has_next", (first_with_class("a", "pagination__next"),), take="exists"),
+)
+
+# Что: li карточек — id содержит "item" (как {'id': re.compile('item')})
+CATALOG_ITEMS = etree.XPath("//li[contains(@id, 'item')]")
+
+CATALOG_CARD_FIELDS: tuple[Field, ...] = (
+    Field("href", ("descendant::a[1]/@href",), take="value"),
+    # Что: ник продавца — бейдж seller/store, запасной вариант — вторичные атрибуты
+    Field("seller", (
+        "css:.s-card__program-badge-container--sellerOrStoreInfo .su-styled-text",
+        "css:.su-card-container__attributes__secondary .su-styled-text.primary.large",
+    ), take="text_joined", pattern=r"^([A-Za-z0-9._-]+)"),
+    # Что: классический .s-item__title, новые карточки, запасной путь — aria-label ссылки
+    Field("title", (
+        "css:.s-item__title",
+        "css:.s-card__title, [role='heading']",
+        "descendant::a[1]/@aria-label[. != '']",
+    ), take="text_joined"),
+    Field("price_text", (f"descendant::span[{has_class('s-card__price')}][1]",), take="text_raw"),
+)
+
+PRODUCT_SPEC = CompiledSpec(PRODUCT_FIELDS)
+CATALOG_PAGE_SPEC = CompiledSpec(CATALOG_PAGE_FIELDS)
+CATALOG_CARD_SPEC = CompiledSpec(CATALOG_CARD_FIELDS)
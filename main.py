@@ -4,13 +4,14 @@ import logging
 import re
 import sys
 import uuid
-from asyncio import run, sleep, Task, create_task, CancelledError, get_running_loop
+from asyncio import run, sleep, Lock, Task, create_task, CancelledError, get_running_loop
 from pathlib import Path
-from functools import wraps
+from contextlib import AsyncExitStack, aclosing, asynccontextmanager, nullcontext
+from functools import cached_property, wraps
 from itertools import count, cycle
 from json import dumps, loads
-from time import time
-from typing import Callable, Any, Optional, Self
+from time import monotonic, time
+from typing import AsyncIterator, Callable, Any, Optional, Self
 
 from dotenv import load_dotenv  # Что: загрузка .env; Зачем: получить REDIS_* и прочие настройки
 
@@ -34,7 +35,7 @@ if not TRACK_LOGGER.handlers:
 TRACK_LOGGER.setLevel(logging.INFO)
 TRACK_LOGGER.propagate = False
 
-from aiohttp import ClientResponse, ClientSession, TCPConnector
+from aiohttp import ClientConnectorError, ClientResponse, ClientSession
 from bs4 import BeautifulSoup
 from redis.asyncio import Redis
 from sqlalchemy import text
@@ -78,22 +79,103 @@ try:
 except ImportError:
     import request_log  # type: ignore
 from undetected_playwright.async_api import async_playwright, \
-    ProxySettings, Playwright, Browser, Route, Request
+    ProxySettings, Playwright, Browser, BrowserContext, Route, Request, \
+    TimeoutError as PlaywrightTimeoutError
 try:
     # optional import; used only for pushing to Redis Streams
     from .redis_stream_producer import push_product  # when imported as package
 except Exception:
     from redis_stream_producer import push_product  # type: ignore
 try:
-    from .xpath_debug import record_xpath_value  # type: ignore
-    from .html_text_logger import log_html_text  # type: ignore
+    from . import diagnostics  # type: ignore
 except Exception:
-    from xpath_debug import record_xpath_value  # type: ignore
-    from html_text_logger import log_html_text  # type: ignore
+    import diagnostics  # type: ignore
 try:
-    from .catalog_less_match_guard import should_stop  # package mode
+    from . import stream_abort  # package mode
 except Exception:
-    from catalog_less_match_guard import should_stop  # type: ignore
+    import stream_abort  # type: ignore
+try:
+    from .product_extractor import (  # package mode
+        ProductRecord,
+        extract_product,
+        parse_html,
+        parse_product,
+    )
+except Exception:
+    from product_extractor import (  # type: ignore
+        ProductRecord,
+        extract_product,
+        parse_html,
+        parse_product,
+    )
+try:
+    from . import parse_pool  # package mode
+except Exception:
+    import parse_pool  # type: ignore
+try:
+    from . import catalog_ingest  # package mode
+except Exception:
+    import catalog_ingest  # type: ignore
+try:
+    from . import session_registry  # package mode
+except Exception:
+    import session_registry  # type: ignore
+try:
+    from . import proxy_health  # package mode
+except Exception:
+    import proxy_health  # type: ignore
+try:
+    from . import product_fetcher  # package mode
+except Exception:
+    import product_fetcher  # type: ignore
+try:
+    from . import pacing  # package mode
+except Exception:
+    import pacing  # type: ignore
+try:
+    from . import token_bucket  # package mode
+except Exception:
+    import token_bucket  # type: ignore
+try:
+    from . import proxy_scheduler  # package mode
+except Exception:
+    import proxy_scheduler  # type: ignore
+try:
+    from .failover import Route as TaskRoute  # package mode
+except Exception:
+    from failover import Route as TaskRoute  # type: ignore
+try:
+    from . import retry_policy  # package mode
+except Exception:
+    import retry_policy  # type: ignore
+try:
+    from . import deadline  # package mode
+except Exception:
+    import deadline  # type: ignore
+try:
+    from . import pagination  # package mode
+except Exception:
+    import pagination  # type: ignore
+try:
+    from . import cookie_cache  # package mode
+except Exception:
+    import cookie_cache  # type: ignore
+try:
+    from . import browser_pool  # package mode
+except Exception:
+    import browser_pool  # type: ignore
+try:
+    from . import challenge_lease  # package mode
+except Exception:
+    import challenge_lease  # type: ignore
+try:
+    from . import cookie_manager  # package mode
+except Exception:
+    import cookie_manager  # type: ignore
+try:
+    from . import challenge_stats  # package mode
+except Exception:
+    import challenge_stats  # type: ignore
 try:
     from .heartbeat import start as start_heartbeat  # package mode
 except Exception:
@@ -126,6 +208,11 @@ redis_session = Redis(host='redis', db=4)
 redis_guard = Redis(host='redis', db=5)  # Что: отдельная БД для замков; Зачем: не смешивать с cookies
 duplicate_guard = DuplicateGuard(redis_guard)
 _heartbeat_task: Optional[Task] = None
+_proxy_health_task: Optional[Task] = None
+_pacing_task: Optional[Task] = None
+_proxy_scheduler_task: Optional[Task] = None
+_cookie_cache_task: Optional[Task] = None
+_challenge_lease_task: Optional[Task] = None
 
 CATALOG_OWNER_HASH = "cl_my:owners"
 
@@ -138,12 +225,9 @@ MAX_PRICE = 1000000
 CATALOG_QUEUE_DEDUP_SET = "cl_my:dedupe_queries"
 CATALOG_PROCESSING_ZSET = "cl_my:processing"
 
-_DELAY_DEFAULT = 0.9125 / 100
-_DELAY_STEP = 0.1825 / 100
-_DELAY_MIN = 0.1825 / 100
-_DELAY_MAX = 3.75 / 100
-_DELAY_NO_PROXY = 0.45625 / 100
-PROXY_HEALTHCHECK_URL = "http://httpbin.org/ip"
+# Что: константы AIMD (шаг, границы) живут в pacing; Зачем: одно правило для Delay и движка темпа
+_DELAY_DEFAULT = pacing.DELAY_DEFAULT
+_DELAY_NO_PROXY = pacing.DELAY_NO_PROXY
 
 # Что: набор заблокированных продавцов из окружения (через запятую)
 # Зачем: быстрое точное сравнение ника без лишней логики
@@ -231,8 +315,22 @@ logging.root.addHandler(TypeErrorExitHandler())
 def retry(
         exception: type[Exception | tuple[Exception, ...]],
         *, tries: Optional[int]=7,
-        delay=0, skip: type[Exception | tuple[Exception, ...]] = None
+        delay=0, skip: type[Exception | tuple[Exception, ...]] = None,
+        exhausted: str = "raise"
 ) -> Callable:
+    if retry_policy.enabled():
+        # Что: классы ошибок, backoff с jitter, бюджеты и breaker — в retry_policy
+        # Зачем: без флага — прежнее поведение (после последней попытки всегда None)
+        return retry_policy.retry(
+            exception,
+            tries=tries,
+            delay=delay,
+            skip=skip,
+            block=(PardonOurInterruption,),
+            exhausted=exhausted,
+            fatal=(deadline.DeadlineExceeded,),
+        )
+
     def decorator(func) -> Callable:
         @wraps(func)
         async def __wrapper(*args, **kwargs) -> Any:
@@ -241,6 +339,9 @@ def retry(
                     range(tries) if tries else count(0):
                 try:
                     return await func(*args, **kwargs)
+                except (CancelledError, deadline.DeadlineExceeded):
+                    # Что: отмену и вышедший срок не повторяем; Зачем: иначе срок стадии не прерывает её
+                    raise
                 except BaseException as ex:
                     if skip and isinstance(ex, skip):
                         logging.info(ex)
@@ -263,15 +364,20 @@ class Webdriver:
     pw: Playwright
     browser: Browser
     mapped: dict[str, Task] = {}
+    # Что: прокси, заблокированные во время решения «в запас» в этом процессе
+    promoted: set[str] = set()
 
     def __init__(self, proxy: ProxySettings) -> None:
         self.proxy = proxy
 
-    async def __call__(self, url: str) -> None:
+    async def __call__(self, url: str, lease: Optional[str] = None, stock: bool = False) -> None:
         server = self.proxy['server']
         task_execute = self.mapped.get(server)
         if (not task_execute) or task_execute.done():
-            self.mapped[server] = create_task(self.execute(url))
+            self.mapped[server] = create_task(self.solve(url, lease, stock))
+        elif not stock:
+            # Что: уже идёт решение — если оно «в запас», его cookies сразу пойдут в работу
+            self.promoted.add(server)
 
     async def redirect(self, route: Route, request: Request) -> None:
         headers = {
@@ -283,56 +389,159 @@ class Webdriver:
     async def abort(self, route: Route) -> None:
         await route.abort()
 
-    async def execute(self, url: str) -> None:
-        await redis_session.delete(self.proxy['server'])
-        logging.info(self.proxy['server'])
+    async def prepare(self, context: BrowserContext) -> None:
+        await context.route(re.compile(".warm$"), self.redirect)
+        await context.route(re.compile(".css$"), lambda route: route.abort())
+        await context.route(re.compile("/image/"), lambda route: route.abort())
+        await context.route(re.compile(".png"), lambda route: route.abort())
+
+    @asynccontextmanager
+    async def launch(self) -> AsyncIterator[BrowserContext]:
+        """Firefox с пустым профилем на один challenge."""
         browser = await Webdriver.pw.firefox.launch_persistent_context(
             "",
-            channel="firefox",
-            headless=True,
-            firefox_user_prefs={
-                "network.http.max-persistent-connections-per-server": 1
-            },
-            proxy=self.proxy
+            proxy=self.proxy,
+            **browser_pool.LAUNCH_OPTIONS
         )
+        try:
+            await self.prepare(browser)
+            yield browser
+        finally:
+            await browser.close()
+
+    async def solve(self, url: str, lease: Optional[str], stock: bool = False) -> None:
+        # Что: решаем, только если аренда challenge за нами; Зачем: один браузер на прокси в кластере
+        async with challenge_lease.hold(redis_controller, self.proxy, lease) as owner:
+            if owner:
+                await self.execute(url, stock)
+
+    async def promote(self) -> bool:
+        """Решение «в запас» отдаём в работу, если прокси заблокировали, пока оно шло."""
+        server = self.proxy['server']
+        if server in self.promoted:
+            self.promoted.discard(server)
+            return True
+        return await challenge_lease.promoted(redis_controller, self.proxy)
+
+    async def execute(self, url: str, stock: bool = False) -> None:
+        if not stock:
+            self.promoted.discard(self.proxy['server'])
+            await redis_session.delete(self.proxy['server'])
+            await cookie_cache.publish(redis_session, self.proxy['server'], "delete")
+        logging.info(self.proxy['server'])
+        if browser_pool.enabled():
+            # Что: тёплый контекст прокси из пула; Зачем: без холодного старта Firefox
+            browser = browser_pool.lease(Webdriver.pw, self.proxy, self.prepare)
+        else:
+            browser = self.launch()
         cookies = {}
+        started = monotonic()
         try:
-            page = browser.pages[0]
-            await page.route(re.compile(".warm$"), self.redirect)
-            await page.route(re.compile(".css$"), lambda route: route.abort())
-            await page.route(re.compile("/image/"), lambda route: route.abort())
-            await page.route(re.compile(".png"), lambda route: route.abort())
-            async with page:
-                try:
-                    resp = await page.goto(url, wait_until="domcontentloaded", timeout=180_000)
-                    status = resp.status if resp else "NONE"
+            async with browser as context:
+                page = context.pages[0]
+                async with (nullcontext(page) if browser_pool.enabled() else page):
                     try:
-                        if request_log.enabled():
-                            request_log.log_playwright(status, url, self.proxy['server'])
-                    except Exception:
-                        pass
-                except Exception as ex:
+                        resp = await page.goto(url, wait_until="domcontentloaded", timeout=180_000)
+                        status = resp.status if resp else "NONE"
+                        try:
+                            if request_log.enabled():
+                                request_log.log_playwright(status, url, self.proxy['server'])
+                        except Exception:
+                            pass
+                    except Exception as ex:
+                        try:
+                            if request_log.enabled():
+                                request_log.log_playwright_error(url, ex, self.proxy['server'])
+                        except Exception:
+                            pass
+                        raise
+                    # Что: ждём событий навигации, а не опрашиваем раз в секунду; срок решения ограничен
                     try:
-                        if request_log.enabled():
-                            request_log.log_playwright_error(url, ex, self.proxy['server'])
-                    except Exception:
+                        await page.wait_for_url(
+                            challenge_stats.on_challenge,
+                            wait_until="commit",
+                            timeout=challenge_stats.SETTLE_TIMEOUT * 1000,
+                        )
+                    except PlaywrightTimeoutError:
                         pass
-                    raise
-                await sleep(1)
-                while "www.ebay.com/splashui/challenge" in page.url:
-                    await sleep(1)
-                cookies = await page.context.cookies()
+                    outcome = "clean"
+                    if challenge_stats.on_challenge(page.url):
+                        started = monotonic()
+                        try:
+                            await page.wait_for_url(
+                                lambda page_url: not challenge_stats.on_challenge(page_url),
+                                wait_until="commit",
+                                timeout=challenge_stats.SOLVE_TIMEOUT * 1000,
+                            )
+                        except PlaywrightTimeoutError:
+                            raise challenge_stats.ChallengeTimeout(
+                                self.proxy['server'], challenge_stats.SOLVE_TIMEOUT
+                            ) from None
+                        outcome = "solved"
+                    await challenge_stats.record(redis_controller, self.proxy, outcome, monotonic() - started)
+                    cookies = await page.context.cookies()
+                    if stock and not await self.promote():
+                        # Что: рабочие cookies не трогаем — набор уходит в запас cookie_manager
+                        await cookie_manager.stock(redis_session, self.proxy, cookies)
+                        return
+                    if not stock:
+                        # Что: блоки, случившиеся во время решения, закрыты этими cookies
+                        await challenge_lease.promoted(redis_controller, self.proxy)
+                    await redis_session.set(self.proxy['server'], dumps(cookies))
+                    await cookie_cache.publish(redis_session, self.proxy['server'], "set")
+                    await proxy_scheduler.cookies_refreshed(redis_controller, self.proxy)
+                    await cookie_manager.refreshed(redis_session, self.proxy)
+        except BaseException as ex:
+            await challenge_stats.record(
+                redis_controller,
+                self.proxy,
+                "timeout" if isinstance(ex, challenge_stats.ChallengeTimeout) else "error",
+                monotonic() - started,
+            )
+            if not stock:
                 await redis_session.set(self.proxy['server'], dumps(cookies))
-        except:
-            await redis_session.set(self.proxy['server'], dumps(cookies))
+                await cookie_cache.publish(redis_session, self.proxy['server'], "set")
             raise
-        finally:
-            await browser.close()
 
 
 @broker_pw.task("task_execute")
-async def task_execute(url: str, proxy: ProxySettings) -> None:
-    await Webdriver(proxy)(url)
+async def task_execute(
+        url: str,
+        proxy: ProxySettings,
+        lease: Optional[str] = None,
+        stock: bool = False,
+) -> None:
+    await Webdriver(proxy)(url, lease, stock)
+
+
+async def solve_challenge(url: str, proxy: ProxySettings) -> None:
+    """Ставит решение challenge для прокси, если такое ещё не в пути."""
+    await challenge_lease.request(
+        redis_controller,
+        proxy,
+        lambda lease: task_execute.kiq(url, proxy, lease),
+    )
+
+
+async def warm_cookies(proxy: ProxySettings) -> None:
+    """Рабочие cookies прокси заранее, до первого запроса."""
+    await solve_challenge(cookie_manager.WARM_URL, proxy)
+
+
+async def stock_cookies(proxy: ProxySettings) -> bool:
+    """Ещё один набор cookies прокси в запас; False — на прокси уже идёт решение."""
+    return await challenge_lease.request(
+        redis_controller,
+        proxy,
+        lambda lease: task_execute.kiq(cookie_manager.WARM_URL, proxy, lease, True),
+        stock=True,
+    )
+
+
+async def cookies_swapped(proxy: ProxySettings) -> None:
+    """Рабочие cookies прокси заменены запасными — сообщаем воркерам."""
+    await cookie_cache.publish(redis_session, proxy['server'], "set")
+    await proxy_scheduler.cookies_refreshed(redis_controller, proxy)
 
 
 @broker_pw.on_event(TaskiqEvents.WORKER_STARTUP)
@@ -342,10 +551,12 @@ async def startup(*args, **kw) -> None:
     except Exception:
         pass
     Webdriver.pw = await async_playwright().start()
+    await browser_pool.bake_template(Webdriver.pw)
 
 
 @broker_pw.on_event(TaskiqEvents.WORKER_SHUTDOWN)
 async def shutdown(*args, **kw) -> None:
+    await browser_pool.aclose()
     await Webdriver.pw.stop()
 
 
@@ -367,51 +578,57 @@ PROXIES = cycle(proxies)
 
 
 class Delay:
+    # Что: шлюз отправки на прокси внутри процесса (время последней отправки и текущая пауза)
+    # Зачем: несколько товаров в полёте (product_fetcher) шлют не чаще, чем по одному
+    _gates: dict[str, Lock] = {}
+    _last_send: dict[str, float] = {}
+    _current: dict[str, float] = {}
+
     def __init__(self, proxy: ProxySettings = None) -> None:
         self.proxy = None
         if proxy:
             self.proxy = proxy['server']
 
     async def __aenter__(self) -> Self:
+        if pacing.enabled():
+            # Что: ждём до отправки, а не после обработки
+            await pacing.acquire(redis_controller, self.proxy)
+            return self
+        if self.proxy:
+            gate = self._gates.setdefault(self.proxy, Lock())
+            async with gate:
+                wait = self._last_send.get(self.proxy, 0.0) + self._current.get(self.proxy, 0.0) - monotonic()
+                if wait > 0:
+                    await sleep(wait)
+                self._last_send[self.proxy] = monotonic()
         return self
 
+    @classmethod
+    def carry(cls, old: ProxySettings, new: ProxySettings) -> None:
+        """Переносит темп старого прокси задачи на новый (failover)."""
+        if pacing.enabled():
+            pacing.inherit(old['server'], new['server'])
+            return
+        current = cls._current.get(old['server'])
+        if current is not None and current > cls._current.get(new['server'], 0.0):
+            cls._current[new['server']] = current
+
     async def __aexit__(self, e, *args, **kw) -> None:
+        if pacing.enabled():
+            _sleep = pacing.feedback(self.proxy, e is None)
+            logging.info(f'For {self.proxy!r} next send in {_sleep}s')
+            return
         if self.proxy:
             _sleep = await redis_controller.get(self.proxy)
-            _sleep = float(_sleep or _DELAY_DEFAULT)
-            if e is None:
-                if _sleep > _DELAY_MIN:
-                    _sleep = max(_DELAY_MIN, _sleep - _DELAY_STEP)
-            else:
-                if _sleep < _DELAY_MAX:
-                    _sleep = min(_DELAY_MAX, _sleep + _DELAY_STEP)
+            _sleep = pacing.step(float(_sleep or _DELAY_DEFAULT), e is None)
             await redis_controller.set(self.proxy, _sleep)
+            Delay._current[self.proxy] = _sleep
             logging.info(f'For {self.proxy!r} wait {_sleep}s')
             await sleep(_sleep)
         else:
             await sleep(_DELAY_NO_PROXY)
 
 
-async def log_proxy_health(session: ClientSession, proxy: Optional[ProxySettings]) -> None:
-    """Проверяет прокси запросом к httpbin и логирует статус."""
-    proxy_id = proxy['server'] if proxy else None
-    try:
-        async with session.get(PROXY_HEALTHCHECK_URL) as health_response:
-            status = health_response.status
-            if request_log.enabled():
-                request_log.log_http(status, PROXY_HEALTHCHECK_URL, proxy_id)
-            if status != 200:
-                logging.warning(
-                    "Proxy %s health-check status=%s",
-                    proxy_id,
-                    status,
-                )
-    except Exception as ex:
-        if request_log.enabled():
-            request_log.log_http_error(PROXY_HEALTHCHECK_URL, ex, proxy_id)
-        raise
-
-
 class Timer:
     def __init__(self, target: str) -> None:
         self.target = target
@@ -431,142 +648,95 @@ def get_element(func: Callable) -> Optional[Any]:
     except Exception:
         return None
 
-def extract_catalog_seller(li: Any) -> Optional[str]:
-    """Возвращает ник продавца из карточки каталога (или None)."""
-
-    # Что: пробуем блок с бейджем продавца (seller/store info)
-    # Зачем: вариант, когда ник и рейтинг в одном span
-    el = li.select_one(
-        ".s-card__program-badge-container--sellerOrStoreInfo .su-styled-text"
-    )
-    if not el:
-        # что: запасной вариант — блок вторичных атрибутов
-        el = li.select_one(
-            ".su-card-container__attributes__secondary .su-styled-text.primary.large"
-        )
-    if not el:
-        return None
-    text = el.get_text(" ", strip=True)
-    if not text:
-        return None
-    match = re.match(r"([A-Za-z0-9._-]+)", text)
-    return match.group(1) if match else None
-
-
-def extract_catalog_title(li: Any) -> Optional[str]:
-    """Возвращает title из карточки каталога без нормализации.
-
-    Назначение: нужен для строгого сравнения с тем, что уже в БД, чтобы
-    определить устаревшие лоты и инициировать перепарс.
-    """
-    # Что: классический селектор eBay списка
-    el = li.select_one(".s-item__title")
-    if not el:
-        # Что: альтернативные варианты разметки (новые карточки)
-        el = li.select_one(".s-card__title, [role='heading']")
-    if not el:
-        # Что: запасной путь — aria-label у ссылки
-        a = li.find("a")
-        if a and a.get("aria-label"):
-            return a.get("aria-label").strip()
-        return None
-    txt = el.get_text(" ", strip=True)
-    return txt if txt else None
-
 class _HtmlParse:
-    def __init__(self, _text: str):
+    """Фасад над product_extractor: дерево строится и обходится один раз."""
+
+    def __init__(
+        self,
+        _text: str | bytes,
+        record: Optional[ProductRecord] = None,
+        encoding: Optional[str] = None,
+    ):
+        # Что: text может быть байтами ответа; encoding — кодировка из ответа
         self.text = _text
-        self.html = BeautifulSoup(_text, 'lxml')
+        self.encoding = encoding
+        self._tree: Optional[Any] = None
+        # Что: запись может прийти готовой из parse_pool; Зачем: не разбирать страницу дважды
+        self.record: ProductRecord = record if record is not None else self._build_record()
+
+    def _build_record(self) -> ProductRecord:
+        return extract_product(self.tree)
+
+    @property
+    def tree(self) -> Optional[Any]:
+        # Что: дерево lxml по требованию; Зачем: JSON-путь может обойтись без него
+        if self._tree is None:
+            self._tree = parse_html(self.text, self.encoding)
+        return self._tree
+
+    @cached_property
+    def html(self) -> BeautifulSoup:
+        # Что: BeautifulSoup только по требованию
+        # Зачем: совместимость для старых вызовов без второго парса на каждом товаре
+        if isinstance(self.text, bytes):
+            return BeautifulSoup(self.text, 'lxml', from_encoding=self.encoding)
+        return BeautifulSoup(self.text, 'lxml')
 
 
 class HtmlParse1(_HtmlParse):
     @property
     def mpn(self) -> Optional[str]:
-        return get_element(
-            lambda: self.html
-            .find(string=re.compile(r"(manufacturer part number|mpn|MPN)"))
-            .find_next("span")
-            .text.strip()
-        )
+        return self.record.mpn
 
     @property
     def delivery(self) -> Optional[str]:
-        return get_element(
-            lambda: self.html
-            .find(string="Shipping:")
-            .find_next("span")
-            .text.strip()
-        )
+        return self.record.delivery
 
     @property
     def price_without_delivery(self) -> Optional[str]:
-        return get_element(
-            lambda: self.html
-            .find("div", {"class": "x-price-primary"})
-            .text.strip()
-        )
+        return self.record.price_without_delivery
 
     @property
     def location(self) -> Optional[str]:
-        return get_element(
-            lambda: self.html
-            .find(string=re.compile("Located in"))
-            .text.strip()
-        )
+        return self.record.location
 
     @property
     def brand(self) -> Optional[str]:
-        return get_element(
-            lambda: [*filter(
-                lambda _: _.find(string=re.compile('^(Brand|Hersteller)', re.IGNORECASE)),
-                self.html.find_all("dt")
-            )][0].span.find_next("span").text.strip()
-        )
+        return self.record.brand
 
     @property
     def condition(self) -> Optional[str]:
-        return get_element(
-            lambda: self.html
-            .find(string=re.compile('Condition', re.IGNORECASE))
-            .find_next("span")
-            .text.strip()
-        )
+        return self.record.condition
 
     @property
     def title(self) -> Optional[str]:
-        return get_element(
-            lambda: self.html.find("h1").text.strip()
-        )
+        return self.record.title
 
     @property
     def seller(self) -> Optional[str]:
-        return get_element(
-            lambda: self.html
-            .find("div", {"class": "x-sellercard-atf__info__about-seller"})
-            .find('span')
-            .text.strip()
-        )
+        return self.record.seller
 
     @property
     def description_href(self) -> Optional[str]:
-        return get_element(
-            lambda: self.html.find("iframe", {"id": "desc_ifr"})["src"]
-        )
+        return self.record.description_href
 
     @property
     def short_description(self) -> Optional[str]:
         """Извлекает короткое описание из meta-тега."""
-        return get_element(
-            lambda: self.html.find("meta", {"name": "description"})["content"]
-        )
+        return self.record.short_description
+
+    @property
+    def specifics(self) -> list[tuple[str, str]]:
+        """Пары dt/dd из блоков item specifics (порядок как на странице)."""
+        return self.record.specifics
 
 
 class HtmlParse2(HtmlParse1):
-    @property
-    def price_without_delivery(self) -> str:
-        return get_element(
-            lambda: re.search(r'"price":\["(.*?)"', self.text)
-        ) or super().price_without_delivery
+    """Сначала встроенный JSON страницы, DOM — только для недостающих полей."""
+
+    def _build_record(self) -> ProductRecord:
+        record, self._tree = parse_product(self.text, self.encoding)
+        return record
 
 
 class HtmlParse(HtmlParse2):
@@ -579,7 +749,8 @@ async def set_zip_code(session: ClientSession, item_number: str) -> None:
             f"https://www.ebay.com/itemmodules/{item_number}"
             "?module_groups=GET_RATES_MODAL&co=0&isGetRates=1"
             "&rt=nc&quantity=&shipToCountryCode=USA"
-            f"&shippingZipCode={CODE_DELIVERY}"
+            f"&shippingZipCode={CODE_DELIVERY}",
+            **deadline.request_kwargs(),
     ) as response:
         ...
 
@@ -589,10 +760,26 @@ class PardonOurInterruption(Exception):
         return "Pardon Our Interruption"
 
 
-async def check_block(response: ClientResponse, proxy: ProxySettings) -> None:
-    if "<title>Pardon Our Interruption...</title>" in await response.text():
-        await task_execute.kiq(str(response.url), proxy)
+# Что: маркеры ищем в байтах ответа; Зачем: не декодировать страницу целиком ради проверки
+_BLOCK_MARKER = stream_abort.CHALLENGE_MARKER
+_SOLD_OUT_MARKER = stream_abort.SOLD_OUT_MARKER
+
+
+async def check_block(response: ClientResponse, proxy: ProxySettings, body: bytes) -> None:
+    if _BLOCK_MARKER in body:
+        await token_bucket.report(redis_controller, proxy, False)
+        # Что: есть запасные cookies — ставим их сразу, без браузера
+        if not await cookie_manager.on_block(redis_session, proxy, cookies_swapped):
+            await solve_challenge(str(response.url), proxy)
         raise PardonOurInterruption()
+    await token_bucket.report(redis_controller, proxy, True)
+
+
+async def wait_challenge(route: TaskRoute, proxy: ProxySettings, ex: BaseException) -> None:
+    """После блока ждём решения challenge, если задача осталась на этом прокси."""
+    if isinstance(ex, PardonOurInterruption) and route.proxy is proxy:
+        # Что: повторяем, когда challenge решён, а не по таймеру
+        await challenge_lease.wait(redis_controller, proxy)
 
 
 class Cookies:
@@ -600,14 +787,18 @@ class Cookies:
 
     @classmethod
     async def get_cookies(cls, proxy: ProxySettings) -> tuple[dict, bool]:
-        data = await redis_session.get(proxy['server'])
-        if data is None:
-            await sleep(0.1)
-            return await cls.get_cookies(proxy)
-        cookies = {
-            _['name']: _['value']
-            for _ in loads(data)
-        }
+        if cookie_cache.enabled():
+            # Что: cookies из памяти процесса, сброс — по событию из Webdriver.execute
+            cookies = await cookie_cache.get(redis_session, proxy['server'])
+        else:
+            data = await redis_session.get(proxy['server'])
+            if data is None:
+                await sleep(0.1)
+                return await cls.get_cookies(proxy)
+            cookies = {
+                _['name']: _['value']
+                for _ in loads(data)
+            }
         logging.debug(cookies)
         previous_cookies = cls._previous_cookie.get(proxy['server'])
         сhanged = previous_cookies != cookies
@@ -616,9 +807,16 @@ class Cookies:
             logging.debug("cookies modified")
         return cookies, сhanged
 
+    @classmethod
+    def forget(cls, proxy: ProxySettings) -> None:
+        # Что: у новой сессии пустой cookie jar; Зачем: следующий get_cookies вернёт changed=True
+        cls._previous_cookie.pop(proxy['server'], None)
+
 
-@retry(BaseException, tries=3)
-async def product(session: ClientSession, item_id: str, query: str, this_cycle: int, proxy: ProxySettings) -> None:
+@retry(BaseException, tries=3, exhausted="skip")
+async def product(route: TaskRoute, item_id: str, query: str, this_cycle: int) -> None:
+    # Что: прокси и сессию берём на каждой попытке; Зачем: после failover — уже новые
+    session, proxy = route.session, route.proxy
     item_key = str(item_id)  # Что: ключ замка в Redis; Зачем: не повторять сетевой запрос
     if duplicate_cache.enabled():
         if await duplicate_cache.contains(item_key):
@@ -649,23 +847,33 @@ async def product(session: ClientSession, item_id: str, query: str, this_cycle:
 
             with Timer("product redis get cookies"):
                 cookies, сhanged = await Cookies.get_cookies(proxy)
+            # Что: токены бакета прокси сразу на все запросы товара (zip + /itm/)
+            with Timer("product token bucket"):
+                await token_bucket.acquire(redis_controller, proxy, 2 if сhanged else 1)
             if сhanged:
                 with Timer("set zip code"):
-                    await set_zip_code(session, item_id)
+                    try:
+                        await set_zip_code(session, item_id)
+                    except Exception:
+                        # Что: запрос /itm/ не уйдёт — его токен возвращаем
+                        await token_bucket.refund(redis_controller, proxy)
+                        raise
                     session.cookie_jar.update_cookies(cookies)
 
-            with Timer("product request"):
+            with Timer("product request"), proxy_scheduler.observe(proxy, (PardonOurInterruption,)):
                 try:
-                    await log_proxy_health(session, proxy)
-                    async with session.get(url) as response:
-                        _text = await response.text()
-                        # ВРЕМЕННО: логируем полный текст страницы
-                        try:
-                            page_text = BeautifulSoup(_text, "lxml").get_text(" ", strip=True)
-                        except Exception:
-                            page_text = _text
-                        log_html_text(item_id, page_text)
-                        await check_block(response, proxy)
+                    async with session.get(url, **deadline.request_kwargs()) as response:
+                        if stream_abort.enabled():
+                            # Что: при однозначном отказе дальше не качаем; решение ниже — прежним кодом
+                            _page = await stream_abort.read(
+                                response, lambda desc: check_description(desc)[0]
+                            )
+                            _body, _encoding = _page.body, _page.encoding
+                        else:
+                            _body = await response.read()
+                            _encoding = response.get_encoding()
+                        await check_block(response, proxy, _body)
+                        route.ok(proxy)
                         try:
                             if request_log.enabled():
                                 request_log.log_http(response.status, str(response.url), proxy['server'])
@@ -677,15 +885,20 @@ async def product(session: ClientSession, item_id: str, query: str, this_cycle:
                             request_log.log_http_error(url, ex, proxy['server'])
                     except Exception:
                         pass
+                    await route.failed(proxy, ex)
+                    await wait_challenge(route, proxy, ex)
                     TRACK_LOGGER.exception(
                         "product request failed item=%s query=%s", item_id, query
                     )
                     raise
 
-            if "<span class=\"ux-textspans\">CURRENTLY SOLD OUT</span>" in _text:
+            if _SOLD_OUT_MARKER in _body:
                 raise AssertionError("Сайт - 'CURRENTLY SOLD OUT'")
 
-            html = HtmlParse(_text)
+            record, diag = await parse_pool.parse_product_record(
+                _body, _encoding, capture=diagnostics.should_capture(item_id)
+            )
+            html = HtmlParse(_body, record, _encoding)
 
             # Проверка описания на стоп-слова
             short_desc = html.short_description
@@ -703,22 +916,9 @@ async def product(session: ClientSession, item_id: str, query: str, this_cycle:
                 logging.info("Skip item %s by blocked description word: %s", item_id, matched_desc_word)
                 return
 
-            # ВРЕМЕННО
-            xpath_value: Optional[str] = None
-            try:
-                xpath_target = html.html.select_one(
-                    "html > body > div:nth-of-type(2) > main > div:nth-of-type(1) > "
-                    "div:nth-of-type(1) > div:nth-of-type(4) > div > div > div:nth-of-type(2) > "
-                    "div > div:nth-of-type(1) > div:nth-of-type(3) > div:nth-of-type(1) > "
-                    "div > div > span"
-                )
-                if xpath_target:
-                    text_value = xpath_target.get_text(strip=True)
-                    xpath_value = text_value or None
-            except Exception:
-                xpath_value = None
-            record_xpath_value(item_id, xpath_value)
-            # ВРЕМЕННО (конец кода)
+            if diag is not None:
+                diagnostics.record(item_id, diag["page_text"], diag["xpath_value"])
+                diagnostics.capture_page("item", str(item_id), _body)
 
             try:
                 __delivery_raw = html.delivery or ""
@@ -766,23 +966,20 @@ async def product(session: ClientSession, item_id: str, query: str, this_cycle:
                     "seller": html.seller,
                     "description": short_desc,
                 }
-                if html.html.find('dl'):
-                    for item in html.html.find_all('dl'):
-                        dt = item.find('dt')
-                        dd = item.find('dd')
-                        if dt and dd:
-                            _k = dt.text.strip()[:120]
-                            _v = dd.text.strip()[:1280]
-                            # DB insert
-                            PackageCommit.insert_into_item_specifics(
-                                key=_k,
-                                value=_v,
-                                insert_into_ebay_index=_index
-                            )
-                            # Include in payload (keys 1:1, no normalization)
-                            inner_payload[_k] = _v
+                for dt_text, dd_text in html.specifics:
+                    _k = dt_text[:120]
+                    _v = dd_text[:1280]
+                    # DB insert
+                    PackageCommit.insert_into_item_specifics(
+                        key=_k,
+                        value=_v,
+                        insert_into_ebay_index=_index
+                    )
+                    # Include in payload (keys 1:1, no normalization)
+                    inner_payload[_k] = _v
                 try:
-                    await PackageCommit.commit()
+                    async with deadline.stage("commit", deadline.COMMIT_BUDGET, label=item_id):
+                        await PackageCommit.commit()
                     if duplicate_cache.enabled():
                         await duplicate_cache.record_seen(item_key, query=query)
                 except IntegrityError as exc:  # Что: отлавливаем дубликат
@@ -816,7 +1013,8 @@ async def product(session: ClientSession, item_id: str, query: str, this_cycle:
 
 # rm -r /tmp/playwright_firefoxdev_profile*
 @retry(BaseException)
-async def catalog_request(session: ClientSession, query: str, p: int, proxy: ProxySettings) -> str:
+async def catalog_request(route: TaskRoute, query: str, p: int) -> tuple[bytes, str]:
+    session, proxy = route.session, route.proxy
     async with Delay(proxy):
         logging.info(f"QUERY - {query!r} [{p}]")
         url = f"https://www.ebay.com/sch/i.html?_nkw={query}" \
@@ -826,12 +1024,15 @@ async def catalog_request(session: ClientSession, query: str, p: int, proxy: Pro
             cookies, сhanged = await Cookies.get_cookies(proxy)
             if сhanged:
                 session.cookie_jar.update_cookies(cookies)
-        with Timer("catalog request"):
+        with Timer("catalog token bucket"):
+            await token_bucket.acquire(redis_controller, proxy)
+        with Timer("catalog request"), proxy_scheduler.observe(proxy, (PardonOurInterruption,)):
             try:
-                await log_proxy_health(session, proxy)
-                async with session.get(url) as response:
-                    __text = await response.text()
-                    await check_block(response, proxy)
+                async with session.get(url, **deadline.request_kwargs()) as response:
+                    __body = await response.read()
+                    __encoding = response.get_encoding()
+                    await check_block(response, proxy, __body)
+                    route.ok(proxy)
                     try:
                         if request_log.enabled():
                             request_log.log_http(response.status, str(response.url), proxy['server'])
@@ -843,13 +1044,24 @@ async def catalog_request(session: ClientSession, query: str, p: int, proxy: Pro
                         request_log.log_http_error(url, ex, proxy['server'])
                 except Exception:
                     pass
-                await task_execute.kiq(url, proxy)
+                if not (
+                        (challenge_lease.enabled() or cookie_manager.enabled())
+                        and isinstance(ex, PardonOurInterruption)
+                ):
+                    # Что: на блок решение уже поставил check_block
+                    await solve_challenge(url, proxy)
+                await route.failed(proxy, ex)
+                await wait_challenge(route, proxy, ex)
                 raise
-    return __text
+    return __body, __encoding
 
 
 @retry(Exception)
-async def catalog(session: ClientSession, query: str, proxy: ProxySettings, max_price: Optional[float] = None) -> tuple[list[str], int]:
+async def catalog(
+    route: TaskRoute,
+    query: str,
+    max_price: Optional[float] = None,
+) -> tuple[list[int], int, dict[str, dict[str, Any]]]:
     async with DataBase.session_marker() as session_maker:
         with Timer("sql insert count"):
             await session_maker.execute(text("""
@@ -867,135 +1079,154 @@ async def catalog(session: ClientSession, query: str, proxy: ProxySettings, max_
         log_verbose = excel_log.enabled()
         decisions: dict[str, dict[str, Any]] = {}  # Что: кэш решений по каждому item; Зачем: позже собрать единый лог
         included_titles: dict[int, Optional[str]] = {}  # Что: id->title для проверки изменений
+        accepted_cards: dict[str, dict[str, Any]] = {}  # Что: item_id->карточка; Зачем: catalog_ingest
         seen_sellers_global: set[str] = set()
-        for p in count(1):
-            __text = await catalog_request(session, query, p, proxy)
-            __html = BeautifulSoup(__text, "lxml")
-            if not __html.find("h1"):
-                break
-            __count = __html.find("h1").find("span").text
-            logging.debug(f"Количество в каталоге - \"{__count}\"")
-            __links = []
-            items = __html.find_all('li', {'id': re.compile(r'item')})
-            scanned = 0
-            seen_titles_in_page: set[str] = set()
-            for li in items:
-                if should_stop(li):
+        # Что: маршруты, между которыми делятся страницы (основной + PAGINATION_PROXIES)
+        lanes: list[TaskRoute] = [route]
+        lanes_stack = AsyncExitStack()
+
+        async def open_lanes(planned: int) -> None:
+            for _ in range(min(pagination.EXTRA_PROXIES, planned - 1)):
+                spare = await spare_proxy({lane.proxy['server'] for lane in lanes})
+                if spare is None:
                     break
-                href_el = li.find('a')
-                if not href_el:
-                    continue
-                href = href_el.get('href')
-                if not href:
-                    continue
-                scanned += 1
-                # Что: извлекаем ник продавца из карточки каталога
-                # Зачем: фильтровать лоты по BLOCKED_SELLERS до перехода в товар
-                seller_nick = extract_catalog_seller(li)
-                title_text = extract_catalog_title(li)
-                match = re.search(r"/itm/(\d+)", href)
-                item_id = match.group(1) if match else None
-                blocked_title_word: Optional[str] = None
-                price_value: Optional[float] = None
-                price_reason = 'no_max_price'
-                decision = 'include'
-                duplicate_title = False
-                duplicate_seller = False
-                if max_price is not None:
-                    price_span = li.find('span', {'class': 's-card__price'})
-                    if price_span and price_span.text:
-                        try:
-                            price_value = float(''.join(filter(lambda c: c.isnumeric() or c == '.', price_span.text)))
-                        except Exception:
-                            price_value = None
-                    if price_value is None:
-                        decision = 'skip'
-                        price_reason = 'price_parse_failed'
-                    elif price_value < max_price:
-                        decision = 'include'
-                        price_reason = 'below_threshold'
-                    else:
-                        decision = 'skip'
-                        price_reason = 'above_threshold'
-                # Что: дополнительная проверка на чёрный список продавцов
-                # Зачем: просто пропускаем лоты нежелательных никнеймов
-                blocked = False
-                if decision == 'include' and seller_nick and seller_nick in BLOCKED_SELLERS:
-                    decision = 'skip'
-                    price_reason = 'blocked_seller'
-                    blocked = True
-                    logging.info(f"catalog skip by blocked seller: {seller_nick}")
-                normalized_seller = seller_nick.casefold() if seller_nick else None
-                if decision == 'include' and normalized_seller:
-                    if normalized_seller in seen_sellers_global:
-                        decision = 'skip'
-                        price_reason = 'duplicate_seller'
-                        duplicate_seller = True
-                        logging.info("catalog skip by duplicate seller: %s", seller_nick)
-                if decision == 'include':
-                    if not passes_whitelist(title_text):
-                        reason = 'white_list_miss'
+                lanes.append(await lanes_stack.enter_async_context(
+                    TaskRoute(spare, open_proxy_session, spare_proxy, Delay.carry, label=query)
+                ))
+
+        async def fetch_page(p: int) -> dict[str, Any]:
+            __body, __encoding = await catalog_request(lanes[(p - 1) % len(lanes)], query, p)
+            if diagnostics.capture_enabled() and diagnostics.should_capture(f"{query}:{p}"):
+                diagnostics.capture_page("catalog", f"{query}_{p}", __body)
+            # Что: разбор страницы — в parse_pool (в пуле процессов, если включён)
+            # Зачем: event loop воркера не держит разбор HTML
+            return await parse_pool.parse_catalog(__body, __encoding)
+
+        # Что: страницы могут грузиться заранее (pagination), но решения — строго по порядку
+        async with lanes_stack, aclosing(pagination.pages(
+            fetch_page,
+            lambda page: pagination.planned_pages(page["count"]) if page["has_h1"] else 1,
+            open_lanes,
+            label=query,
+        )) as catalog_pages:
+            async for p, __page in catalog_pages:
+                if not __page["has_h1"]:
+                    break
+                __count = __page["count"]
+                logging.debug(f"Количество в каталоге - \"{__count}\"")
+                __links = []
+                scanned = 0
+                seen_titles_in_page: set[str] = set()
+                for card in __page["cards"]:
+                    href = card["href"]
+                    scanned += 1
+                    # Что: ник продавца и title уже извлечены из карточки каталога
+                    # Зачем: фильтровать лоты по BLOCKED_SELLERS до перехода в товар
+                    seller_nick = card["seller"]
+                    title_text = card["title"]
+                    item_id = card["item_id"]
+                    blocked_title_word: Optional[str] = None
+                    price_value: Optional[float] = None
+                    price_reason = 'no_max_price'
+                    decision = 'include'
+                    duplicate_title = False
+                    duplicate_seller = False
+                    if max_price is not None:
+                        price_text = card["price_text"]
+                        if price_text:
+                            try:
+                                price_value = float(''.join(filter(lambda c: c.isnumeric() or c == '.', price_text)))
+                            except Exception:
+                                price_value = None
+                        if price_value is None:
+                            decision = 'skip'
+                            price_reason = 'price_parse_failed'
+                        elif price_value < max_price:
+                            decision = 'include'
+                            price_reason = 'below_threshold'
+                        else:
+                            decision = 'skip'
+                            price_reason = 'above_threshold'
+                    # Что: дополнительная проверка на чёрный список продавцов
+                    # Зачем: просто пропускаем лоты нежелательных никнеймов
+                    blocked = False
+                    if decision == 'include' and seller_nick and seller_nick in BLOCKED_SELLERS:
                         decision = 'skip'
-                        price_reason = reason
-                        blocked_title_word = reason
-                        if item_id:
-                            log_block(item_id, reason, title_text or "")
-                    else:
-                        blocked_by_title, matched_word = check_title(title_text)
-                        if blocked_by_title:
+                        price_reason = 'blocked_seller'
+                        blocked = True
+                        logging.info(f"catalog skip by blocked seller: {seller_nick}")
+                    normalized_seller = seller_nick.casefold() if seller_nick else None
+                    if decision == 'include' and normalized_seller:
+                        if normalized_seller in seen_sellers_global:
+                            decision = 'skip'
+                            price_reason = 'duplicate_seller'
+                            duplicate_seller = True
+                            logging.info("catalog skip by duplicate seller: %s", seller_nick)
+                    if decision == 'include':
+                        if not passes_whitelist(title_text):
+                            reason = 'white_list_miss'
                             decision = 'skip'
-                            price_reason = 'blocked_title'
-                            blocked_title_word = matched_word
-                            if item_id and matched_word:
-                                log_block(item_id, matched_word, title_text or "")
+                            price_reason = reason
+                            blocked_title_word = reason
+                            if item_id:
+                                log_block(item_id, reason, title_text or "")
                         else:
-                            normalized_title = title_text.casefold() if title_text else None
-                            if normalized_title and normalized_title in seen_titles_in_page:
+                            blocked_by_title, matched_word = check_title(title_text)
+                            if blocked_by_title:
                                 decision = 'skip'
-                                price_reason = 'duplicate_title'
-                                duplicate_title = True
-                                logging.info("catalog skip by duplicate title: %s", title_text)
-                            if decision == 'include':
-                                if normalized_title:
-                                    seen_titles_in_page.add(normalized_title)
-                                if normalized_seller:
-                                    seen_sellers_global.add(normalized_seller)
-                                __links.append(href)  # Что: лот принят после всех проверок
-                                if recheck_titles_enabled() and item_id:
-                                    included_titles[int(item_id)] = title_text
+                                price_reason = 'blocked_title'
+                                blocked_title_word = matched_word
+                                if item_id and matched_word:
+                                    log_block(item_id, matched_word, title_text or "")
+                            else:
+                                normalized_title = title_text.casefold() if title_text else None
+                                if normalized_title and normalized_title in seen_titles_in_page:
+                                    decision = 'skip'
+                                    price_reason = 'duplicate_title'
+                                    duplicate_title = True
+                                    logging.info("catalog skip by duplicate title: %s", title_text)
+                                if decision == 'include':
+                                    if normalized_title:
+                                        seen_titles_in_page.add(normalized_title)
+                                    if normalized_seller:
+                                        seen_sellers_global.add(normalized_seller)
+                                    __links.append(href)  # Что: лот принят после всех проверок
+                                    if item_id:
+                                        accepted_cards[item_id] = card
+                                    if recheck_titles_enabled() and item_id:
+                                        included_titles[int(item_id)] = title_text
+                    if log_verbose:
+                        # Логируем причину выбора/отброса
+                        key = item_id or href
+                        decisions[key] = {
+                            "item_id": item_id,
+                            "query": query,
+                            "page": p,
+                            "href": href,
+                            "price": price_value,
+                            "threshold": max_price,
+                            "decision": decision,
+                            "reason": price_reason,
+                            "seller": seller_nick,
+                            "blocked": blocked,
+                            "blocked_title": blocked_title_word,
+                            "duplicate_title": duplicate_title,
+                            "duplicate_seller": duplicate_seller,
+                            "title": title_text,
+                            "duplicate_cache": False,
+                        }
+                links += __links
                 if log_verbose:
-                    # Логируем причину выбора/отброса
-                    key = item_id or href
-                    decisions[key] = {
-                        "item_id": item_id,
-                        "query": query,
-                        "page": p,
-                        "href": href,
-                        "price": price_value,
-                        "threshold": max_price,
-                        "decision": decision,
-                        "reason": price_reason,
-                        "seller": seller_nick,
-                        "blocked": blocked,
-                        "blocked_title": blocked_title_word,
-                        "duplicate_title": duplicate_title,
-                        "duplicate_seller": duplicate_seller,
-                        "title": title_text,
-                        "duplicate_cache": False,
-                    }
-            __page_next = __html.find("a", {"class": "pagination__next"})
-            links += __links
-            if log_verbose:
-                excel_log.log_event(
-                    'catalog_page_summary',
-                    query=query,
-                    page=p,
-                    scanned=scanned,
-                    accepted=len(__links),
-                    threshold=max_price,
-                )
-            if not __page_next:
-                break
+                    excel_log.log_event(
+                        'catalog_page_summary',
+                        query=query,
+                        page=p,
+                        scanned=scanned,
+                        accepted=len(__links),
+                        threshold=max_price,
+                    )
+                if not __page["has_next"]:
+                    break
         # Что: перед SQL этапом — опционально удаляем изменившиеся объявления
         # Зачем: чтобы они попали далее как «новые» в стандартный pipeline
         if recheck_titles_enabled() and included_titles:
@@ -1129,93 +1360,129 @@ async def catalog(session: ClientSession, query: str, proxy: ProxySettings, max_
                 )
 
         logging.info(f"Ids count - \"{len(result)}\"")
-        return result, this_cycle
+        return result, this_cycle, accepted_cards
+
 
+def open_proxy_session(proxy: ProxySettings):
+    # Что: сессия на прокси из реестра (или новая, если реестр выключен)
+    # Зачем: тёплые соединения через прокси и cookie jar между задачами
+    return session_registry.session(proxy, on_open=lambda _session: Cookies.forget(proxy))
 
-class Connector:
-    connector: TCPConnector = ...
+
+async def spare_proxy(exclude: set[str]) -> Optional[ProxySettings]:
+    """Прокси для failover: следующий по выбору продюсера, не из exclude."""
+    for _ in range(len(proxies)):
+        proxy = await next_proxy()
+        if proxy['server'] not in exclude:
+            return proxy
+    return None
 
 
 @broker_cl.task("task_collect_loop")
-async def task_collect_loop(query: str, proxy: ProxySettings, max_price: Optional[float] = None) -> None:
+async def task_collect_loop(
+    query: str,
+    proxy: ProxySettings,
+    max_price: Optional[float] = None,
+    requeues: int = 0,
+) -> None:
     now_ts = time()
     await redis.zadd(CATALOG_PROCESSING_ZSET, {query: now_ts})
     await redis.hset(CATALOG_OWNER_HASH, query, WORKER_ID)
+    requeue: Optional[BaseException] = None
     try:
-        async with ClientSession(
-            headers={
-                "User-Agent": "Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:141.0) Gecko/20100101 Firefox/141.0",
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-                "Accept-Language": "ru-RU,ru;q=0.8,en-US;q=0.5,en;q=0.3",
-                "Sec-GPC": "1",
-                "Upgrade-Insecure-Requests": "1",
-                "Sec-Fetch-Dest": "document",
-                "Sec-Fetch-Mode": "navigate",
-                "Sec-Fetch-Site": "none",
-                "Sec-Fetch-User": "?1",
-                "Priority": "u=0, i"
-            },
-            proxy=f"http://{proxy['username']}:{proxy['password']}@{proxy['server']}",
-            raise_for_status=True,
-            # connector=TCPConnector(limit=1)
-        ) as session:
-            if excel_log.enabled():
-                excel_log.log_event(
-                    'task_collect_start',
-                    query=query,
-                    proxy=proxy['server'],
-                    threshold=max_price,
-                )
-            with Timer("catalog"):
-                ids, this_cycle = await catalog(session, query, proxy, max_price=max_price)
-            TRACK_LOGGER.info(
-                "catalog result query=%s new_ids=%s",
-                query,
-                len(ids),
-            )
-            if ids:
-                # refresh processing timestamp while catalog items are being dispatched
-                try:
-                    await redis.zadd(
-                        CATALOG_PROCESSING_ZSET,
-                        {query: time()},
-                        xx=True,
-                    )
-                    await redis.hset(CATALOG_OWNER_HASH, query, WORKER_ID)
-                except Exception:
-                    pass
-                anchor = ids[0]
-                try:
-                    TRACK_LOGGER.info(
-                        "set_zip_code start item=%s query=%s proxy=%s",
-                        anchor,
-                        query,
-                        proxy['server'],
-                    )
-                    await set_zip_code(session, anchor)
-                    TRACK_LOGGER.info(
-                        "set_zip_code ok item=%s query=%s proxy=%s",
-                        anchor,
-                        query,
-                        proxy['server'],
-                    )
-                except Exception:
-                    TRACK_LOGGER.exception(
-                        "set_zip_code failed item=%s query=%s proxy=%s",
-                        anchor,
-                        query,
-                        proxy['server'],
+        # Что: общий бюджет задачи; Зачем: зависшее соединение не держит слот воркера вечно
+        async with deadline.stage("task", deadline.TASK_BUDGET, label=query):
+            # Что: прокси назначен при постановке в очередь; Зачем: за это время он мог уйти в cooldown
+            proxy = await proxy_scheduler.reassign(redis_controller, proxies, proxy)
+            # Что: маршрут задачи — прокси и сессия, которые failover может сменить
+            async with TaskRoute(proxy, open_proxy_session, spare_proxy, Delay.carry, label=query) as route:
+                if excel_log.enabled():
+                    excel_log.log_event(
+                        'task_collect_start',
+                        query=query,
+                        proxy=proxy['server'],
+                        threshold=max_price,
                     )
-                    raise
-                for _id in ids:
+                with Timer("catalog"):
+                    ids, this_cycle, cards = await catalog(route, query, max_price=max_price)
+                TRACK_LOGGER.info(
+                    "catalog result query=%s new_ids=%s",
+                    query,
+                    len(ids),
+                )
+                if ids and catalog_ingest.enabled():
+                    # Что: лоты с полной карточкой пишем из каталога; Зачем: без /itm/ и Delay на каждый
+                    with Timer("catalog ingest"):
+                        ids = await catalog_ingest.ingest(query, this_cycle, cards, ids)
                     TRACK_LOGGER.info(
-                        "product dispatch item=%s query=%s cycle=%s",
-                        _id,
+                        "catalog ingest query=%s product_ids=%s",
                         query,
-                        this_cycle,
+                        len(ids),
                     )
-                    with Timer("product iteration"):
-                        await product(session, _id, query, this_cycle, proxy)
+                if ids:
+                    # refresh processing timestamp while catalog items are being dispatched
+                    try:
+                        await redis.zadd(
+                            CATALOG_PROCESSING_ZSET,
+                            {query: time()},
+                            xx=True,
+                        )
+                        await redis.hset(CATALOG_OWNER_HASH, query, WORKER_ID)
+                    except Exception:
+                        pass
+                    anchor = ids[0]
+                    try:
+                        TRACK_LOGGER.info(
+                            "set_zip_code start item=%s query=%s proxy=%s",
+                            anchor,
+                            query,
+                            route.proxy['server'],
+                        )
+                        # Что: запрос через прокси — тоже по токену бакета, как в product()
+                        await token_bucket.acquire(redis_controller, route.proxy)
+                        try:
+                            await set_zip_code(route.session, anchor)
+                        except ClientConnectorError:
+                            # Что: соединение не установлено — запрос не ушёл, токен возвращаем
+                            await token_bucket.refund(redis_controller, route.proxy)
+                            raise
+                        TRACK_LOGGER.info(
+                            "set_zip_code ok item=%s query=%s proxy=%s",
+                            anchor,
+                            query,
+                            route.proxy['server'],
+                        )
+                    except Exception:
+                        TRACK_LOGGER.exception(
+                            "set_zip_code failed item=%s query=%s proxy=%s",
+                            anchor,
+                            query,
+                            route.proxy['server'],
+                        )
+                        raise
+                    async def fetch(_id: int) -> None:
+                        TRACK_LOGGER.info(
+                            "product dispatch item=%s query=%s cycle=%s",
+                            _id,
+                            query,
+                            this_cycle,
+                        )
+                        try:
+                            with Timer("product iteration"):
+                                async with deadline.stage("item", deadline.ITEM_BUDGET, label=_id):
+                                    await product(route, _id, query, this_cycle)
+                        except deadline.DeadlineExceeded:
+                            # Что: товар не записан (или допишется пачкой позже) — следующий цикл его найдёт
+                            TRACK_LOGGER.warning("product deadline item=%s query=%s", _id, query)
+
+                    # Что: товары — с ограниченным параллелизмом (по умолчанию по одному)
+                    # Зачем: не ждать сеть каждого товара последовательно; темп держит Delay
+                    await product_fetcher.run(ids, fetch, lambda: route.proxy['server'])
+    except (deadline.DeadlineExceeded, retry_policy.CircuitOpen) as exc:
+        # Что: вышел срок задачи или её прокси закрыт breaker'ом, а переехать некуда
+        if getattr(exc, "stage", "task") != "task" or requeues >= deadline.MAX_REQUEUES:
+            raise
+        requeue = exc
     finally:
         try:
             await redis.srem(CATALOG_QUEUE_DEDUP_SET, query)
@@ -1237,6 +1504,16 @@ async def task_collect_loop(query: str, proxy: ProxySettings, max_price: Optiona
                     get_running_loop().call_soon(sys.exit, 0)
             except Exception as exc:
                 logging.warning("CATALOG_ONE_SHOT: не удалось проверить очередь cl_my: %s", exc)
+    if requeue is not None:
+        # Что: после finally — чтобы ключ дедупликации достался новой задаче
+        logging.warning("Task %r requeue #%s: %s", query, requeues + 1, requeue)
+        await redis.sadd(CATALOG_QUEUE_DEDUP_SET, query)
+        await task_collect_loop.kiq(
+            query=query,
+            proxy=await next_proxy(),
+            max_price=max_price,
+            requeues=requeues + 1,
+        )
 
 
 @broker_cl.on_event(TaskiqEvents.WORKER_STARTUP)
@@ -1256,14 +1533,72 @@ async def startup_cl(*args, **kw) -> None:
         await duplicate_cache.bootstrap(Path(__file__).resolve().parent)
     except Exception:
         logging.exception("duplicate cache bootstrap failed")
-    global _heartbeat_task
+    global _heartbeat_task, _proxy_health_task, _pacing_task, _proxy_scheduler_task, _cookie_cache_task
+    global _challenge_lease_task
     if _heartbeat_task is None:
         _heartbeat_task = start_heartbeat(redis_controller, worker_id=WORKER_ID)
+    if _proxy_health_task is None:
+        _proxy_health_task = proxy_health.start(redis_controller, proxies)
+    if _pacing_task is None:
+        _pacing_task = pacing.start(redis_controller)
+    if _proxy_scheduler_task is None:
+        _proxy_scheduler_task = proxy_scheduler.start(redis_controller)
+    if _cookie_cache_task is None:
+        _cookie_cache_task = cookie_cache.start(redis_session)
+    if _challenge_lease_task is None:
+        _challenge_lease_task = challenge_lease.start(redis_controller)
 
 
 @broker_cl.on_event(TaskiqEvents.WORKER_SHUTDOWN)
 async def shutdown_cl(*args, **kw) -> None:
-    global _heartbeat_task
+    global _heartbeat_task, _proxy_health_task, _pacing_task, _proxy_scheduler_task, _cookie_cache_task
+    global _challenge_lease_task
+    parse_pool.shutdown()
+    await diagnostics.aclose()
+    await session_registry.aclose()
+    if _proxy_health_task is not None:
+        _proxy_health_task.cancel()
+        try:
+            await _proxy_health_task
+        except CancelledError:
+            pass
+        _proxy_health_task = None
+    if _pacing_task is not None:
+        _pacing_task.cancel()
+        try:
+            await _pacing_task
+        except CancelledError:
+            pass
+        _pacing_task = None
+    try:
+        await pacing.aclose(redis_controller)
+    except Exception:
+        logging.exception("pacing final sync failed")
+    if _proxy_scheduler_task is not None:
+        _proxy_scheduler_task.cancel()
+        try:
+            await _proxy_scheduler_task
+        except CancelledError:
+            pass
+        _proxy_scheduler_task = None
+    try:
+        await proxy_scheduler.aclose(redis_controller)
+    except Exception:
+        logging.exception("proxy scheduler final flush failed")
+    if _cookie_cache_task is not None:
+        _cookie_cache_task.cancel()
+        try:
+            await _cookie_cache_task
+        except CancelledError:
+            pass
+        _cookie_cache_task = None
+    if _challenge_lease_task is not None:
+        _challenge_lease_task.cancel()
+        try:
+            await _challenge_lease_task
+        except CancelledError:
+            pass
+        _challenge_lease_task = None
     task = _heartbeat_task
     _heartbeat_task = None
     if task is None:
@@ -1279,6 +1614,13 @@ async def shutdown_cl(*args, **kw) -> None:
         pass
 
 
+async def next_proxy() -> ProxySettings:
+    """Прокси для новой задачи: по оценке планировщика или по кругу со здоровыми."""
+    if proxy_scheduler.enabled():
+        return await proxy_scheduler.pick(redis_controller, proxies, PROXIES)
+    return await proxy_health.next_healthy(redis_controller, PROXIES, len(proxies))
+
+
 async def main() -> None:
     logging.basicConfig(level=logging.DEBUG)
     try:
@@ -1287,10 +1629,17 @@ async def main() -> None:
         pass
     DataBase.init()
     await broker_cl.startup()
-    for proxy in proxies:
-        cookie = await redis_session.get(proxy['server'])
-        if not cookie:
-            await redis_session.set(proxy['server'], '{}')
+    if cookie_manager.enabled():
+        # Что: вместо заглушки '{}' — настоящие cookies для всех прокси сразу
+        await broker_pw.startup()
+        await cookie_manager.prewarm(redis_session, proxies, warm_cookies)
+        # Что: ссылку держим до конца main(); Зачем: иначе задачу может собрать GC
+        cookie_manager_task = cookie_manager.start(redis_session, proxies, stock_cookies, cookies_swapped)
+    else:
+        for proxy in proxies:
+            cookie = await redis_session.get(proxy['server'])
+            if not cookie:
+                await redis_session.set(proxy['server'], '{}')
     await sleep(10)
     async with DataBase.session_marker() as session_maker:
         while True:
@@ -1311,7 +1660,8 @@ async def main() -> None:
                         query: str = query[0]
                         await session_maker.commit()
                         logging.info(f"QUERY SEND - {query}")
-                        await task_collect_loop.kiq(query=query, proxy=next(PROXIES), max_price=MAX_PRICE)
+                        proxy = await next_proxy()
+                        await task_collect_loop.kiq(query=query, proxy=proxy, max_price=MAX_PRICE)
                         break
                     except Exception as ex:
                         logging.warning(ex, stack_info=True)
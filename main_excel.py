@@ -63,9 +63,10 @@ async def _enqueue_query(query: str, max_price: Optional[float]) -> Optional[flo
             length = await core.redis.llen("cl_my")
             assert length < 10000, "Очередь переполнена"
             logging.info(f"QUERY SEND (excel) - {query} (max_price={mp})")
+            proxy = await core.next_proxy()
             await core.task_collect_loop.kiq(
                 query=query,
-                proxy=next(core.PROXIES),
+                proxy=proxy,
                 max_price=mp,
             )
             return mp
@@ -207,10 +208,18 @@ async def main() -> None:
     await core.broker_cl.startup()
 
     # Прогреваем cookies для прокси
-    for proxy in core.proxies:
-        cookie = await core.redis_session.get(proxy['server'])
-        if not cookie:
-            await core.redis_session.set(proxy['server'], '{}')
+    if core.cookie_manager.enabled():
+        # Что: настоящие cookies для всех прокси сразу и фоновый запас
+        await core.broker_pw.startup()
+        await core.cookie_manager.prewarm(core.redis_session, core.proxies, core.warm_cookies)
+        cookie_manager_task = core.cookie_manager.start(
+            core.redis_session, core.proxies, core.stock_cookies, core.cookies_swapped
+        )
+    else:
+        for proxy in core.proxies:
+            cookie = await core.redis_session.get(proxy['server'])
+            if not cookie:
+                await core.redis_session.set(proxy['server'], '{}')
 
     # Парсинг Excel только при старте
     pairs = list(read_excel_queries(excel_path))
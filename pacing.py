@@ -0,0 +1,194 @@
+"""Темп запросов через прокси: время следующей отправки ведётся в процессе.
+
+PACING_ENGINE=1 — Delay больше не спит после обработки товара и не ходит в
+Redis на каждый запрос. Для каждого прокси в памяти хранятся текущая пауза
+(AIMD: DELAY_STEP вниз на успехе и вверх на ошибке, в пределах
+DELAY_MIN..DELAY_MAX) и момент, раньше которого следующий запрос не уходит.
+Ждём перед отправкой, так что пауза перекрывается разбором, записью в БД и
+стримом. С Redis (redis_controller, ключ — server прокси, как и раньше)
+пауза сверяется раз в PACING_SYNC_INTERVAL секунд фоновой задачей: если
+другой процесс её поднял, берём большую.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from dataclasses import dataclass, field
+from time import monotonic
+from typing import Optional
+
+from redis.asyncio import Redis
+
+DELAY_DEFAULT = 0.9125 / 100
+DELAY_STEP = 0.1825 / 100
+DELAY_MIN = 0.1825 / 100
+DELAY_MAX = 3.75 / 100
+DELAY_NO_PROXY = 0.45625 / 100
+
+
+def _as_bool(value: Optional[str]) -> bool:
+    if not value:
+        return False
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+_ENABLED: bool = _as_bool(os.getenv("PACING_ENGINE"))
+_SYNC_INTERVAL: float = float(os.getenv("PACING_SYNC_INTERVAL", "5"))
+_LOG_FILE: str = os.getenv("PACING_LOG_FILE", "pacing.log")
+
+_logger = logging.getLogger("pacing")
+if not _logger.handlers:
+    _handler = logging.FileHandler(_LOG_FILE, encoding="utf-8")
+    _handler.setFormatter(logging.Formatter(
+        fmt="%(asctime)s | %(levelname)s | %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    ))
+    _logger.addHandler(_handler)
+_logger.setLevel(logging.INFO)
+_logger.propagate = False
+
+
+@dataclass(slots=True)
+class _State:
+    delay: float
+    next_send: float = 0.0
+    # Что: значение, которое мы последний раз видели/писали в Redis
+    synced: Optional[float] = None
+    dirty: bool = False
+    sends: int = 0
+    waited: float = 0.0
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+_states: dict[str, _State] = {}
+_no_proxy_next: float = 0.0
+
+
+def enabled() -> bool:
+    return _ENABLED
+
+
+def step(delay: float, ok: bool) -> float:
+    """Правило AIMD: успех уменьшает паузу, ошибка увеличивает."""
+    if ok:
+        return max(DELAY_MIN, delay - DELAY_STEP) if delay > DELAY_MIN else delay
+    return min(DELAY_MAX, delay + DELAY_STEP) if delay < DELAY_MAX else delay
+
+
+async def _state(redis: Redis, server: str) -> _State:
+    state = _states.get(server)
+    if state is not None:
+        return state
+    # Что: один GET на прокси за жизнь процесса; Зачем: продолжить с общей паузы
+    try:
+        remote = await redis.get(server)
+    except Exception as ex:
+        _logger.warning("load failed proxy=%s err=%s", server, ex)
+        remote = None
+    state = _states.get(server)
+    if state is None:
+        delay = float(remote) if remote is not None else DELAY_DEFAULT
+        state = _states[server] = _State(delay=delay, synced=delay if remote is not None else None)
+    return state
+
+
+async def acquire(redis: Redis, server: Optional[str]) -> None:
+    """Ждёт, пока через прокси можно отправить следующий запрос."""
+    global _no_proxy_next
+    if not server:
+        wait = _no_proxy_next - monotonic()
+        _no_proxy_next = max(_no_proxy_next, monotonic()) + DELAY_NO_PROXY
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return
+    state = await _state(redis, server)
+    async with state.lock:
+        wait = state.next_send - monotonic()
+        if wait > 0:
+            state.waited += wait
+            await asyncio.sleep(wait)
+        state.next_send = monotonic() + state.delay
+        state.sends += 1
+
+
+def feedback(server: Optional[str], ok: bool) -> float:
+    """Учитывает исход запроса; возвращает новую паузу прокси."""
+    if not server:
+        return DELAY_NO_PROXY
+    state = _states.get(server)
+    if state is None:
+        state = _states[server] = _State(delay=DELAY_DEFAULT)
+    delay = step(state.delay, ok)
+    if delay != state.delay:
+        state.delay = delay
+        state.dirty = True
+    if not ok:
+        # Что: после ошибки следующая отправка — не раньше новой паузы от текущего момента
+        state.next_send = max(state.next_send, monotonic() + delay)
+    return delay
+
+
+def inherit(source: str, target: str) -> None:
+    """Переносит паузу прокси source на target (не уменьшая её у target)."""
+    state = _states.get(source)
+    if state is None:
+        return
+    other = _states.get(target)
+    if other is None:
+        _states[target] = _State(delay=state.delay, dirty=True)
+    elif state.delay > other.delay:
+        other.delay = state.delay
+        other.dirty = True
+
+
+async def sync(redis: Redis) -> None:
+    """Сверка пауз с Redis: чужое повышение берём, своё значение пишем."""
+    for server, state in list(_states.items()):
+        try:
+            remote = await redis.get(server)
+            if remote is not None and float(remote) != state.synced:
+                merged = max(state.delay, float(remote))
+                if merged != state.delay:
+                    _logger.info("adopt proxy=%s local=%.5f remote=%.5f", server, state.delay, float(remote))
+                    state.delay = merged
+                    state.dirty = True
+            if state.dirty:
+                await redis.set(server, state.delay)
+                state.dirty = False
+            state.synced = state.delay
+        except Exception as ex:
+            _logger.warning("sync failed proxy=%s err=%s", server, ex)
+
+
+async def _loop(redis: Redis) -> None:
+    _logger.info("pacing started interval=%s", _SYNC_INTERVAL)
+    try:
+        while True:
+            await asyncio.sleep(_SYNC_INTERVAL)
+            await sync(redis)
+            for server, state in _states.items():
+                if state.sends:
+                    _logger.info(
+                        "proxy=%s delay=%.5f sends=%s waited=%.2fs",
+                        server, state.delay, state.sends, state.waited,
+                    )
+                    state.sends = 0
+                    state.waited = 0.0
+    except asyncio.CancelledError:
+        _logger.info("pacing cancelled")
+        raise
+
+
+def start(redis: Redis) -> Optional[asyncio.Task[None]]:
+    """Создаёт фоновую задачу сверки. Возвращает task или None, если отключено."""
+    if not _ENABLED or _SYNC_INTERVAL <= 0:
+        return None
+    return asyncio.create_task(_loop(redis))
+
+
+async def aclose(redis: Redis) -> None:
+    """Последняя сверка при остановке воркера."""
+    if _ENABLED:
+        await sync(redis)
@@ -70,6 +70,7 @@ class PackageCommit:
     _lock: asyncio.Lock = asyncio.Lock()
     _pending: List[_PendingItem] = []
     _flush_task: Optional[asyncio.Task[None]] = None
+    _inline_flushes: set[asyncio.Task[None]] = set()
     _batch_size: int = int(os.getenv("DB_BATCH_SIZE", "10"))
     _flush_delay: float = float(os.getenv("DB_BATCH_DELAY", "0.05"))
 
@@ -147,10 +148,21 @@ class PackageCommit:
                     cls._flush_task = asyncio.create_task(cls._delayed_flush())
 
         if pending_batch:
-            await cls._flush_batch(pending_batch)
+            # Что: пачку пишет отдельная задача; Зачем: отмена одного ожидающего
+            # (срок стадии commit) не обрывает вставку остальных товаров пачки
+            flush = asyncio.create_task(cls._flush_batch(pending_batch))
+            cls._inline_flushes.add(flush)
+            flush.add_done_callback(cls._inline_flush_done)
 
         await future
 
+    @classmethod
+    def _inline_flush_done(cls, task: asyncio.Task[None]) -> None:
+        cls._inline_flushes.discard(task)
+        if not task.cancelled():
+            # Что: ошибка уже передана в future товаров пачки
+            task.exception()
+
     @classmethod
     def _drain_pending_locked(cls) -> List[_PendingItem]:
         if not cls._pending:
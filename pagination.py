@@ -0,0 +1,111 @@
+"""Страницы каталога: последовательно или с упреждающей загрузкой.
+
+PAGINATION_SPECULATIVE=1 — после первой страницы число страниц берётся из
+счётчика результатов в h1 (_ipg=240 лотов на страницу), и страницы
+2..N (не больше PAGINATION_MAX_PAGES) запрашиваются сразу, по
+PAGINATION_CONCURRENCY одновременно. catalog() по-прежнему получает их
+строго по порядку номеров и сам решает, где остановиться (has_next):
+фильтры и дедупликация продавцов между страницами работают как раньше,
+а лишние начатые загрузки отменяются. Страницы за пределами плана
+(счётчик оказался меньше) догружаются по одной, как без флага.
+PAGINATION_PROXIES — сколько дополнительных прокси делят страницы задачи.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import os
+import re
+from time import monotonic
+from typing import AsyncIterator, Awaitable, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+PAGE_SIZE = 240
+
+
+def _as_bool(value: Optional[str]) -> bool:
+    if not value:
+        return False
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+_ENABLED: bool = _as_bool(os.getenv("PAGINATION_SPECULATIVE"))
+_CONCURRENCY: int = max(int(os.getenv("PAGINATION_CONCURRENCY", "4")), 1)
+_MAX_PAGES: int = max(int(os.getenv("PAGINATION_MAX_PAGES", "20")), 1)
+EXTRA_PROXIES: int = max(int(os.getenv("PAGINATION_PROXIES", "0")), 0)
+_LOG_FILE: str = os.getenv("PAGINATION_LOG_FILE", "pagination.log")
+
+_logger = logging.getLogger("pagination")
+if not _logger.handlers:
+    _handler = logging.FileHandler(_LOG_FILE, encoding="utf-8")
+    _handler.setFormatter(logging.Formatter(
+        fmt="%(asctime)s | %(levelname)s | %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    ))
+    _logger.addHandler(_handler)
+_logger.setLevel(logging.INFO)
+_logger.propagate = False
+
+
+def enabled() -> bool:
+    return _ENABLED
+
+
+def planned_pages(count_text: Optional[str]) -> int:
+    """Число страниц по тексту счётчика из h1 ("1,234" → 6); без счётчика — 1."""
+    digits = re.sub(r"\D", "", count_text or "")
+    if not digits:
+        return 1
+    return max(math.ceil(int(digits) / PAGE_SIZE), 1)
+
+
+async def pages(
+    fetch: Callable[[int], Awaitable[T]],
+    plan: Callable[[T], int],
+    on_plan: Optional[Callable[[int], Awaitable[None]]] = None,
+    label: str = "",
+) -> AsyncIterator[tuple[int, T]]:
+    """Отдаёт (номер, страница) по порядку, начиная с 1.
+
+    Следующая страница запрашивается (или дожидается) только когда
+    потребитель просит её; закрывать через contextlib.aclosing.
+    """
+    first = await fetch(1)
+    yield 1, first
+    planned = min(plan(first), _MAX_PAGES) if _ENABLED else 1
+    tasks: dict[int, asyncio.Task[T]] = {}
+    if planned > 1:
+        if on_plan is not None:
+            await on_plan(planned)
+        limit = asyncio.Semaphore(_CONCURRENCY)
+
+        async def one(number: int) -> T:
+            async with limit:
+                return await fetch(number)
+
+        tasks = {number: asyncio.create_task(one(number)) for number in range(2, planned + 1)}
+    started = monotonic()
+    number = 2
+    try:
+        while True:
+            task = tasks.pop(number, None)
+            yield number, (await task if task is not None else await fetch(number))
+            number += 1
+    finally:
+        wasted = [task for task in tasks.values() if not task.done()]
+        for task in tasks.values():
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+        if planned > 1:
+            _logger.info(
+                "query=%s planned=%s last=%s cancelled=%s duration=%.1fs",
+                label,
+                planned,
+                number,
+                len(wasted),
+                monotonic() - started,
+            )
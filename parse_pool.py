@@ -0,0 +1,171 @@
+"""Опциональный пул процессов для разбора HTML каталога и товара.
+
+PARSE_POOL_ENABLED=1 — разбор уходит в ProcessPoolExecutor, event loop воркера
+занят только вводом-выводом. PARSE_POOL_WORKERS — размер пула (по умолчанию
+число ядер). В процесс уходят байты ответа и кодировка, обратно приходят простые dict.
+Каждый вызов пишет в PARSE_POOL_LOG_FILE ожидание в очереди и время разбора.
+Если процесс пула упал (BrokenProcessPool), пул пересоздаётся при следующем
+вызове, а текущий разбор выполняется в процессе воркера.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict
+from time import time
+from typing import Any, Callable, Optional
+
+try:
+    from . import diagnostics  # package mode
+    from .catalog_parser import parse_catalog_page
+    from .product_extractor import ProductRecord, debug_span_value, parse_html, parse_product
+except ImportError:
+    import diagnostics  # type: ignore
+    from catalog_parser import parse_catalog_page  # type: ignore
+    from product_extractor import (  # type: ignore
+        ProductRecord,
+        debug_span_value,
+        parse_html,
+        parse_product,
+    )
+
+
+def _as_bool(value: Optional[str]) -> bool:
+    if not value:
+        return False
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+_ENABLED: bool = _as_bool(os.getenv("PARSE_POOL_ENABLED"))
+_WORKERS: int = int(os.getenv("PARSE_POOL_WORKERS", "0")) or os.cpu_count() or 1
+_LOG_FILE: str = os.getenv("PARSE_POOL_LOG_FILE", "parse_pool.log")
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+_logger = logging.getLogger("parse_pool")
+if not _logger.handlers:
+    _handler = logging.FileHandler(_LOG_FILE, encoding="utf-8")
+    _handler.setFormatter(logging.Formatter(
+        fmt="%(asctime)s | %(levelname)s | %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    ))
+    _logger.addHandler(_handler)
+_logger.setLevel(logging.INFO)
+_logger.propagate = False
+
+
+def enabled() -> bool:
+    return _ENABLED
+
+
+def _catalog_job(
+    data: str | bytes,
+    encoding: Optional[str] = None,
+) -> tuple[dict[str, Any], float, float]:
+    started = time()
+    result = parse_catalog_page(data, encoding)
+    return result, started, time()
+
+
+def _product_job(
+    data: str | bytes,
+    encoding: Optional[str] = None,
+    capture: bool = False,
+) -> tuple[dict[str, Any], float, float]:
+    started = time()
+    record, tree = parse_product(data, encoding)
+    result = asdict(record)
+    if capture:
+        # Что: диагностика только для выбранных товаров, пока дерево под рукой
+        # Зачем: без лишнего разбора страницы на каждом товаре
+        if tree is not None:
+            page_text = diagnostics.snippet_from_tree(tree)
+        else:
+            page_text = diagnostics.snippet_from_raw(data, encoding)
+            tree = parse_html(data, encoding)
+        result["diag"] = {"page_text": page_text, "xpath_value": debug_span_value(tree)}
+    return result, started, time()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # Что: spawn, а не fork; Зачем: не тащить в детей открытые сокеты и потоки воркера
+        _executor = ProcessPoolExecutor(
+            max_workers=_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        _logger.info("pool_started workers=%s", _WORKERS)
+    return _executor
+
+
+async def _run(
+    kind: str,
+    job: Callable[..., tuple[dict[str, Any], float, float]],
+    data: str | bytes,
+    *args: Any,
+) -> dict[str, Any]:
+    submitted = time()
+    if _ENABLED:
+        loop = asyncio.get_running_loop()
+        executor = _get_executor()
+        try:
+            result, started, finished = await loop.run_in_executor(executor, job, data, *args)
+            mode = "pool"
+        except BrokenProcessPool as ex:
+            _logger.warning("pool_broken kind=%s err=%s", kind, ex)
+            _discard(executor)
+            # Что: этот разбор — в процессе воркера; Зачем: страница уже скачана
+            result, started, finished = job(data, *args)
+            mode = "fallback"
+    else:
+        result, started, finished = job(data, *args)
+        mode = "inline"
+    done = time()
+    _logger.info(
+        "parse kind=%s mode=%s size=%s wait=%.4fs parse=%.4fs total=%.4fs",
+        kind,
+        mode,
+        len(data),
+        max(started - submitted, 0.0),
+        finished - started,
+        done - submitted,
+    )
+    return result
+
+
+async def parse_catalog(data: str | bytes, encoding: Optional[str] = None) -> dict[str, Any]:
+    """Страница каталога → dict из catalog_parser.parse_catalog_page."""
+    return await _run("catalog", _catalog_job, data, encoding)
+
+
+async def parse_product_record(
+    data: str | bytes,
+    encoding: Optional[str] = None,
+    capture: bool = False,
+) -> tuple[ProductRecord, Optional[dict[str, Optional[str]]]]:
+    """Страница товара → (ProductRecord, данные для diagnostics.record или None)."""
+    result = await _run("product", _product_job, data, encoding, capture)
+    diag = result.pop("diag", None)
+    return ProductRecord(**result), diag
+
+
+def _discard(executor: ProcessPoolExecutor) -> None:
+    """Забывает сломанный пул; следующий вызов создаст новый."""
+    global _executor
+    if _executor is executor:
+        _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown() -> None:
+    """Останавливает пул (вызывается при остановке воркера)."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
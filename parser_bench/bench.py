@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""Бенчмарк реализаций разбора на корпусе parser_bench (сеть не нужна).
+
+    python parser_bench/bench.py [--kind item|catalog] [--impl NAME] [--repeat N]
+
+Для каждой реализации печатает pages/s, время по полям/фазам (мс на страницу)
+и пиковую память. Память меряется в отдельном процессе на реализацию:
+tracemalloc (Python-куча) и пик RSS за проход (VmHWM после сброса через
+/proc/self/clear_refs) — он учитывает память libxml2, которую tracemalloc не видит.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import resource
+import subprocess
+import sys
+import tracemalloc
+from collections import defaultdict
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Callable, Iterator
+
+from corpus import Implementation, fixtures, implementations
+
+import embedded_json
+import reference
+from bs4 import BeautifulSoup
+from catalog_less_match_guard import stop_index_tree
+from field_spec import CATALOG_CARD_SPEC, CATALOG_ITEMS, CATALOG_PAGE_SPEC, PRODUCT_SPEC
+from product_extractor import REQUIRED_FIELDS, parse_html
+
+Phase = tuple[str, Callable[[], Any]]
+
+
+def _item_reference(data: bytes) -> Iterator[Phase]:
+    holder: dict[str, Any] = {}
+
+    def build() -> None:
+        holder["page"] = reference.HtmlParse1(data)
+
+    yield "parse", build
+    for name in (*reference.PRODUCT_FIELDS, "xpath_value"):
+        yield name, lambda name=name: getattr(holder["page"], name)
+
+
+def _item_dom(data: bytes) -> Iterator[Phase]:
+    holder: dict[str, Any] = {}
+
+    def build() -> None:
+        holder["tree"] = parse_html(data)
+
+    yield "parse", build
+    for rule in PRODUCT_SPEC.fields:
+        yield rule.name, lambda rule=rule: rule(holder["tree"])
+
+
+def _item_json(data: bytes) -> Iterator[Phase]:
+    holder: dict[str, Any] = {}
+
+    def lookup() -> None:
+        holder["found"] = embedded_json.extract(data)
+
+    yield "json extract", lookup
+    found = holder["found"]
+    if any(not found.get(name) for name in REQUIRED_FIELDS):
+        tree: dict[str, Any] = {}
+        yield "parse", lambda: tree.update(root=parse_html(data))
+        for rule in PRODUCT_SPEC.fields:
+            if rule.name not in found and rule.name != "xpath_value":
+                yield rule.name, lambda rule=rule: rule(tree["root"])
+
+
+def _catalog_reference(data: bytes) -> Iterator[Phase]:
+    yield "parse", lambda: BeautifulSoup(data, "lxml")
+    yield "parse + cards", lambda: reference.catalog_page(data)
+
+
+def _catalog_parser(data: bytes) -> Iterator[Phase]:
+    holder: dict[str, Any] = {}
+
+    def build() -> None:
+        holder["tree"] = parse_html(data)
+
+    def items() -> None:
+        found = CATALOG_ITEMS(holder["tree"])
+        holder["items"] = found[:stop_index_tree(holder["tree"], found)]
+
+    yield "parse", build
+    yield "page fields", lambda: CATALOG_PAGE_SPEC(holder["tree"])
+    yield "items + fewer words", items
+    yield "card fields", lambda: [CATALOG_CARD_SPEC(li) for li in holder["items"]]
+
+
+# Что: разбивка на фазы/поля для каждой реализации (остальные — только итог)
+_PHASES: dict[tuple[str, str], Callable[[bytes], Iterator[Phase]]] = {
+    ("item", "reference"): _item_reference,
+    ("item", "dom"): _item_dom,
+    ("item", "json"): _item_json,
+    ("catalog", "reference"): _catalog_reference,
+    ("catalog", "parser"): _catalog_parser,
+}
+
+
+def _throughput(impl: Implementation, bodies: list[bytes], repeat: int) -> float:
+    for data in bodies:
+        impl.func(data)
+    started = perf_counter()
+    for _ in range(repeat):
+        for data in bodies:
+            impl.func(data)
+    return repeat * len(bodies) / (perf_counter() - started)
+
+
+def _phase_times(impl: Implementation, bodies: list[bytes], repeat: int) -> dict[str, float]:
+    phases = _PHASES.get((impl.kind, impl.name))
+    if phases is None:
+        return {}
+    totals: dict[str, float] = defaultdict(float)
+    for _ in range(repeat):
+        for data in bodies:
+            for label, func in phases(data):
+                started = perf_counter()
+                func()
+                totals[label] += perf_counter() - started
+    pages = repeat * len(bodies)
+    return {label: total * 1000 / pages for label, total in totals.items()}
+
+
+def _status_kb(field: str) -> int:
+    match = re.search(rf"{field}:\s+(\d+)", Path("/proc/self/status").read_text())
+    return int(match.group(1)) if match else 0
+
+
+def _reset_peak_rss() -> bool:
+    # Что: "5" сбрасывает VmHWM до текущего RSS (Linux 4.0+)
+    try:
+        Path("/proc/self/clear_refs").write_text("5")
+    except OSError:
+        return False
+    return True
+
+
+def _memory_probe(kind: str, name: str) -> None:
+    """Выполняется в дочернем процессе: один проход по корпусу под tracemalloc."""
+    impl = implementations(kind, [name])[0]
+    bodies = [fixture.body() for fixture in fixtures(kind)]
+    impl.func(bodies[0])
+    resettable = _reset_peak_rss()
+    rss_before = _status_kb("VmRSS") if resettable else resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    for data in bodies:
+        impl.func(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_peak = _status_kb("VmHWM") if resettable else resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"tracemalloc_peak": peak, "rss_peak_delta_kb": rss_peak - rss_before}))
+
+
+def _memory(impl: Implementation) -> dict[str, int]:
+    output = subprocess.run(
+        [sys.executable, str(Path(__file__).resolve()), "--memory-probe", impl.kind, impl.name],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--kind", choices=("item", "catalog"))
+    parser.add_argument("--impl", action="append", help="имя реализации (можно несколько)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--memory-probe", nargs=2, metavar=("KIND", "IMPL"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.memory_probe:
+        _memory_probe(*args.memory_probe)
+        return 0
+
+    for kind in ("item", "catalog"):
+        if args.kind and kind != args.kind:
+            continue
+        corpus = fixtures(kind)
+        bodies = [fixture.body() for fixture in corpus]
+        if not bodies:
+            continue
+        size = sum(len(data) for data in bodies)
+        print(f"== {kind}: {len(bodies)} pages, {size / 1024:.0f} KiB, repeat={args.repeat}")
+        for impl in implementations(kind, args.impl):
+            rate = _throughput(impl, bodies, args.repeat)
+            memory = _memory(impl)
+            print(
+                f"-- {impl.name}: {rate:.1f} pages/s, "
+                f"tracemalloc peak {memory['tracemalloc_peak'] / 1024:.0f} KiB, "
+                f"peak RSS +{memory['rss_peak_delta_kb']} KiB"
+            )
+            for label, ms in _phase_times(impl, bodies, args.repeat).items():
+                print(f"     {label:24} {ms:8.3f} ms/page")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Сравнение should_stop(li) по каждой карточке и stop_index(html, items) на странице.
+
+Запуск из корня репозитория:
+    python parser_bench/bench_fewer_words.py [путь_к_html] [повторы]
+По умолчанию берётся parser_bench/corpus/catalog/catalog_240.html (240 карточек).
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import sys
+from pathlib import Path
+from time import perf_counter
+
+# Что: фильтр должен быть включён до импорта модуля (флаг читается при импорте)
+os.environ["CATALOG_FILTER_FEWER_WORDS"] = "1"
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+from catalog_less_match_guard import should_stop, stop_index  # noqa: E402
+
+_DEFAULT = Path(__file__).resolve().parent / "corpus" / "catalog" / "catalog_240.html"
+
+
+def _per_card(items: list) -> int:
+    for index, li in enumerate(items):
+        if should_stop(li):
+            return index
+    return len(items)
+
+
+def _measure(func, repeats: int) -> tuple[int, float]:
+    result = func()
+    started = perf_counter()
+    for _ in range(repeats):
+        func()
+    return result, (perf_counter() - started) / repeats
+
+
+def main() -> None:
+    path = Path(sys.argv[1]) if len(sys.argv) > 1 else _DEFAULT
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    html = BeautifulSoup(path.read_text(encoding="utf-8"), "lxml")
+    items = html.find_all("li", {"id": re.compile(r"item")})
+
+    old_index, old_time = _measure(lambda: _per_card(items), repeats)
+    new_index, new_time = _measure(lambda: stop_index(html, items), repeats)
+
+    print(f"page: {path.name}, cards: {len(items)}")
+    print(f"should_stop per card: index={old_index} {old_time * 1000:.1f} ms")
+    print(f"stop_index per page:  index={new_index} {new_time * 1000:.2f} ms")
+    print(f"speedup: x{old_time / new_time:.0f}")
+    if old_index != new_index:
+        raise SystemExit(f"MISMATCH: {old_index} != {new_index}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Пополнение корпуса parser_bench.
+
+    python parser_bench/capture.py synthetic       # синтетические страницы + ожидаемые JSON
+    python parser_bench/capture.py import DIR      # страницы, снятые воркером
+    python parser_bench/capture.py regen           # пересчитать все <имя>.json эталоном
+
+Снять страницы с работающего воркера: DIAG_CAPTURE_DIR=/path и
+DIAG_SAMPLE_RATE (или DIAG_ITEM_IDS) — diagnostics сохранит сырые ответы в
+DIR/item/<item_id>.html и DIR/catalog/<query>_<page>.html. Затем `import DIR`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import shutil
+import sys
+from pathlib import Path
+
+import catalog_page
+import item_page
+from corpus import CORPUS_DIR, KINDS, Fixture, fixtures, write_expected
+
+# Что: набор синтетических карточек — по одной на каждую ветку правил
+_SYNTHETIC_ITEMS = {
+    "item_basic": dict(seed=1),
+    "item_no_ld": dict(seed=2, with_ld=False),
+    "item_no_specifics": dict(seed=3, with_specifics=False),
+    "item_sold_out": dict(seed=4, sold_out=True),
+    "item_free_shipping": dict(seed=5, shipping="Free"),
+    "item_country_specific": dict(seed=6, variant=1),
+    "item_blocked_desc": dict(seed=7, blocked_desc=True),
+    "item_large": dict(seed=8, filler=1000),
+    # Что: встроенный JSON закрывает все поля — быстрый путь без дерева lxml
+    "item_json_full": dict(seed=9, full_model=True),
+}
+_SYNTHETIC_CATALOGS = {
+    "catalog_240": dict(cards=240, boundary=180),
+    "catalog_40_no_boundary": dict(cards=40, boundary=None, seed=40),
+}
+
+
+def _save(kind: str, name: str, data: bytes) -> Fixture:
+    path = CORPUS_DIR / kind / f"{name}.html"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    fixture = Fixture(kind, name, path)
+    write_expected(fixture)
+    print(f"saved {kind}/{name} ({len(data)} bytes)")
+    return fixture
+
+
+def synthetic() -> None:
+    for name, params in _SYNTHETIC_ITEMS.items():
+        _save("item", name, item_page.build(**params).encode("utf-8"))
+    for name, params in _SYNTHETIC_CATALOGS.items():
+        _save("catalog", name, catalog_page.build(**params).encode("utf-8"))
+
+
+def import_dir(source: Path) -> None:
+    for kind in KINDS:
+        for path in sorted((source / kind).glob("*.html")):
+            target = CORPUS_DIR / kind / path.name
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(path, target)
+            write_expected(Fixture(kind, target.stem, target))
+            print(f"imported {kind}/{target.stem}")
+
+
+def regen() -> None:
+    for fixture in fixtures():
+        write_expected(fixture)
+        print(f"regenerated {fixture.kind}/{fixture.name}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("synthetic")
+    imported = sub.add_parser("import")
+    imported.add_argument("source", type=Path)
+    sub.add_parser("regen")
+    args = parser.parse_args()
+    if args.command == "synthetic":
+        synthetic()
+    elif args.command == "import":
+        import_dir(args.source)
+    else:
+        regen()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Синтетическая страница поиска eBay (разметка s-card) для бенчмарков разбора.
+
+Запуск: python parser_bench/catalog_page.py — перезаписывает corpus/catalog/catalog_240.html.
+"""
+
+from __future__ import annotations
+
+import random
+from pathlib import Path
+
+FIXTURE = Path(__file__).resolve().parent / "corpus" / "catalog" / "catalog_240.html"
+
+_WORDS = (
+    "brake caliper rotor pad front rear left right oem genuine assembly kit "
+    "honda toyota ford bmw audi sensor pump filter bearing hub ceramic"
+).split()
+
+
+def _card(rnd: random.Random, index: int) -> str:
+    item_id = 100000000000 + rnd.randrange(10**11)
+    title = " ".join(rnd.choice(_WORDS) for _ in range(rnd.randint(6, 12))).title()
+    price = f"${rnd.randint(5, 900)}.{rnd.randint(0, 99):02d}"
+    seller = f"seller_{rnd.randint(1, 400)}"
+    href = f"https://www.ebay.com/itm/{item_id}?_skw=brake&hash=item{index:x}&itmprp=enc%3AAQ"
+    return (
+        f'<li id="item{item_id:x}{index}" class="s-card s-card--horizontal" data-listingid="{item_id}">'
+        '<div class="su-card-container su-card-container--horizontal">'
+        f'<div class="su-card-container__media"><a href="{href}" tabindex="-1">'
+        f'<img class="s-card__image" src="https://i.ebayimg.com/images/g/{index}/s-l500.webp" alt="{title}"></a></div>'
+        '<div class="su-card-container__content"><div class="su-card-container__header">'
+        f'<a class="su-link" href="{href}"><div role="heading" class="s-card__title">'
+        f'<span class="su-styled-text primary default">{title}</span></div></a>'
+        '<div class="s-card__subtitle-row"><div class="s-card__subtitle">'
+        '<span class="su-styled-text secondary default">Pre-Owned · OEM</span></div></div></div>'
+        '<div class="su-card-container__attributes"><div class="su-card-container__attributes__primary">'
+        f'<div class="s-card__attribute-row"><span class="su-styled-text primary bold large-1 s-card__price">{price}</span></div>'
+        '<div class="s-card__attribute-row"><span class="su-styled-text secondary large">or Best Offer</span></div>'
+        f'<div class="s-card__attribute-row"><span class="su-styled-text secondary large">+${rnd.randint(0, 40)}.99 delivery</span></div>'
+        '<div class="s-card__attribute-row"><span class="su-styled-text secondary large">Located in United States</span></div>'
+        '</div><div class="su-card-container__attributes__secondary">'
+        f'<div class="s-card__attribute-row"><span class="su-styled-text primary large">{seller} 99.{rnd.randint(0, 9)}% positive ({rnd.randint(1, 99)}K)</span></div>'
+        '</div></div></div></div>'
+        '<!--F#f_0--></li>'
+    )
+
+
+def build(cards: int = 240, boundary: int | None = 180, seed: int = 240) -> str:
+    """HTML страницы с cards карточками; перед boundary — блок «fewer words»."""
+    rnd = random.Random(seed)
+    parts = [
+        "<!DOCTYPE html><html lang=\"en\"><head><meta charset=\"utf-8\">",
+        "<title>brake caliper for sale | eBay</title>",
+        '<script>window.SRP={"config":{"hint":"Results matching fewer words"}};</script>',
+        "<style>.s-card{display:flex}</style></head><body>",
+        '<div id="gh"><header><span class="gh-logo">eBay</span></header></div>',
+        '<div class="srp-main srp-main--isLarge"><div class="srp-controls">',
+        f'<h1 class="srp-controls__count-heading"><span class="BOLD">{cards * 11:,}</span> '
+        '<span>results for <span class="BOLD">brake caliper</span></span></h1></div>',
+        '<div class="srp-rail__left"><ul class="x-refine__main__list">',
+    ]
+    for facet in range(120):
+        parts.append(
+            f'<li class="x-refine__main__list--value"><a href="#f{facet}">'
+            f'<span class="cbx x-refine__multi-select-cbx">{rnd.choice(_WORDS).title()}</span>'
+            f'<span class="x-refine__multi-select-count">({rnd.randint(1, 9999)})</span></a></li>'
+        )
+    parts.append('</ul></div><div class="srp-river-results"><ul class="srp-results srp-list clearfix">')
+    for index in range(cards):
+        if index == boundary:
+            parts.append(
+                '<li class="srp-river-answer srp-river-answer--REWRITE_START">'
+                '<div class="srp-river-answer__content"><div class="section-notice">'
+                '<h3 class="section-notice__title"><span>Results matching fewer words</span></h3>'
+                "</div></div></li>"
+            )
+        parts.append(_card(rnd, index))
+    parts.append("</ul></div>")
+    parts.append(
+        '<nav class="pagination"><a class="pagination__previous" href="#">Previous</a>'
+        '<a class="pagination__next" href="#">Next</a></nav></div>'
+    )
+    parts.append('<script>$MC=(window.$MC||[]).concat({"w":[]})</script></body></html>')
+    return "".join(parts)
+
+
+if __name__ == "__main__":
+    FIXTURE.write_text(build(), encoding="utf-8")
+    print(f"written {FIXTURE} ({FIXTURE.stat().st_size} bytes)")
@@ -0,0 +1,134 @@
+"""Корпус страниц parser_bench: загрузка, ожидаемые значения и реализации.
+
+Раскладка: corpus/item/<имя>.html и corpus/catalog/<имя>.html, рядом
+<имя>.json — ожидаемый результат эталона (reference.py). Сейчас в корпусе
+только синтетические страницы (item_page.py / catalog_page.py): они
+проверяют, что новые правила совпадают со старыми на одних и тех же
+данных, но не то, что правила верны на живой разметке eBay. Настоящие
+страницы добавляются через capture.py import. Импорт модуля
+выставляет окружение, при котором правила совпадают с продовым разбором
+(фильтр «fewer words» включён), и добавляет корень репозитория в sys.path.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable
+
+# Что: флаги читаются модулями при импорте — выставляем до импорта парсеров
+os.environ.setdefault("CATALOG_FILTER_FEWER_WORDS", "1")
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent))
+sys.path.insert(0, str(BENCH_DIR))
+
+from catalog_parser import parse_catalog_page  # noqa: E402
+from product_extractor import debug_span_value, parse_product  # noqa: E402
+
+import reference  # noqa: E402
+
+CORPUS_DIR = BENCH_DIR / "corpus"
+KINDS = ("item", "catalog")
+# Что: страницы товара, которые быстрый путь обязан разобрать без дерева lxml
+TREELESS: frozenset[str] = frozenset({"item_json_full"})
+
+
+@dataclass(slots=True)
+class Fixture:
+    kind: str
+    name: str
+    path: Path
+
+    @property
+    def expected_path(self) -> Path:
+        return self.path.with_suffix(".json")
+
+    def body(self) -> bytes:
+        return self.path.read_bytes()
+
+    def expected(self) -> dict[str, Any]:
+        return json.loads(self.expected_path.read_text(encoding="utf-8"))
+
+
+def fixtures(kind: str | None = None) -> list[Fixture]:
+    found = []
+    for current in KINDS:
+        if kind and current != kind:
+            continue
+        for path in sorted((CORPUS_DIR / current).glob("*.html")):
+            found.append(Fixture(current, path.stem, path))
+    return found
+
+
+def to_json(value: Any) -> Any:
+    """Кортежи → списки: так значения сравнимы с сохранённым JSON."""
+    if isinstance(value, dict):
+        return {key: to_json(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_json(item) for item in value]
+    return value
+
+
+def write_expected(fixture: Fixture) -> dict[str, Any]:
+    """Пересчитывает <имя>.json эталоном."""
+    func = REFERENCE[fixture.kind]
+    expected = to_json(func(fixture.body()))
+    fixture.expected_path.write_text(
+        json.dumps(expected, ensure_ascii=False, indent=2) + "\n", encoding="utf-8"
+    )
+    return expected
+
+
+def _product(use_json: bool) -> Callable[[bytes], dict[str, Any]]:
+    def run(data: bytes) -> dict[str, Any]:
+        record, tree = parse_product(data, use_json=use_json)
+        result = {name: getattr(record, name) for name in reference.PRODUCT_FIELDS}
+        result["xpath_value"] = debug_span_value(tree) if tree is not None else None
+        return result
+    return run
+
+
+@dataclass(slots=True)
+class Implementation:
+    """Реализация разбора.
+
+    strict=False — сверяются только поля, которые читает product(), а цена и
+    доставка — как числа (JSON отдаёт "123.45" вместо "US $123.45").
+    known — поля, где расхождение с эталоном ожидаемо: печатаются, но не валят прогон.
+    """
+
+    kind: str
+    name: str
+    func: Callable[[bytes], dict[str, Any]]
+    strict: bool = True
+    known: frozenset[str] = frozenset()
+
+
+REFERENCE: dict[str, Callable[[bytes], dict[str, Any]]] = {
+    "item": reference.product_fields,
+    "catalog": reference.catalog_page,
+}
+
+# Что: реализации, которые сверяются с эталоном и меряются бенчмарком
+IMPLEMENTATIONS: list[Implementation] = [
+    Implementation("item", "reference", reference.product_fields),
+    Implementation("item", "dom", _product(use_json=False)),
+    # Что: эталон берёт condition первым совпадением «condition» по всей странице
+    # (часто «eBay» из скриптов <head>), JSON — подпись из блока состояния
+    Implementation(
+        "item", "json", _product(use_json=True), strict=False,
+        known=frozenset({"condition"}),
+    ),
+    Implementation("catalog", "reference", reference.catalog_page),
+    Implementation("catalog", "parser", parse_catalog_page),
+]
+
+
+def implementations(kind: str, names: list[str] | None = None) -> list[Implementation]:
+    return [
+        impl for impl in IMPLEMENTATIONS
+        if impl.kind == kind and (not names or impl.name in names)
+    ]
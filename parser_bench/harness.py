@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""Сверка реализаций разбора с эталоном корпуса поле за полем.
+
+Запуск из корня репозитория (сеть не нужна):
+    python parser_bench/harness.py [--kind item|catalog] [--impl dom --impl json]
+Код возврата 1, если хоть одно поле разошлось.
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+import sys
+from typing import Any, Optional
+
+from corpus import TREELESS, Fixture, Implementation, fixtures, implementations, to_json
+from product_extractor import parse_product
+
+# Что: поля, которые product() пишет в БД/стрим (для нестрогих реализаций)
+_CONSUMED = (
+    "price_without_delivery",
+    "delivery",
+    "title",
+    "location",
+    "condition",
+    "seller",
+    "brand",
+    "short_description",
+    "specifics",
+)
+
+
+def _price(raw: Optional[str]) -> Optional[float]:
+    # Что: тот же разбор, что в product()
+    matches = re.findall(r"[.\d]+", raw or "")
+    return float(matches[0]) if matches else None
+
+
+def _delivery(raw: Optional[str]) -> float:
+    if raw and "free" not in raw.lower():
+        matches = [chunk for chunk in re.findall(r"[.\d]+", raw) if chunk.strip('.')]
+        return float(matches[0]) if matches else 0.0
+    return 0.0
+
+
+_NORMALIZE = {"price_without_delivery": _price, "delivery": _delivery}
+
+
+def _diff_item(
+    impl: Implementation,
+    expected: dict[str, Any],
+    actual: dict[str, Any],
+) -> tuple[list[str], list[str]]:
+    fields = list(expected) if impl.strict else list(_CONSUMED)
+    problems, notes = [], []
+    for name in fields:
+        want, got = expected.get(name), actual.get(name)
+        if not impl.strict and name in _NORMALIZE:
+            want, got = _NORMALIZE[name](want), _NORMALIZE[name](got)
+        if want != got:
+            line = f"{name}: expected {want!r}, got {got!r}"
+            (notes if name in impl.known else problems).append(line)
+    return problems, notes
+
+
+def _diff_catalog(expected: dict[str, Any], actual: dict[str, Any]) -> list[str]:
+    problems = []
+    for name in ("has_h1", "count", "has_next"):
+        if expected[name] != actual[name]:
+            problems.append(f"{name}: expected {expected[name]!r}, got {actual[name]!r}")
+    want, got = expected["cards"], actual["cards"]
+    if len(want) != len(got):
+        problems.append(f"cards: expected {len(want)}, got {len(got)}")
+    for index, (left, right) in enumerate(zip(want, got)):
+        for name in left:
+            if left[name] != right.get(name):
+                problems.append(
+                    f"cards[{index}].{name}: expected {left[name]!r}, got {right.get(name)!r}"
+                )
+    return problems
+
+
+def check(fixture: Fixture, impl: Implementation) -> tuple[list[str], list[str]]:
+    """(расхождения, ожидаемые расхождения из impl.known)."""
+    expected = fixture.expected()
+    actual = to_json(impl.func(fixture.body()))
+    if fixture.kind == "item":
+        return _diff_item(impl, expected, actual)
+    return _diff_catalog(expected, actual), []
+
+
+def check_treeless(fixture: Fixture) -> list[str]:
+    """Быстрый путь не должен строить дерево, если JSON закрыл все поля."""
+    __, tree = parse_product(fixture.body(), use_json=True)
+    return [] if tree is None else ["json: lxml tree built"]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--kind", choices=("item", "catalog"))
+    parser.add_argument("--impl", action="append", help="имя реализации (можно несколько)")
+    args = parser.parse_args()
+
+    failed = 0
+    checked = 0
+    for fixture in fixtures(args.kind):
+        if not fixture.expected_path.exists():
+            print(f"SKIP {fixture.kind}/{fixture.name}: нет {fixture.expected_path.name}")
+            continue
+        for impl in implementations(fixture.kind, args.impl):
+            checked += 1
+            problems, notes = check(fixture, impl)
+            status = "ok" if not problems else "FAIL"
+            print(f"{status:4} {fixture.kind}/{fixture.name} [{impl.name}]")
+            for line in problems:
+                print(f"       {line}")
+            for line in notes:
+                print(f"       known: {line}")
+            failed += bool(problems)
+        if fixture.kind == "item" and fixture.name in TREELESS and (not args.impl or "json" in args.impl):
+            checked += 1
+            problems = check_treeless(fixture)
+            print(f"{'ok' if not problems else 'FAIL':4} {fixture.kind}/{fixture.name} [json, no tree]")
+            for line in problems:
+                print(f"       {line}")
+            failed += bool(problems)
+    print(f"checked={checked} failed={failed}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""Синтетическая карточка товара eBay (разметка vi/x-*) для корпуса и бенчмарков.
+
+Страница повторяет то, на что опираются правила разбора: ld+json Product,
+meta description, x-price-primary, Shipping:/Located in, seller card,
+dl/dt/dd item specifics, iframe описания, комментарии <!--F#...--> и
+«шум» из карусели рекомендаций.
+"""
+
+from __future__ import annotations
+
+import json
+import random
+import sys
+
+
+def build(
+    seed: int = 1,
+    filler: int = 150,
+    with_ld: bool = True,
+    with_specifics: bool = True,
+    sold_out: bool = False,
+    blocked_desc: bool = False,
+    price: str = "US $123.45",
+    shipping: str = "US $15.20",
+    variant: int = 0,
+    full_model: bool = False,
+) -> str:
+    """HTML карточки; filler — число карточек в блоке рекомендаций (размер страницы).
+
+    full_model — ld+json с продавцом и additionalProperty и textSpans «Located in»
+    в модели страницы: встроенный JSON закрывает все поля product().
+    """
+    rnd = random.Random(seed)
+    title = f"Genuine OEM Brake Caliper Assembly {seed} Front Left 45018-{seed:04d}"
+    seller = f"parts_seller_{seed}"
+    located = "Located in: Brooklyn, New York, United States"
+    specs = [
+        ("Condition", "New: A brand-new, unused item"),
+        ("Brand", "Honda"),
+        ("Manufacturer Part Number", f"45018-{seed:04d}"),
+        ("Placement on Vehicle", "Front, Left"),
+        ("Type", "Brake Caliper"),
+        ("Warranty", "1 Year"),
+    ]
+    if variant % 2:
+        specs.append(("Country/Region of Manufacture", "Japan"))
+    desc = (
+        "Find many great new &amp; used options and get the best deals for " + title
+        + (" Salvage core" if blocked_desc else "") + " at the best online prices at eBay!"
+    )
+    ld = {
+        "@context": "https://schema.org",
+        "@type": "Product",
+        "name": title,
+        "brand": {"@type": "Brand", "name": "Honda"},
+        "mpn": f"45018-{seed:04d}",
+        "offers": {
+            "@type": "Offer",
+            "price": price.replace("US $", ""),
+            "priceCurrency": "USD",
+            "itemCondition": "https://schema.org/NewCondition",
+            "shippingDetails": {
+                "@type": "OfferShippingDetails",
+                "shippingRate": {
+                    "@type": "MonetaryAmount",
+                    "value": shipping.replace("US $", "") if shipping != "Free" else "0",
+                    "currency": "USD",
+                },
+            },
+        },
+    }
+    if full_model:
+        ld["offers"]["seller"] = {"@type": "Organization", "name": seller}
+        ld["additionalProperty"] = [
+            {"@type": "PropertyValue", "name": name, "value": value} for name, value in specs
+        ]
+    parts = [
+        '<!DOCTYPE html><!--[if IE 9]><html class="ie9"><![endif]-->',
+        '<html lang="en"><head><meta charset="utf-8"><title>' + title + " | eBay</title>",
+        f'<meta name="description" content="{desc}">',
+        '<meta property="og:title" content="' + title + '">',
+        '<script>window.SRP={"config":{"condition":"x","mpn":"tracking"}};</script>',
+    ]
+    if with_ld:
+        parts.append('<script type="application/ld+json">' + json.dumps(ld) + "</script>")
+    parts.append('<style>.x-price-primary{color:red}</style></head><body class="vi-body">')
+    parts.append(
+        '<div id="gh"><header><span class="gh-logo">eBay</span><!--F#f_1-->'
+        "<span>Shop by category</span></header></div>"
+    )
+    # Что: body > div:nth-of-type(2) > main — путь, по которому снимается xpath_debug
+    parts.append('<div class="main-container"><main id="mainContent"><div class="vim"><div class="x-evo">')
+    parts.append('<div class="a"></div><div class="b"></div><div class="c"></div>')
+    parts.append(
+        '<div class="d"><div><div><div class="e1"></div><div class="e2"><div><div>'
+        '<div class="f1"></div><div class="f2"></div><div class="f3"><div><div><div>'
+        "<span>Debug <b>value</b> 42</span></div></div></div>"
+        "</div></div></div></div></div></div>"
+    )
+    parts.append(
+        '<div class="x-item-title"><h1 class="x-item-title__mainTitle">'
+        '<span class="ux-textspans ux-textspans--BOLD">' + title + "</span></h1></div>"
+    )
+    if sold_out:
+        parts.append('<div class="d-quantity"><span class="ux-textspans">CURRENTLY SOLD OUT</span></div>')
+    parts.append(
+        '<div class="x-price-primary" data-testid="x-price-primary">'
+        '<span class="ux-textspans">' + price + "</span><!--F#f_2--></div>"
+    )
+    parts.append(
+        '<div class="x-item-condition"><div class="x-item-condition-label">'
+        '<span class="ux-textspans">Condition:</span></div>'
+        '<div class="x-item-condition-text"><span class="ux-textspans">New<!--F#c--></span></div></div>'
+    )
+    parts.append(
+        '<div class="ux-labels-values--shipping"><div class="ux-labels-values__labels">'
+        '<span class="ux-textspans">Shipping:</span></div><div class="ux-labels-values__values">'
+        '<span class="ux-textspans ux-textspans--BOLD">' + shipping + "</span> "
+        '<span class="ux-textspans">Expedited Shipping</span>'
+        f'<span class="ux-textspans ux-textspans--SECONDARY">{located}</span>'
+        "</div></div>"
+    )
+    parts.append(
+        '<div class="x-sellercard-atf"><div class="x-sellercard-atf__info">'
+        f'<div class="x-sellercard-atf__info__about-seller" title="{seller}">'
+        f'<a href="#"><span class="ux-textspans ux-textspans--BOLD">{seller}</span></a></div></div></div>'
+    )
+    parts.append("</div></div></main></div>")
+    if with_specifics:
+        parts.append('<div class="vim x-about-this-item"><div class="ux-layout-section-evo">')
+        for name, value in specs:
+            parts.append(
+                '<dl class="ux-labels-values"><dt class="ux-labels-values__labels"><div><div>'
+                f'<span class="ux-textspans">{name}</span></div></div></dt>'
+                '<dd class="ux-labels-values__values"><div><div>'
+                f'<span class="ux-textspans">{value}</span><!--F#s--></div></div></dd></dl>'
+            )
+        parts.append("</div></div>")
+    parts.append(
+        '<div class="d-item-description"><iframe id="desc_ifr" '
+        f'src="https://vi.vipr.ebaydesc.com/ws/eBayISAPI.dll?item={seed}"></iframe></div>'
+    )
+    parts.append('<div class="merch">')
+    for index in range(filler):
+        parts.append(
+            f'<div class="card"><a href="https://www.ebay.com/itm/{rnd.randrange(10**11, 10**12)}">'
+            '<div class="img"><img src="x.jpg"></div>'
+            f'<div class="t"><span class="txt">Related part {index} for sale brake rotor pad kit</span></div>'
+            f'<div class="p"><span class="price">${rnd.randrange(5, 500)}.{rnd.randrange(10, 99)}</span>'
+            f"<!--F#{index}--></div></a></div>"
+        )
+    parts.append("</div>")
+    model: dict = {"k": 1}
+    if full_model:
+        model["itemLocation"] = {"textSpans": [{"_type": "TextSpan", "text": located}]}
+    parts.append(
+        '<script>$MC=(window.$MC||[]).concat({"w":[["s0-1",0,'
+        + json.dumps({"model": model}, separators=(",", ":")) + "]]})</script>"
+    )
+    parts.append("<footer><span>Copyright 1995-2025 eBay Inc.</span></footer></body></html>")
+    return "".join(parts)
+
+
+if __name__ == "__main__":
+    sys.stdout.write(build(int(sys.argv[1]) if len(sys.argv) > 1 else 1))
@@ -0,0 +1,216 @@
+"""Эталонный разбор на BeautifulSoup — правила до перехода на lxml.
+
+Копия старых HtmlParse1 (свойство = отдельный поиск по дереву), разбора
+item specifics и xpath_debug из product(), а также цикла по карточкам из
+catalog() с should_stop. Код намеренно не меняется: по нему сверяются новые
+реализации (harness.py) и генерируются ожидаемые значения корпуса.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Any, Callable, Optional
+
+from bs4 import BeautifulSoup
+
+from catalog_less_match_guard import should_stop
+
+_DEBUG_CSS = (
+    "html > body > div:nth-of-type(2) > main > div:nth-of-type(1) > div:nth-of-type(1) "
+    "> div:nth-of-type(4) > div > div > div:nth-of-type(2) > div > div:nth-of-type(1) "
+    "> div:nth-of-type(3) > div:nth-of-type(1) > div > div > span"
+)
+
+
+def get_element(func: Callable) -> Optional[Any]:
+    try:
+        return func()
+    except Exception:
+        return None
+
+
+class HtmlParse1:
+    def __init__(self, _text: str | bytes):
+        self.text = _text
+        self.html = BeautifulSoup(_text, 'lxml')
+
+    @property
+    def mpn(self) -> Optional[str]:
+        return get_element(
+            lambda: self.html
+            .find(string=re.compile(r"(manufacturer part number|mpn|MPN)"))
+            .find_next("span")
+            .text.strip()
+        )
+
+    @property
+    def delivery(self) -> Optional[str]:
+        return get_element(
+            lambda: self.html
+            .find(string="Shipping:")
+            .find_next("span")
+            .text.strip()
+        )
+
+    @property
+    def price_without_delivery(self) -> Optional[str]:
+        return get_element(
+            lambda: self.html
+            .find("div", {"class": "x-price-primary"})
+            .text.strip()
+        )
+
+    @property
+    def location(self) -> Optional[str]:
+        return get_element(
+            lambda: self.html
+            .find(string=re.compile("Located in"))
+            .text.strip()
+        )
+
+    @property
+    def brand(self) -> Optional[str]:
+        return get_element(
+            lambda: [*filter(
+                lambda _: _.find(string=re.compile('^(Brand|Hersteller)', re.IGNORECASE)),
+                self.html.find_all("dt")
+            )][0].span.find_next("span").text.strip()
+        )
+
+    @property
+    def condition(self) -> Optional[str]:
+        return get_element(
+            lambda: self.html
+            .find(string=re.compile('Condition', re.IGNORECASE))
+            .find_next("span")
+            .text.strip()
+        )
+
+    @property
+    def title(self) -> Optional[str]:
+        return get_element(
+            lambda: self.html.find("h1").text.strip()
+        )
+
+    @property
+    def seller(self) -> Optional[str]:
+        return get_element(
+            lambda: self.html
+            .find("div", {"class": "x-sellercard-atf__info__about-seller"})
+            .find('span')
+            .text.strip()
+        )
+
+    @property
+    def description_href(self) -> Optional[str]:
+        return get_element(
+            lambda: self.html.find("iframe", {"id": "desc_ifr"})["src"]
+        )
+
+    @property
+    def short_description(self) -> Optional[str]:
+        return get_element(
+            lambda: self.html.find("meta", {"name": "description"})["content"]
+        )
+
+    @property
+    def specifics(self) -> list[tuple[str, str]]:
+        pairs = []
+        for item in self.html.find_all('dl'):
+            dt = item.find('dt')
+            dd = item.find('dd')
+            if dt and dd:
+                pairs.append((dt.text.strip(), dd.text.strip()))
+        return pairs
+
+    @property
+    def xpath_value(self) -> Optional[str]:
+        el = self.html.select_one(_DEBUG_CSS)
+        return (el.get_text(strip=True) or None) if el else None
+
+
+# Что: поля в порядке ProductRecord; Зачем: одинаковый порядок в отчётах
+PRODUCT_FIELDS: tuple[str, ...] = (
+    "mpn",
+    "delivery",
+    "price_without_delivery",
+    "location",
+    "brand",
+    "condition",
+    "title",
+    "seller",
+    "description_href",
+    "short_description",
+    "specifics",
+)
+
+
+def product_fields(data: str | bytes) -> dict[str, Any]:
+    """Поля карточки товара + xpath_value, как их видел старый product()."""
+    page = HtmlParse1(data)
+    result = {name: getattr(page, name) for name in PRODUCT_FIELDS}
+    result["xpath_value"] = page.xpath_value
+    return result
+
+
+def extract_catalog_seller(li: Any) -> Optional[str]:
+    el = li.select_one(
+        ".s-card__program-badge-container--sellerOrStoreInfo .su-styled-text"
+    )
+    if not el:
+        el = li.select_one(
+            ".su-card-container__attributes__secondary .su-styled-text.primary.large"
+        )
+    if not el:
+        return None
+    text = el.get_text(" ", strip=True)
+    if not text:
+        return None
+    match = re.match(r"([A-Za-z0-9._-]+)", text)
+    return match.group(1) if match else None
+
+
+def extract_catalog_title(li: Any) -> Optional[str]:
+    el = li.select_one(".s-item__title")
+    if not el:
+        el = li.select_one(".s-card__title, [role='heading']")
+    if not el:
+        a = li.find("a")
+        if a and a.get("aria-label"):
+            return a.get("aria-label").strip()
+        return None
+    txt = el.get_text(" ", strip=True)
+    return txt if txt else None
+
+
+def catalog_page(data: str | bytes) -> dict[str, Any]:
+    """Страница каталога в формате catalog_parser.parse_catalog_page (старый цикл)."""
+    html = BeautifulSoup(data, "lxml")
+    if not html.find("h1"):
+        return {"has_h1": False, "count": None, "has_next": False, "cards": []}
+    count = html.find("h1").find("span").text
+    cards = []
+    for li in html.find_all('li', {'id': re.compile(r'item')}):
+        if should_stop(li):
+            break
+        href_el = li.find('a')
+        if not href_el:
+            continue
+        href = href_el.get('href')
+        if not href:
+            continue
+        match = re.search(r"/itm/(\d+)", href)
+        price_span = li.find('span', {'class': 's-card__price'})
+        cards.append({
+            "href": href,
+            "item_id": match.group(1) if match else None,
+            "seller": extract_catalog_seller(li),
+            "title": extract_catalog_title(li),
+            "price_text": price_span.text if price_span else None,
+        })
+    return {
+        "has_h1": True,
+        "count": count,
+        "has_next": html.find("a", {"class": "pagination__next"}) is not None,
+        "cards": cards,
+    }
@@ -0,0 +1,121 @@
+"""Разбор карточки товара eBay поверх lxml по правилам field_spec."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field, fields
+from typing import Iterable, Optional
+
+from lxml import etree
+
+try:
+    from . import embedded_json  # package mode
+    from .field_spec import PRODUCT_SPEC
+except ImportError:
+    import embedded_json  # type: ignore
+    from field_spec import PRODUCT_SPEC  # type: ignore
+
+# Что: поля, которые product() пишет в БД и стрим
+# Зачем: если JSON закрыл их все, дерево не строим вовсе
+REQUIRED_FIELDS: tuple[str, ...] = (
+    "price_without_delivery",
+    "delivery",
+    "title",
+    "location",
+    "condition",
+    "seller",
+    "brand",
+    "short_description",
+    "specifics",
+)
+
+
+@dataclass(slots=True)
+class ProductRecord:
+    """Все поля карточки товара (правила — field_spec.PRODUCT_FIELDS)."""
+
+    mpn: Optional[str] = None
+    delivery: Optional[str] = None
+    price_without_delivery: Optional[str] = None
+    location: Optional[str] = None
+    brand: Optional[str] = None
+    condition: Optional[str] = None
+    title: Optional[str] = None
+    seller: Optional[str] = None
+    description_href: Optional[str] = None
+    short_description: Optional[str] = None
+    specifics: list[tuple[str, str]] = field(default_factory=list)
+
+
+_PARSERS: dict[Optional[str], etree.HTMLParser] = {}
+
+
+def parse_html(data: str | bytes, encoding: Optional[str] = None) -> Optional[etree._Element]:
+    """Строит дерево lxml (тот же парсер libxml2, что у BeautifulSoup(..., "lxml")).
+
+    bytes разбираются без декодирования в str: кодировку берём из ответа
+    (Content-Type), без неё libxml2 смотрит на <meta charset>.
+    """
+    if isinstance(data, str):
+        encoding = None
+    parser = _PARSERS.get(encoding)
+    if parser is None:
+        parser = _PARSERS[encoding] = etree.HTMLParser(encoding=encoding)
+    return etree.HTML(data, parser)
+
+
+# Что: правила полей записи; xpath_value считается отдельно, только для diagnostics
+_RECORD_FIELDS = tuple(PRODUCT_SPEC[item.name] for item in fields(ProductRecord))
+_DEBUG_SPAN = PRODUCT_SPEC["xpath_value"]
+
+
+def extract_product(
+    tree: Optional[etree._Element],
+    names: Optional[Iterable[str]] = None,
+) -> ProductRecord:
+    """Возвращает ProductRecord; пустое дерево даёт пустую запись.
+
+    names — посчитать только эти поля (остальные остаются по умолчанию).
+    """
+    record = ProductRecord()
+    if tree is None:
+        return record
+    rules = _RECORD_FIELDS if names is None else [PRODUCT_SPEC[name] for name in names]
+    for rule in rules:
+        setattr(record, rule.name, rule(tree))
+    record.specifics = [(pair["name"], pair["value"]) for pair in record.specifics]
+    return record
+
+
+def debug_span_value(tree: Optional[etree._Element]) -> Optional[str]:
+    """Значение span по фиксированному пути для xpath_debug.log (diagnostics)."""
+    if tree is None:
+        return None
+    return _DEBUG_SPAN(tree)
+
+
+def parse_product(
+    data: str | bytes,
+    encoding: Optional[str] = None,
+    use_json: Optional[bool] = None,
+) -> tuple[ProductRecord, Optional[etree._Element]]:
+    """Собирает ProductRecord: сначала встроенный JSON, DOM — только для недостающих полей.
+
+    Второй элемент — дерево lxml, если его пришлось построить (иначе None).
+    use_json=None — как в PRODUCT_JSON_FAST_PATH (явное значение нужно parser_bench).
+    """
+    if use_json is None:
+        use_json = embedded_json.enabled()
+    if not use_json:
+        tree = parse_html(data, encoding)
+        return extract_product(tree), tree
+    found = embedded_json.extract(data, encoding)
+    missing = [name for name in REQUIRED_FIELDS if not found.get(name)]
+    embedded_json.account([name for name in REQUIRED_FIELDS if found.get(name)], missing)
+    if not missing:
+        return ProductRecord(**found), None
+    tree = parse_html(data, encoding)
+    # Что: из DOM — только то, чего нет в JSON (включая поля вне REQUIRED_FIELDS)
+    record = extract_product(tree, [rule.name for rule in _RECORD_FIELDS if rule.name not in found])
+    for name, value in found.items():
+        setattr(record, name, value)
+    return record, tree
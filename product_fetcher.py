@@ -0,0 +1,149 @@
+"""Параллельная выборка товаров внутри task_collect_loop с лимитами.
+
+PRODUCT_CONCURRENCY — сколько товаров одного прокси в полёте одновременно
+(1 — как раньше, строго по одному). PRODUCT_WORKER_CONCURRENCY — общий
+потолок на процесс воркера для всех задач (0 — без общего потолка).
+Темп запросов через прокси по-прежнему задаёт Delay: параллельные товары
+ждут своей очереди на отправку в его шлюзе, а не шлют пачкой. Лимит
+прокси берётся для каждого товара по текущему прокси задачи: после
+failover новые товары считаются в лимите нового прокси.
+
+Ошибки считаются общие на весь запуск: после PRODUCT_MAX_ERRORS ошибок
+новые товары не начинаются (уже начатые доходят до конца), и первая ошибка
+пробрасывается наружу — как раньше падала задача на первом же товаре.
+CircuitOpen (retry_policy) и DeadlineExceeded (deadline) ошибками товара
+не считаются: запуск сразу останавливается и они уходят в task_collect_loop,
+чтобы задачу переставить.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from contextlib import nullcontext
+from time import monotonic
+from typing import Any, Awaitable, Callable, Optional, Sequence, TypeVar
+
+try:
+    from . import deadline, retry_policy  # package mode
+except Exception:
+    import deadline  # type: ignore
+    import retry_policy  # type: ignore
+
+T = TypeVar("T")
+
+# Что: ошибки задачи, а не товара — их решает task_collect_loop
+_FATAL = (retry_policy.CircuitOpen, deadline.DeadlineExceeded)
+
+_PER_PROXY: int = max(int(os.getenv("PRODUCT_CONCURRENCY", "1")), 1)
+_PER_WORKER: int = max(int(os.getenv("PRODUCT_WORKER_CONCURRENCY", "0")), 0)
+_MAX_ERRORS: int = max(int(os.getenv("PRODUCT_MAX_ERRORS", "1")), 1)
+_LOG_FILE: str = os.getenv("PRODUCT_FETCHER_LOG_FILE", "product_fetcher.log")
+
+_logger = logging.getLogger("product_fetcher")
+if not _logger.handlers:
+    _handler = logging.FileHandler(_LOG_FILE, encoding="utf-8")
+    _handler.setFormatter(logging.Formatter(
+        fmt="%(asctime)s | %(levelname)s | %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    ))
+    _logger.addHandler(_handler)
+_logger.setLevel(logging.INFO)
+_logger.propagate = False
+
+# Что: семафоры создаются лениво; Зачем: привязка к event loop воркера
+_proxy_limits: dict[str, asyncio.Semaphore] = {}
+_worker_limit: Optional[asyncio.Semaphore] = None
+
+
+def concurrent() -> bool:
+    return _PER_PROXY > 1
+
+
+def _limits(proxy: str) -> tuple[asyncio.Semaphore, Any]:
+    global _worker_limit
+    per_proxy = _proxy_limits.get(proxy)
+    if per_proxy is None:
+        per_proxy = _proxy_limits[proxy] = asyncio.Semaphore(_PER_PROXY)
+    if _PER_WORKER and _worker_limit is None:
+        _worker_limit = asyncio.Semaphore(_PER_WORKER)
+    return per_proxy, (_worker_limit if _PER_WORKER else nullcontext())
+
+
+async def run(
+    items: Sequence[T],
+    fetch: Callable[[T], Awaitable[None]],
+    proxy: Callable[[], str],
+) -> None:
+    """Обрабатывает items через fetch, не больше заданного числа одновременно.
+
+    proxy() — server текущего прокси задачи (после failover — уже нового).
+    """
+    if not items:
+        return
+    if not concurrent():
+        for item in items:
+            await fetch(item)
+        return
+
+    started_on = proxy()
+    stop = asyncio.Event()
+    errors: list[BaseException] = []
+    done = 0
+    started = monotonic()
+
+    async def slot() -> asyncio.Semaphore:
+        # Что: пока ждали место, задача могла переехать — тогда ждём у нового прокси
+        while True:
+            server = proxy()
+            per_proxy = _limits(server)[0]
+            await per_proxy.acquire()
+            if proxy() == server:
+                return per_proxy
+            per_proxy.release()
+
+    async def one(item: T) -> None:
+        nonlocal done
+        per_proxy = await slot()
+        try:
+            async with _limits(proxy())[1]:
+                if stop.is_set():
+                    return
+                try:
+                    await fetch(item)
+                    done += 1
+                except _FATAL:
+                    stop.set()
+                    raise
+                except Exception as exc:
+                    errors.append(exc)
+                    if len(errors) >= _MAX_ERRORS:
+                        stop.set()
+        finally:
+            per_proxy.release()
+
+    tasks = [asyncio.create_task(one(item)) for item in items]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        # Что: при отмене задачи гасим товары в порядке очереди и дожидаемся их
+        pending = [task for task in tasks if not task.done()]
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        duration = monotonic() - started
+        _logger.info(
+            "run proxy=%s last_proxy=%s items=%s done=%s errors=%s skipped=%s duration=%.1fs rate=%.2f/s",
+            started_on,
+            proxy(),
+            len(items),
+            done,
+            len(errors),
+            len(items) - done - len(errors),
+            duration,
+            done / duration if duration > 0 else 0.0,
+        )
+    if len(errors) >= _MAX_ERRORS:
+        raise errors[0]
@@ -0,0 +1,191 @@
+"""Фоновая проверка прокси вместо запроса к httpbin перед каждым запросом.
+
+PROXY_HEALTH_ENABLED=1 — воркеры запускают фоновую задачу: раз в
+PROXY_HEALTH_INTERVAL секунд один процесс (кто взял lease в Redis)
+проверяет все прокси GET на PROXY_HEALTHCHECK_URL и пишет результат:
+  proxy_health:<server>          hash ok/status/latency_ms/checked_at/fails
+  proxy_health:<server>:history  список последних PROXY_HEALTH_HISTORY проверок (JSON)
+Прокси нездоров, если подряд упало PROXY_HEALTH_MAX_FAILS проверок. Путь
+запроса ничего не проверяет сам — продюсер только читает это состояние
+(с локальным кэшем) и не отдаёт задачи нездоровым прокси.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from typing import Any, Iterator, Optional, Sequence
+
+from aiohttp import ClientSession, ClientTimeout
+from redis.asyncio import Redis
+
+try:
+    from . import request_log  # package mode
+    from .session_registry import proxy_url
+except ImportError:
+    import request_log  # type: ignore
+    from session_registry import proxy_url  # type: ignore
+
+
+def _as_bool(value: Optional[str]) -> bool:
+    if not value:
+        return False
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+_ENABLED: bool = _as_bool(os.getenv("PROXY_HEALTH_ENABLED"))
+HEALTHCHECK_URL: str = os.getenv("PROXY_HEALTHCHECK_URL", "http://httpbin.org/ip")
+_INTERVAL: float = float(os.getenv("PROXY_HEALTH_INTERVAL", "60"))
+_TIMEOUT: float = float(os.getenv("PROXY_HEALTH_TIMEOUT", "10"))
+_MAX_FAILS: int = int(os.getenv("PROXY_HEALTH_MAX_FAILS", "3"))
+_HISTORY: int = int(os.getenv("PROXY_HEALTH_HISTORY", "50"))
+_CONCURRENCY: int = int(os.getenv("PROXY_HEALTH_CONCURRENCY", "10"))
+_CACHE_TTL: float = float(os.getenv("PROXY_HEALTH_CACHE_TTL", "5"))
+_LOG_FILE: str = os.getenv("PROXY_HEALTH_LOG_FILE", "proxy_health.log")
+
+_KEY_PREFIX = "proxy_health:"
+_LEASE_KEY = "proxy_health:lease"
+_OWNER = f"{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+_logger = logging.getLogger("proxy_health")
+if not _logger.handlers:
+    _handler = logging.FileHandler(_LOG_FILE, encoding="utf-8")
+    _handler.setFormatter(logging.Formatter(
+        fmt="%(asctime)s | %(levelname)s | %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    ))
+    _logger.addHandler(_handler)
+_logger.setLevel(logging.INFO)
+_logger.propagate = False
+
+# Что: локальный кэш состояния server -> (healthy, прочитано в monotonic)
+_cache: dict[str, tuple[bool, float]] = {}
+
+
+def enabled() -> bool:
+    return _ENABLED
+
+
+def _key(server: str) -> str:
+    return _KEY_PREFIX + server
+
+
+async def _probe(proxy: Any) -> tuple[bool, Optional[int], float]:
+    """(ok, HTTP-статус или None, задержка в мс)."""
+    started = time.monotonic()
+    status: Optional[int] = None
+    try:
+        async with ClientSession(timeout=ClientTimeout(total=_TIMEOUT)) as session:
+            async with session.get(HEALTHCHECK_URL, proxy=proxy_url(proxy)) as response:
+                status = response.status
+                await response.read()
+        if request_log.enabled():
+            request_log.log_http(status, HEALTHCHECK_URL, proxy['server'])
+    except Exception as ex:
+        if request_log.enabled():
+            request_log.log_http_error(HEALTHCHECK_URL, ex, proxy['server'])
+        _logger.info("probe error proxy=%s err=%r", proxy['server'], ex)
+    return status == 200, status, (time.monotonic() - started) * 1000
+
+
+async def _store(redis: Redis, server: str, ok: bool, status: Optional[int], latency_ms: float) -> None:
+    key = _key(server)
+    now = int(time.time())
+    fails = 0 if ok else int(await redis.hincrby(key, "fails", 1))
+    mapping = {
+        "ok": int(ok),
+        "status": status if status is not None else "",
+        "latency_ms": round(latency_ms, 1),
+        "checked_at": now,
+    }
+    if ok:
+        mapping["fails"] = 0
+    entry = json.dumps({"ts": now, "ok": ok, "status": status, "latency_ms": round(latency_ms, 1)})
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.hset(key, mapping=mapping)
+        pipe.lpush(f"{key}:history", entry)
+        pipe.ltrim(f"{key}:history", 0, _HISTORY - 1)
+        await pipe.execute()
+    if not ok and fails == _MAX_FAILS:
+        _logger.warning("proxy unhealthy proxy=%s status=%s fails=%s", server, status, fails)
+
+
+async def probe_all(redis: Redis, proxies: Sequence[Any]) -> None:
+    """Один круг проверки всех прокси (не больше PROXY_HEALTH_CONCURRENCY сразу)."""
+    limit = asyncio.Semaphore(max(_CONCURRENCY, 1))
+
+    async def one(proxy: Any) -> None:
+        async with limit:
+            ok, status, latency_ms = await _probe(proxy)
+        try:
+            await _store(redis, proxy['server'], ok, status, latency_ms)
+        except Exception as ex:
+            _logger.warning("store failed proxy=%s err=%s", proxy['server'], ex)
+
+    started = time.monotonic()
+    await asyncio.gather(*(one(proxy) for proxy in proxies))
+    _logger.info("round proxies=%s duration=%.1fs", len(proxies), time.monotonic() - started)
+
+
+async def _loop(redis: Redis, proxies: Sequence[Any]) -> None:
+    _logger.info("monitor started owner=%s interval=%s url=%s", _OWNER, _INTERVAL, HEALTHCHECK_URL)
+    try:
+        while True:
+            try:
+                # Что: lease на интервал; Зачем: круг проверки один на весь парк воркеров
+                leader = await redis.set(_LEASE_KEY, _OWNER, nx=True, ex=max(int(_INTERVAL), 1))
+                if leader:
+                    await probe_all(redis, proxies)
+            except Exception as ex:
+                _logger.warning("monitor round failed err=%s", ex)
+            await asyncio.sleep(_INTERVAL)
+    except asyncio.CancelledError:
+        _logger.info("monitor cancelled owner=%s", _OWNER)
+        raise
+
+
+def start(redis: Redis, proxies: Sequence[Any]) -> Optional[asyncio.Task[None]]:
+    """Создаёт фоновую задачу проверки. Возвращает task или None, если отключено."""
+    if not _ENABLED or not proxies or _INTERVAL <= 0:
+        return None
+    return asyncio.create_task(_loop(redis, list(proxies)))
+
+
+async def is_healthy(redis: Redis, proxy: Any) -> bool:
+    """Состояние из Redis (с локальным кэшем); неизвестный прокси считается здоровым."""
+    if not _ENABLED:
+        return True
+    server = proxy['server']
+    cached = _cache.get(server)
+    now = time.monotonic()
+    if cached is not None and now - cached[1] < _CACHE_TTL:
+        return cached[0]
+    try:
+        fails = await redis.hget(_key(server), "fails")
+    except Exception as ex:
+        _logger.warning("state read failed proxy=%s err=%s", server, ex)
+        return True
+    healthy = int(fails or 0) < _MAX_FAILS
+    _cache[server] = (healthy, now)
+    return healthy
+
+
+async def next_healthy(redis: Redis, pool: Iterator[Any], size: int) -> Any:
+    """Следующий здоровый прокси из цикла pool (size — число прокси в нём).
+
+    Если здоровых нет, отдаём очередной как есть: очередь не должна вставать.
+    """
+    first = next(pool)
+    if await is_healthy(redis, first):
+        return first
+    for _ in range(max(size - 1, 0)):
+        candidate = next(pool)
+        if await is_healthy(redis, candidate):
+            _logger.info("skip unhealthy proxy=%s use=%s", first['server'], candidate['server'])
+            return candidate
+    _logger.warning("no healthy proxies, using proxy=%s", first['server'])
+    return first
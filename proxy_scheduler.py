@@ -0,0 +1,356 @@
+"""Выбор прокси по живой оценке вместо слепого cycle(PROXIES).
+
+PROXY_SCHEDULER_ENABLED=1 — продюсер выбирает прокси для задачи взвешенно
+по оценке, а task_collect_loop в начале задачи проверяет назначенный прокси
+ещё раз: если он за время в очереди ушёл в cooldown или стал заметно хуже
+лучших, задача берёт другой. Оценка строится по последним
+PROXY_SCORE_WINDOW минутам всего кластера:
+  proxy_sched:<server>:<минута>  hash requests/errors/blocks/latency_ms
+  proxy_sched:<server>           hash cookies_at (когда Playwright обновил cookies)
+и равна (1 - доля ошибок) * (1 - доля блокировок)^2 / (1 + средняя задержка, с),
+умноженной на свежесть cookies и на цену решения challenge: по последним
+PROXY_SOLVE_SAMPLES записям challenge_history:<server> (challenge_stats,
+CHALLENGE_HISTORY_ENABLED=1) — (1 - доля timeout/error) / (1 + средняя
+длительность решения / PROXY_SOLVE_SECONDS). Блокировка отправляет прокси в cooldown на
+PROXY_COOLDOWN секунд — в таблицу proxies (столбец wait), общую для всех.
+Воркеры копят счётчики в памяти и сбрасывают их фоновой задачей.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional, Sequence
+
+from redis.asyncio import Redis
+from sqlalchemy import text
+
+try:
+    from .package_commit import DataBase  # package mode
+except ImportError:
+    from package_commit import DataBase  # type: ignore
+try:
+    from . import proxy_health  # package mode
+except Exception:
+    import proxy_health  # type: ignore
+try:
+    from . import challenge_stats  # package mode
+except Exception:
+    import challenge_stats  # type: ignore
+
+
+def _as_bool(value: Optional[str]) -> bool:
+    if not value:
+        return False
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+_ENABLED: bool = _as_bool(os.getenv("PROXY_SCHEDULER_ENABLED"))
+_WINDOW: int = max(int(os.getenv("PROXY_SCORE_WINDOW", "10")), 1)
+_INTERVAL: float = float(os.getenv("PROXY_SCHEDULER_INTERVAL", "15"))
+_COOLDOWN: float = float(os.getenv("PROXY_COOLDOWN", "120"))
+_MIN_SAMPLES: int = int(os.getenv("PROXY_SCORE_MIN_SAMPLES", "5"))
+# Что: назначенный прокси остаётся, пока его оценка не ниже этой доли от лучшей
+_KEEP_RATIO: float = float(os.getenv("PROXY_SCORE_KEEP_RATIO", "0.5"))
+_COOKIE_FRESH: float = float(os.getenv("PROXY_COOKIE_FRESH", "1800"))
+_SOLVE_SAMPLES: int = max(int(os.getenv("PROXY_SOLVE_SAMPLES", "20")), 1)
+_SOLVE_MIN_SAMPLES: int = int(os.getenv("PROXY_SOLVE_MIN_SAMPLES", "3"))
+# Что: средняя длительность решения, при которой оценка прокси падает вдвое
+_SOLVE_SECONDS: float = float(os.getenv("PROXY_SOLVE_SECONDS", "60"))
+_FLOOR: float = 0.05
+_LOG_FILE: str = os.getenv("PROXY_SCHEDULER_LOG_FILE", "proxy_scheduler.log")
+
+_KEY_PREFIX = "proxy_sched:"
+
+_logger = logging.getLogger("proxy_scheduler")
+if not _logger.handlers:
+    _handler = logging.FileHandler(_LOG_FILE, encoding="utf-8")
+    _handler.setFormatter(logging.Formatter(
+        fmt="%(asctime)s | %(levelname)s | %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    ))
+    _logger.addHandler(_handler)
+_logger.setLevel(logging.INFO)
+_logger.propagate = False
+
+_COOLDOWN_UPSERT = text("""
+    insert into proxies (proxy, wait)
+    values (:proxy, now() + make_interval(secs => :secs))
+    on conflict (proxy) do update set wait = greatest(proxies.wait, excluded.wait)
+""")
+_COOLDOWN_SELECT = text("select proxy from proxies where wait > now()")
+
+# Что: несброшенные счётчики server -> [requests, errors, blocks, latency_ms]
+_pending: dict[str, list[float]] = {}
+_pending_cooldowns: set[str] = set()
+# Что: последняя прочитанная картина: оценки, cooldown (server -> до monotonic)
+_scores: dict[str, float] = {}
+_cooldowns: dict[str, float] = {}
+_loaded_at: float = float("-inf")
+_refresh_lock: Optional[asyncio.Lock] = None
+
+
+def enabled() -> bool:
+    return _ENABLED
+
+
+def _key(server: str) -> str:
+    return _KEY_PREFIX + server
+
+
+def _bucket(server: str, minute: int) -> str:
+    return f"{_KEY_PREFIX}{server}:{minute}"
+
+
+def score(
+    requests: float,
+    errors: float,
+    blocks: float,
+    latency_ms: float,
+    cookie_age: Optional[float],
+    solves: float = 0,
+    solve_failures: float = 0,
+    solve_seconds: float = 0.0,
+) -> float:
+    """Оценка прокси по счётчикам окна и последним решениям challenge; мало данных — нейтральная 1.0."""
+    if requests < _MIN_SAMPLES:
+        value = 1.0
+    else:
+        latency = latency_ms / requests / 1000
+        value = (1 - min(errors / requests, 1.0)) * (1 - min(blocks / requests, 1.0)) ** 2 / (1 + latency)
+    if cookie_age is None or cookie_age > _COOKIE_FRESH:
+        value *= 0.5
+    if solves and solves >= _SOLVE_MIN_SAMPLES:
+        cost = solve_seconds / solves / _SOLVE_SECONDS if _SOLVE_SECONDS > 0 else 0.0
+        value *= (1 - min(solve_failures / solves, 1.0)) / (1 + cost)
+    return value
+
+
+def _solves(entries: Sequence[Any]) -> tuple[int, int, float]:
+    """(решений, неудачных, суммарная длительность) из записей challenge_history."""
+    solves, failures, seconds = 0, 0, 0.0
+    for raw in entries or ():
+        try:
+            entry = json.loads(raw)
+            duration = float(entry["duration"])
+        except (ValueError, KeyError, TypeError):
+            continue
+        solves += 1
+        failures += entry.get("outcome") in ("timeout", "error")
+        seconds += duration
+    return solves, failures, seconds
+
+
+def record(proxy: Any, latency: float, outcome: str) -> None:
+    """Учитывает запрос через прокси: outcome — ok / error / block."""
+    if not _ENABLED or not proxy:
+        return
+    server = proxy['server']
+    counters = _pending.setdefault(server, [0, 0, 0, 0.0])
+    counters[0] += 1
+    counters[1] += outcome == "error"
+    counters[2] += outcome == "block"
+    counters[3] += latency * 1000
+    if outcome == "block":
+        # Что: локально — сразу; в таблицу proxies — при ближайшем сбросе
+        _cooldowns[server] = time.monotonic() + _COOLDOWN
+        _pending_cooldowns.add(server)
+
+
+@contextmanager
+def observe(proxy: Any, block_errors: tuple[type[BaseException], ...] = ()) -> Iterator[None]:
+    """Замеряет запрос в блоке with и записывает исход через record()."""
+    started = time.monotonic()
+    try:
+        yield
+    except block_errors:
+        record(proxy, time.monotonic() - started, "block")
+        raise
+    except Exception:
+        record(proxy, time.monotonic() - started, "error")
+        raise
+    record(proxy, time.monotonic() - started, "ok")
+
+
+async def cookies_refreshed(redis: Redis, proxy: Any) -> None:
+    """Отмечает, что Playwright только что сохранил cookies прокси."""
+    if not _ENABLED:
+        return
+    try:
+        await redis.hset(_key(proxy['server']), "cookies_at", int(time.time()))
+    except Exception as ex:
+        _logger.warning("cookies_at failed proxy=%s err=%s", proxy['server'], ex)
+
+
+async def flush(redis: Redis) -> None:
+    """Сбрасывает накопленные счётчики в Redis и cooldown в таблицу proxies."""
+    counters = dict(_pending)
+    _pending.clear()
+    cooldowns = set(_pending_cooldowns)
+    _pending_cooldowns.clear()
+    if counters:
+        minute = int(time.time() // 60)
+        try:
+            async with redis.pipeline(transaction=False) as pipe:
+                for server, (requests, errors, blocks, latency_ms) in counters.items():
+                    key = _bucket(server, minute)
+                    pipe.hincrby(key, "requests", int(requests))
+                    pipe.hincrby(key, "errors", int(errors))
+                    pipe.hincrby(key, "blocks", int(blocks))
+                    pipe.hincrbyfloat(key, "latency_ms", round(latency_ms, 1))
+                    pipe.expire(key, (_WINDOW + 1) * 60)
+                await pipe.execute()
+        except Exception as ex:
+            _logger.warning("stats flush failed proxies=%s err=%s", len(counters), ex)
+    if cooldowns:
+        try:
+            async with DataBase.session_marker() as session:
+                for server in cooldowns:
+                    await session.execute(_COOLDOWN_UPSERT, {"proxy": server, "secs": _COOLDOWN})
+                await session.commit()
+            _logger.info("cooldown proxies=%s secs=%s", ",".join(sorted(cooldowns)), _COOLDOWN)
+        except Exception as ex:
+            _logger.warning("cooldown write failed proxies=%s err=%s", len(cooldowns), ex)
+
+
+async def refresh(redis: Redis, proxies: Sequence[Any]) -> None:
+    """Перечитывает оценки всех прокси из Redis и cooldown из таблицы proxies."""
+    global _loaded_at
+    minute = int(time.time() // 60)
+    servers = [proxy['server'] for proxy in proxies]
+    async with redis.pipeline(transaction=False) as pipe:
+        for server in servers:
+            pipe.hget(_key(server), "cookies_at")
+            pipe.lrange(challenge_stats.history_key(server), 0, _SOLVE_SAMPLES - 1)
+            for back in range(_WINDOW):
+                pipe.hgetall(_bucket(server, minute - back))
+        replies = await pipe.execute()
+    now = time.time()
+    step = _WINDOW + 2
+    for index, server in enumerate(servers):
+        chunk = replies[index * step:(index + 1) * step]
+        cookies_at = chunk[0]
+        totals = {"requests": 0.0, "errors": 0.0, "blocks": 0.0, "latency_ms": 0.0}
+        for bucket in chunk[2:]:
+            for name, value in (bucket or {}).items():
+                name = name.decode() if isinstance(name, bytes) else name
+                if name in totals:
+                    totals[name] += float(value)
+        _scores[server] = score(
+            totals["requests"],
+            totals["errors"],
+            totals["blocks"],
+            totals["latency_ms"],
+            now - float(cookies_at) if cookies_at is not None else None,
+            *_solves(chunk[1]),
+        )
+    try:
+        async with DataBase.session_marker() as session:
+            cooling = {row[0] for row in (await session.execute(_COOLDOWN_SELECT)).all()}
+    except Exception as ex:
+        _logger.warning("cooldown read failed err=%s", ex)
+    else:
+        deadline = time.monotonic() + _INTERVAL
+        for server in cooling:
+            _cooldowns[server] = max(_cooldowns.get(server, 0.0), deadline)
+    _loaded_at = time.monotonic()
+
+
+async def _ensure_fresh(redis: Redis, proxies: Sequence[Any]) -> None:
+    global _refresh_lock
+    if time.monotonic() - _loaded_at < _INTERVAL:
+        return
+    if _refresh_lock is None:
+        _refresh_lock = asyncio.Lock()
+    async with _refresh_lock:
+        if time.monotonic() - _loaded_at < _INTERVAL:
+            return
+        try:
+            await refresh(redis, proxies)
+        except Exception as ex:
+            _logger.warning("refresh failed err=%s", ex)
+
+
+def _cooling(server: str) -> bool:
+    return _cooldowns.get(server, 0.0) > time.monotonic()
+
+
+async def _candidates(redis: Redis, proxies: Sequence[Any]) -> list[Any]:
+    candidates = []
+    for proxy in proxies:
+        if _cooling(proxy['server']):
+            continue
+        if not await proxy_health.is_healthy(redis, proxy):
+            continue
+        candidates.append(proxy)
+    return candidates
+
+
+async def pick(redis: Redis, proxies: Sequence[Any], fallback: Iterator[Any]) -> Any:
+    """Взвешенный по оценке выбор прокси без cooldown.
+
+    Если подходящих нет, отдаём очередной из fallback: очередь не должна вставать.
+    """
+    await _ensure_fresh(redis, proxies)
+    candidates = await _candidates(redis, proxies)
+    if not candidates:
+        proxy = next(fallback)
+        _logger.warning("no proxies available, using proxy=%s", proxy['server'])
+        return proxy
+    weights = [max(_scores.get(proxy['server'], 1.0), _FLOOR) for proxy in candidates]
+    return random.choices(candidates, weights=weights)[0]
+
+
+async def reassign(redis: Redis, proxies: Sequence[Any], proxy: Any) -> Any:
+    """Оставляет назначенный прокси задачи или меняет его, если он плох сейчас."""
+    if not _ENABLED:
+        return proxy
+    await _ensure_fresh(redis, proxies)
+    server = proxy['server']
+    if not _cooling(server):
+        best = max((_scores.get(item['server'], 1.0) for item in proxies), default=1.0)
+        if _scores.get(server, 1.0) >= best * _KEEP_RATIO:
+            return proxy
+    candidates = [item for item in await _candidates(redis, proxies) if item['server'] != server]
+    if not candidates:
+        return proxy
+    weights = [max(_scores.get(item['server'], 1.0), _FLOOR) for item in candidates]
+    chosen = random.choices(candidates, weights=weights)[0]
+    _logger.info(
+        "reassign proxy=%s score=%.3f cooling=%s -> proxy=%s score=%.3f",
+        server,
+        _scores.get(server, 1.0),
+        _cooling(server),
+        chosen['server'],
+        _scores.get(chosen['server'], 1.0),
+    )
+    return chosen
+
+
+async def _loop(redis: Redis) -> None:
+    _logger.info("scheduler flush started interval=%s", _INTERVAL)
+    try:
+        while True:
+            await asyncio.sleep(_INTERVAL)
+            await flush(redis)
+    except asyncio.CancelledError:
+        _logger.info("scheduler flush cancelled")
+        raise
+
+
+def start(redis: Redis) -> Optional[asyncio.Task[None]]:
+    """Создаёт фоновую задачу сброса счётчиков. Возвращает task или None, если отключено."""
+    if not _ENABLED or _INTERVAL <= 0:
+        return None
+    return asyncio.create_task(_loop(redis))
+
+
+async def aclose(redis: Redis) -> None:
+    """Последний сброс при остановке воркера."""
+    if _ENABLED:
+        await flush(redis)
@@ -0,0 +1,314 @@
+"""Повторы запросов: классы ошибок, backoff с jitter, бюджеты и circuit breaker.
+
+RETRY_POLICY_ENABLED=1 — декоратор retry() из main.py уходит сюда:
+  * отмена (CancelledError, KeyboardInterrupt, SystemExit) не повторяется
+    и пробрасывается сразу;
+  * ошибка классифицируется: block (Pardon Our Interruption), network
+    (aiohttp, таймауты, OSError), parse (разбор страницы: AttributeError,
+    ValueError, AssertionError, ...), other;
+  * пауза перед повтором — full jitter: random(0, min(RETRY_MAX_DELAY,
+    base * 2^попытка)), base — RETRY_BLOCK_BASE для block, RETRY_BASE иначе;
+  * повторов на прокси и на запрос не больше RETRY_BUDGET_PROXY и
+    RETRY_BUDGET_QUERY за RETRY_BUDGET_WINDOW секунд (в процессе воркера);
+  * после RETRY_BREAKER_THRESHOLD неудач подряд прокси «открывается» на
+    RETRY_BREAKER_COOLDOWN секунд: вызовы через него сразу получают
+    CircuitOpen, затем одна пробная попытка решает, закрыть ли его;
+    маршрут задачи (failover.Route) при этом сразу переезжает на другой
+    прокси, а если некуда — CircuitOpen пробрасывается всегда (и при
+    exhausted="skip"), чтобы task_collect_loop переставил задачу;
+  * фильтры вызывающего те же, что у прежнего retry: повторяются только
+    ошибки exception, ошибки skip завершают вызов с None, пауза не меньше
+    delay;
+  * исчерпав попытки, пробрасываем последнюю ошибку (или возвращаем None,
+    если так попросил вызывающий — с записью в метрики).
+Счётчики попыток и исходов пишутся в RETRY_POLICY_LOG_FILE раз в
+RETRY_METRICS_INTERVAL секунд.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+import logging
+import os
+import random
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from functools import wraps
+from typing import Any, Callable, Optional
+
+from aiohttp import ClientError
+
+
+def _as_bool(value: Optional[str]) -> bool:
+    if not value:
+        return False
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+_ENABLED: bool = _as_bool(os.getenv("RETRY_POLICY_ENABLED"))
+_BASE: float = float(os.getenv("RETRY_BASE", "0.5"))
+_BLOCK_BASE: float = float(os.getenv("RETRY_BLOCK_BASE", "2"))
+_MAX_DELAY: float = float(os.getenv("RETRY_MAX_DELAY", "30"))
+_BUDGET_PROXY: int = int(os.getenv("RETRY_BUDGET_PROXY", "30"))
+_BUDGET_QUERY: int = int(os.getenv("RETRY_BUDGET_QUERY", "15"))
+_BUDGET_WINDOW: float = float(os.getenv("RETRY_BUDGET_WINDOW", "60"))
+_BREAKER_THRESHOLD: int = int(os.getenv("RETRY_BREAKER_THRESHOLD", "5"))
+_BREAKER_COOLDOWN: float = float(os.getenv("RETRY_BREAKER_COOLDOWN", "60"))
+_METRICS_INTERVAL: float = float(os.getenv("RETRY_METRICS_INTERVAL", "60"))
+_LOG_FILE: str = os.getenv("RETRY_POLICY_LOG_FILE", "retry_policy.log")
+
+_logger = logging.getLogger("retry_policy")
+if not _logger.handlers:
+    _handler = logging.FileHandler(_LOG_FILE, encoding="utf-8")
+    _handler.setFormatter(logging.Formatter(
+        fmt="%(asctime)s | %(levelname)s | %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    ))
+    _logger.addHandler(_handler)
+_logger.setLevel(logging.INFO)
+_logger.propagate = False
+
+_CANCEL = (asyncio.CancelledError, KeyboardInterrupt, SystemExit)
+_NETWORK = (ClientError, asyncio.TimeoutError, OSError)
+_PARSE = (AttributeError, ValueError, KeyError, IndexError, TypeError, AssertionError)
+
+
+class CircuitOpen(Exception):
+    def __init__(self, server: str) -> None:
+        super().__init__(server)
+        self.server = server
+
+    def __str__(self) -> str:
+        return f"circuit open for proxy {self.server}"
+
+
+@dataclass(slots=True)
+class _Breaker:
+    failures: int = 0
+    opened_until: float = 0.0
+    probing: bool = False
+
+
+_breakers: dict[str, _Breaker] = {}
+_budgets: dict[str, deque[float]] = {}
+_metrics: Counter[tuple[str, str]] = Counter()
+_metrics_at: float = time.monotonic()
+
+
+def enabled() -> bool:
+    return _ENABLED
+
+
+def classify(ex: BaseException, block: tuple[type[BaseException], ...] = ()) -> str:
+    """cancel / breaker / block / network / parse / other."""
+    if isinstance(ex, _CANCEL):
+        return "cancel"
+    if isinstance(ex, CircuitOpen):
+        return "breaker"
+    if block and isinstance(ex, block):
+        return "block"
+    if isinstance(ex, _NETWORK):
+        return "network"
+    if isinstance(ex, _PARSE):
+        return "parse"
+    return "other"
+
+
+def backoff(kind: str, attempt: int) -> float:
+    """Full jitter: случайная пауза до base * 2^attempt (не больше RETRY_MAX_DELAY)."""
+    base = _BLOCK_BASE if kind == "block" else _BASE
+    return random.uniform(0, min(_MAX_DELAY, base * (2 ** attempt)))
+
+
+def _count(name: str, outcome: str) -> None:
+    global _metrics_at
+    _metrics[(name, outcome)] += 1
+    now = time.monotonic()
+    if now - _metrics_at >= _METRICS_INTERVAL:
+        _metrics_at = now
+        _logger.info(
+            "metrics %s",
+            " ".join(f"{func}.{kind}={value}" for (func, kind), value in sorted(_metrics.items())),
+        )
+        _metrics.clear()
+
+
+def _spend(key: str, limit: int) -> bool:
+    """Берёт один повтор из бюджета key; False — бюджет за окно исчерпан."""
+    if limit <= 0:
+        return True
+    window = _budgets.setdefault(key, deque())
+    now = time.monotonic()
+    while window and now - window[0] > _BUDGET_WINDOW:
+        window.popleft()
+    if len(window) >= limit:
+        return False
+    window.append(now)
+    return True
+
+
+def _admit(server: Optional[str]) -> None:
+    """Пропускает вызов через прокси или бросает CircuitOpen."""
+    if not server:
+        return
+    breaker = _breakers.get(server)
+    if breaker is None or not breaker.opened_until:
+        return
+    if time.monotonic() < breaker.opened_until or breaker.probing:
+        raise CircuitOpen(server)
+    # Что: half-open — пропускаем одну пробную попытку
+    breaker.probing = True
+
+
+def _success(server: Optional[str]) -> None:
+    if not server:
+        return
+    breaker = _breakers.get(server)
+    if breaker is None:
+        return
+    if breaker.opened_until:
+        _logger.info("breaker closed proxy=%s", server)
+    breaker.failures = 0
+    breaker.opened_until = 0.0
+    breaker.probing = False
+
+
+def _failure(server: Optional[str], kind: str) -> None:
+    if not server or kind == "breaker":
+        # Что: отказ открытого breaker уже учтён — запроса не было
+        return
+    if kind == "parse":
+        # Что: ошибка разбора — не вина прокси; ответ пришёл, значит он жив
+        _success(server)
+        return
+    breaker = _breakers.setdefault(server, _Breaker())
+    breaker.failures += 1
+    if breaker.probing or (not breaker.opened_until and breaker.failures >= _BREAKER_THRESHOLD):
+        breaker.opened_until = time.monotonic() + _BREAKER_COOLDOWN
+        breaker.probing = False
+        _logger.warning("breaker open proxy=%s failures=%s kind=%s", server, breaker.failures, kind)
+
+
+def _scope(
+    signature: inspect.Signature, args: tuple, kwargs: dict
+) -> tuple[Any, Optional[str], Optional[str]]:
+    """(route, server прокси, query) из аргументов вызова: route/proxy и query."""
+    try:
+        bound = signature.bind_partial(*args, **kwargs).arguments
+    except TypeError:
+        return None, None, None
+    proxy = bound.get("proxy")
+    route = bound.get("route")
+    if route is not None:
+        proxy = getattr(route, "proxy", None)
+    server = proxy.get("server") if isinstance(proxy, dict) else None
+    query = bound.get("query")
+    return route, server, str(query) if query is not None else None
+
+
+def _give_up(
+    name: str,
+    server: Optional[str],
+    query: Optional[str],
+    attempt: int,
+    reason: str,
+    last: BaseException,
+    exhausted: str,
+) -> None:
+    _count(name, reason)
+    _logger.info(
+        "give up func=%s proxy=%s query=%s attempts=%s reason=%s err=%r",
+        name, server, query, attempt, reason, last,
+    )
+    if exhausted == "skip":
+        return None
+    raise last
+
+
+def retry(
+    exception: type[BaseException] | tuple[type[BaseException], ...] = BaseException,
+    *,
+    tries: Optional[int] = 7,
+    delay: float = 0,
+    skip: Optional[type[BaseException] | tuple[type[BaseException], ...]] = None,
+    block: tuple[type[BaseException], ...] = (),
+    exhausted: str = "raise",
+    fatal: tuple[type[BaseException], ...] = (),
+) -> Callable:
+    """Декоратор повторов для async-функции.
+
+    exception — какие ошибки повторять; остальные пробрасываются сразу.
+    skip — ошибки, после которых вызов сразу завершается с None.
+    delay — нижняя граница паузы перед повтором.
+    tries=None — без ограничения числа попыток (остаются бюджеты и breaker).
+    exhausted="skip" — после последней неудачи вернуть None вместо ошибки.
+    fatal — ошибки, которые не повторяются и пробрасываются сразу (как отмена).
+    """
+    def decorator(func: Callable) -> Callable:
+        name = func.__name__
+        signature = inspect.signature(func)
+
+        @wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            attempt = 0
+            while True:
+                # Что: прокси читаем на каждой попытке — failover мог его сменить
+                route, server, query = _scope(signature, args, kwargs)
+                try:
+                    _admit(server)
+                except CircuitOpen as ex:
+                    # Что: прокси открыт — запрос не отправляем; маршрут задачи уезжает на другой
+                    abandon = getattr(route, "abandon", None)
+                    if abandon is not None and await abandon(route.proxy, ex):
+                        _count(name, "failover")
+                        continue
+                    # Что: не молча — задачу переставит task_collect_loop
+                    return _give_up(name, server, query, attempt, "breaker", ex, "raise")
+                _count(name, "attempt")
+                try:
+                    result = await func(*args, **kwargs)
+                except _CANCEL:
+                    _count(name, "cancelled")
+                    breaker = _breakers.get(server) if server else None
+                    if breaker is not None:
+                        # Что: отменённая пробная попытка не должна держать прокси открытым
+                        breaker.probing = False
+                    raise
+                except BaseException as ex:
+                    if fatal and isinstance(ex, fatal):
+                        _count(name, "fatal")
+                        raise
+                    kind = classify(ex, block)
+                    _count(name, kind)
+                    _failure(server, kind)
+                    if skip and isinstance(ex, skip):
+                        return _give_up(name, server, query, attempt + 1, "skip", ex, "skip")
+                    if not isinstance(ex, exception):
+                        _count(name, "not_retried")
+                        raise
+                    last = ex
+                    reason = None
+                    attempt += 1
+                    if tries and attempt >= tries:
+                        reason = "exhausted"
+                    elif server and not _spend(f"proxy:{server}", _BUDGET_PROXY):
+                        reason = "budget_proxy"
+                    elif query and not _spend(f"query:{query}", _BUDGET_QUERY):
+                        reason = "budget_query"
+                else:
+                    _success(server)
+                    _count(name, "ok" if not attempt else "ok_after_retry")
+                    return result
+                if reason is not None:
+                    return _give_up(name, server, query, attempt, reason, last, exhausted)
+                pause = max(delay, backoff(kind, attempt - 1))
+                _logger.info(
+                    "retry func=%s proxy=%s query=%s attempt=%s kind=%s sleep=%.2fs err=%r",
+                    name, server, query, attempt, kind, pause, last,
+                )
+                await asyncio.sleep(pause)
+
+        return wrapper
+    return decorator
@@ -0,0 +1,155 @@
+"""Долгоживущие ClientSession по прокси — одна на прокси в процессе воркера.
+
+SESSION_REGISTRY_ENABLED=1 — task_collect_loop берёт сессию из реестра:
+соединения через прокси (TCP + TLS) и cookie jar переживают задачу и
+достаются следующим запросам того же прокси. У коннектора keep-alive,
+кэш DNS и ограничение соединений на хост; сессия, которой никто не
+пользуется дольше SESSION_IDLE_TTL, закрывается при следующем обращении
+к реестру. Без флага — как раньше, новая сессия на каждую задачу.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from time import monotonic
+from typing import Any, AsyncIterator, Callable, Optional
+
+from aiohttp import ClientSession, TCPConnector
+
+
+def _as_bool(value: Optional[str]) -> bool:
+    if not value:
+        return False
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+_ENABLED: bool = _as_bool(os.getenv("SESSION_REGISTRY_ENABLED"))
+_LIMIT: int = int(os.getenv("SESSION_LIMIT", "8"))
+_LIMIT_PER_HOST: int = int(os.getenv("SESSION_LIMIT_PER_HOST", "4"))
+_KEEPALIVE: float = float(os.getenv("SESSION_KEEPALIVE", "30"))
+_DNS_TTL: int = int(os.getenv("SESSION_DNS_TTL", "300"))
+_IDLE_TTL: float = float(os.getenv("SESSION_IDLE_TTL", "600"))
+_LOG_FILE: str = os.getenv("SESSION_REGISTRY_LOG_FILE", "session_registry.log")
+
+HEADERS: dict[str, str] = {
+    "User-Agent": "Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:141.0) Gecko/20100101 Firefox/141.0",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "ru-RU,ru;q=0.8,en-US;q=0.5,en;q=0.3",
+    "Sec-GPC": "1",
+    "Upgrade-Insecure-Requests": "1",
+    "Sec-Fetch-Dest": "document",
+    "Sec-Fetch-Mode": "navigate",
+    "Sec-Fetch-Site": "none",
+    "Sec-Fetch-User": "?1",
+    "Priority": "u=0, i"
+}
+
+_logger = logging.getLogger("session_registry")
+if not _logger.handlers:
+    _handler = logging.FileHandler(_LOG_FILE, encoding="utf-8")
+    _handler.setFormatter(logging.Formatter(
+        fmt="%(asctime)s | %(levelname)s | %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    ))
+    _logger.addHandler(_handler)
+_logger.setLevel(logging.INFO)
+_logger.propagate = False
+
+
+@dataclass(slots=True)
+class _Entry:
+    session: ClientSession
+    users: int = 0
+    tasks: int = 0
+    last_used: float = field(default_factory=monotonic)
+
+
+_entries: dict[str, _Entry] = {}
+
+
+def enabled() -> bool:
+    return _ENABLED
+
+
+def proxy_url(proxy: Any) -> str:
+    return f"http://{proxy['username']}:{proxy['password']}@{proxy['server']}"
+
+
+def _key(proxy: Any) -> str:
+    return f"{proxy['username']}@{proxy['server']}"
+
+
+def _new_session(proxy: Any, pooled: bool) -> ClientSession:
+    connector = None
+    if pooled:
+        connector = TCPConnector(
+            limit=_LIMIT,
+            limit_per_host=_LIMIT_PER_HOST,
+            keepalive_timeout=_KEEPALIVE,
+            use_dns_cache=True,
+            ttl_dns_cache=_DNS_TTL,
+        )
+    return ClientSession(
+        headers=HEADERS,
+        proxy=proxy_url(proxy),
+        raise_for_status=True,
+        connector=connector,
+    )
+
+
+async def _evict_idle() -> None:
+    now = monotonic()
+    for key, entry in list(_entries.items()):
+        if entry.users or now - entry.last_used < _IDLE_TTL:
+            continue
+        # Что: сначала убираем из реестра; Зачем: пока идёт close, её никто не возьмёт
+        del _entries[key]
+        _logger.info("evict proxy=%s tasks=%s idle=%.0fs", key, entry.tasks, now - entry.last_used)
+        await entry.session.close()
+
+
+@asynccontextmanager
+async def session(
+    proxy: Any,
+    on_open: Optional[Callable[[ClientSession], None]] = None,
+) -> AsyncIterator[ClientSession]:
+    """Сессия для прокси на время задачи.
+
+    on_open вызывается для каждой новой сессии (пустой cookie jar).
+    """
+    if not _ENABLED:
+        async with _new_session(proxy, pooled=False) as fresh:
+            if on_open is not None:
+                on_open(fresh)
+            yield fresh
+        return
+    await _evict_idle()
+    key = _key(proxy)
+    entry = _entries.get(key)
+    if entry is None or entry.session.closed:
+        entry = _entries[key] = _Entry(_new_session(proxy, pooled=True))
+        _logger.info("open proxy=%s sessions=%s", key, len(_entries))
+        if on_open is not None:
+            on_open(entry.session)
+    entry.users += 1
+    entry.tasks += 1
+    try:
+        yield entry.session
+    finally:
+        entry.users -= 1
+        entry.last_used = monotonic()
+
+
+async def aclose() -> None:
+    """Закрывает все сессии реестра (WORKER_SHUTDOWN)."""
+    entries = list(_entries.items())
+    _entries.clear()
+    for key, entry in entries:
+        _logger.info("close proxy=%s tasks=%s", key, entry.tasks)
+        try:
+            await entry.session.close()
+        except Exception as exc:
+            _logger.warning("close failed proxy=%s err=%s", key, exc)
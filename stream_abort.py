@@ -0,0 +1,184 @@
+"""Потоковое чтение страницы товара с досрочным обрывом загрузки.
+
+PRODUCT_STREAM_ABORT=1 — тело ответа читается кусками, <head> разбирается
+инкрементально (lxml HTMLPullParser). Загрузка обрывается, как только решение
+«товар отбрасываем» уже однозначно:
+  - challenge-страница (<title>Pardon Our Interruption...</title>);
+  - <meta name="description"> из <head> блокируется check_description;
+  - в теле встретился маркер CURRENTLY SOLD OUT.
+
+Само решение принимает product() прежним кодом по полученному префиксу:
+в нём уже есть маркер/meta, на которые сработают check_block, проверка
+sold out и check_description. Сэкономленные байты (не скачанные) пишутся
+в PRODUCT_STREAM_LOG_FILE: по Content-Length, а без него — оценка по
+скользящему среднему размера полных страниц.
+"""
+
+from __future__ import annotations
+
+import codecs
+import logging
+import os
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from aiohttp import ClientResponse
+from lxml import etree
+
+
+def _as_bool(value: Optional[str]) -> bool:
+    if not value:
+        return False
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+_ENABLED: bool = _as_bool(os.getenv("PRODUCT_STREAM_ABORT"))
+_CHUNK_SIZE: int = int(os.getenv("PRODUCT_STREAM_CHUNK", "16384"))
+_LOG_FILE: str = os.getenv("PRODUCT_STREAM_LOG_FILE", "stream_abort.log")
+
+CHALLENGE_MARKER = b"<title>Pardon Our Interruption...</title>"
+SOLD_OUT_MARKER = b'<span class="ux-textspans">CURRENTLY SOLD OUT</span>'
+_MARKERS = (("challenge", CHALLENGE_MARKER), ("sold_out", SOLD_OUT_MARKER))
+# Что: сколько байт хвоста держим между кусками; Зачем: маркер может разрезаться
+_OVERLAP = max(len(marker) for _, marker in _MARKERS) - 1
+
+_EMA_ALPHA = 0.2
+_size_ema: Optional[float] = None
+_saved_total = 0
+_aborted_total = 0
+
+_logger = logging.getLogger("stream_abort")
+if not _logger.handlers:
+    _handler = logging.FileHandler(_LOG_FILE, encoding="utf-8")
+    _handler.setFormatter(logging.Formatter(
+        fmt="%(asctime)s | %(levelname)s | %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    ))
+    _logger.addHandler(_handler)
+_logger.setLevel(logging.INFO)
+_logger.propagate = False
+
+
+def enabled() -> bool:
+    return _ENABLED
+
+
+@dataclass(slots=True)
+class StreamedPage:
+    """Полученное тело (целиком или префикс) и причина обрыва."""
+
+    body: bytes
+    encoding: str
+    reason: Optional[str] = None
+    saved_bytes: int = 0
+
+
+class _HeadWatcher:
+    """Инкрементальный разбор <head>: ждём meta description и конец head."""
+
+    def __init__(self, encoding: Optional[str]) -> None:
+        self._parser = etree.HTMLPullParser(events=("start", "end"), encoding=encoding)
+        self.done = False
+        self.description: Optional[str] = None
+
+    def feed(self, chunk: bytes) -> None:
+        if self.done:
+            return
+        self._parser.feed(chunk)
+        for event, el in self._parser.read_events():
+            tag = el.tag
+            if event == "start" and tag == "meta" and self.description is None:
+                if el.get("name") == "description":
+                    self.description = el.get("content")
+                    self.done = True
+            elif (event == "end" and tag == "head") or (event == "start" and tag == "body"):
+                self.done = True
+            if self.done:
+                break
+        if self.done:
+            # Что: дальше парсер не нужен; Зачем: не держать дерево всей страницы
+            self._parser = None
+
+
+def _encoding_of(response: ClientResponse) -> Optional[str]:
+    charset = response.charset
+    if not charset:
+        return None
+    try:
+        return codecs.lookup(charset).name
+    except LookupError:
+        return None
+
+
+def _expected_size(response: ClientResponse, reason: str) -> tuple[Optional[int], bool]:
+    """Полный размер тела: (байты, оценка ли это)."""
+    length = response.content_length
+    coding = response.headers.get("Content-Encoding", "identity").lower()
+    if length is not None and coding in ("", "identity"):
+        return length, False
+    # Что: challenge-страница не похожа на карточку; Зачем: не завышать экономию оценкой
+    if _size_ema is not None and reason != "challenge":
+        return int(_size_ema), True
+    return None, True
+
+
+def _remember_size(size: int) -> None:
+    global _size_ema
+    _size_ema = size if _size_ema is None else _size_ema + _EMA_ALPHA * (size - _size_ema)
+
+
+def _account(reason: str, received: int, response: ClientResponse) -> int:
+    global _saved_total, _aborted_total
+    expected, estimated = _expected_size(response, reason)
+    saved = max(expected - received, 0) if expected is not None else 0
+    _saved_total += saved
+    _aborted_total += 1
+    _logger.info(
+        "abort reason=%s url=%s received=%s saved=%s estimated=%s aborted_total=%s saved_total=%s",
+        reason,
+        response.url,
+        received,
+        saved,
+        int(estimated),
+        _aborted_total,
+        _saved_total,
+    )
+    return saved
+
+
+async def read(
+    response: ClientResponse,
+    is_blocked_description: Callable[[Optional[str]], bool],
+) -> StreamedPage:
+    """Читает тело кусками; при однозначном отказе обрывает загрузку."""
+    declared = _encoding_of(response)
+    head = _HeadWatcher(declared)
+    chunks: list[bytes] = []
+    received = 0
+    tail = b""
+    reason: Optional[str] = None
+    async for chunk in response.content.iter_chunked(_CHUNK_SIZE):
+        chunks.append(chunk)
+        received += len(chunk)
+        window = tail + chunk
+        for name, marker in _MARKERS:
+            if marker in window:
+                reason = name
+                break
+        if reason is None and not head.done:
+            head.feed(chunk)
+            if head.description is not None and is_blocked_description(head.description):
+                reason = "description"
+        if reason is not None:
+            break
+        tail = window[-_OVERLAP:]
+    body = b"".join(chunks)
+    # Что: как у aiohttp.get_encoding — charset из заголовка, иначе utf-8
+    encoding = declared or "utf-8"
+    if reason is None:
+        _remember_size(received)
+        return StreamedPage(body=body, encoding=encoding)
+    saved = _account(reason, received, response)
+    # Что: закрываем соединение, не дочитывая тело; Зачем: остаток не качается через прокси
+    response.close()
+    return StreamedPage(body=body, encoding=encoding, reason=reason, saved_bytes=saved)
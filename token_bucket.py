@@ -0,0 +1,178 @@
+"""Общий для всех воркеров токен-бакет на прокси в Redis (Lua, атомарно).
+
+TOKEN_BUCKET_ENABLED=1 — каждый HTTP-запрос catalog_request/product (и
+set_zip_code) сначала берёт токен из бакета своего прокси. Бакет один на
+весь кластер: сколько бы процессов и хостов ни делили прокси, запросов через
+него не больше rate в секунду (с запасом TOKEN_BUCKET_BURST). Часы — TIME
+самого Redis, так что расхождение часов хостов не мешает.
+
+rate адаптивный: успешный запрос прибавляет TOKEN_BUCKET_RATE_STEP (до
+TOKEN_BUCKET_RATE_MAX), блокировка умножает на TOKEN_BUCKET_BACKOFF (не ниже
+TOKEN_BUCKET_RATE_MIN) и обнуляет накопленные токены.
+  token_bucket:<server>  hash tokens/ts/rate
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from typing import Any, Optional
+
+from redis.asyncio import Redis
+
+
+def _as_bool(value: Optional[str]) -> bool:
+    if not value:
+        return False
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+_ENABLED: bool = _as_bool(os.getenv("TOKEN_BUCKET_ENABLED"))
+_RATE: float = float(os.getenv("TOKEN_BUCKET_RATE", "2"))
+_RATE_MIN: float = float(os.getenv("TOKEN_BUCKET_RATE_MIN", "0.2"))
+_RATE_MAX: float = float(os.getenv("TOKEN_BUCKET_RATE_MAX", "5"))
+_RATE_STEP: float = float(os.getenv("TOKEN_BUCKET_RATE_STEP", "0.05"))
+_BACKOFF: float = float(os.getenv("TOKEN_BUCKET_BACKOFF", "0.5"))
+_BURST: int = max(int(os.getenv("TOKEN_BUCKET_BURST", "4")), 1)
+# Что: дольше этого за один раз не спим; Зачем: перечитать бакет, если rate вырос
+_MAX_WAIT: float = float(os.getenv("TOKEN_BUCKET_MAX_WAIT", "1"))
+_LOG_FILE: str = os.getenv("TOKEN_BUCKET_LOG_FILE", "token_bucket.log")
+
+_KEY_PREFIX = "token_bucket:"
+_TTL = 3600
+
+_logger = logging.getLogger("token_bucket")
+if not _logger.handlers:
+    _handler = logging.FileHandler(_LOG_FILE, encoding="utf-8")
+    _handler.setFormatter(logging.Formatter(
+        fmt="%(asctime)s | %(levelname)s | %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    ))
+    _logger.addHandler(_handler)
+_logger.setLevel(logging.INFO)
+_logger.propagate = False
+
+# Что: общее начало скриптов — пополнение бакета по времени Redis
+_REFILL = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts', 'rate')
+local burst = tonumber(ARGV[1])
+local rate = tonumber(state[3]) or tonumber(ARGV[2])
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+"""
+
+_STORE = """
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now), 'rate', tostring(rate))
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[3]))
+"""
+
+# ARGV: burst, rate по умолчанию, ttl, n → "0" (выдано) или секунды до n токенов
+_ACQUIRE = _REFILL + """
+local n = math.min(tonumber(ARGV[4]), burst)
+local wait = 0
+if tokens >= n then
+    tokens = tokens - n
+else
+    wait = (n - tokens) / rate
+end
+""" + _STORE + """
+return tostring(wait)
+"""
+
+# ARGV: burst, rate по умолчанию, ttl, n
+_REFUND = _REFILL + """
+tokens = math.min(burst, tokens + tonumber(ARGV[4]))
+""" + _STORE + """
+return tostring(tokens)
+"""
+
+# ARGV: burst, rate по умолчанию, ttl, ok (1/0), шаг, множитель, min, max → новый rate
+_ADJUST = _REFILL + """
+if ARGV[4] == '1' then
+    rate = math.min(tonumber(ARGV[8]), rate + tonumber(ARGV[5]))
+else
+    rate = math.max(tonumber(ARGV[7]), rate * tonumber(ARGV[6]))
+    tokens = 0
+end
+""" + _STORE + """
+return tostring(rate)
+"""
+
+_scripts: dict[int, tuple[Any, Any, Any]] = {}
+
+
+def enabled() -> bool:
+    return _ENABLED
+
+
+def _key(server: str) -> str:
+    return _KEY_PREFIX + server
+
+
+def _registered(redis: Redis) -> tuple[Any, Any, Any]:
+    # Что: register_script держит SHA и сам делает EVALSHA/EVAL; по одному набору на клиент
+    scripts = _scripts.get(id(redis))
+    if scripts is None:
+        scripts = _scripts[id(redis)] = (
+            redis.register_script(_ACQUIRE),
+            redis.register_script(_REFUND),
+            redis.register_script(_ADJUST),
+        )
+    return scripts
+
+
+def _common() -> list[Any]:
+    return [_BURST, _RATE, _TTL]
+
+
+async def acquire(redis: Redis, proxy: Any, tokens: int = 1) -> None:
+    """Ждёт и забирает tokens токенов (несколько запросов подряд — одной заявкой)."""
+    if not _ENABLED or not proxy:
+        return
+    acquire_script = _registered(redis)[0]
+    key = _key(proxy['server'])
+    waited = 0.0
+    while True:
+        try:
+            wait = float(await acquire_script(keys=[key], args=[*_common(), tokens]))
+        except Exception as ex:
+            # Что: Redis недоступен — не останавливаем сбор, темп держит Delay
+            _logger.warning("acquire failed proxy=%s err=%s", proxy['server'], ex)
+            return
+        if wait <= 0:
+            break
+        wait = min(wait, _MAX_WAIT)
+        waited += wait
+        await asyncio.sleep(wait)
+    if waited:
+        _logger.debug("acquire proxy=%s tokens=%s waited=%.2fs", proxy['server'], tokens, waited)
+
+
+async def refund(redis: Redis, proxy: Any, tokens: int = 1) -> None:
+    """Возвращает токены, взятые под запросы, которые так и не ушли."""
+    if not _ENABLED or not proxy or tokens <= 0:
+        return
+    try:
+        await _registered(redis)[1](keys=[_key(proxy['server'])], args=[*_common(), tokens])
+    except Exception as ex:
+        _logger.warning("refund failed proxy=%s err=%s", proxy['server'], ex)
+
+
+async def report(redis: Redis, proxy: Any, ok: bool) -> None:
+    """Подстраивает rate бакета по исходу запроса (успех или блокировка)."""
+    if not _ENABLED or not proxy:
+        return
+    try:
+        rate = float(await _registered(redis)[2](
+            keys=[_key(proxy['server'])],
+            args=[*_common(), 1 if ok else 0, _RATE_STEP, _BACKOFF, _RATE_MIN, _RATE_MAX],
+        ))
+    except Exception as ex:
+        _logger.warning("report failed proxy=%s err=%s", proxy['server'], ex)
+        return
+    if not ok:
+        _logger.warning("blocked proxy=%s rate=%.3f/s", proxy['server'], rate)